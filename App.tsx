@@ -8,6 +8,7 @@ import DietWaterManager from './components/DietWaterManager';
 import CheckupCalendar from './components/CheckupCalendar';
 import Login from './components/Login';
 import Settings from './components/Settings';
+import { syncRecords } from './services/geminiService';
 import { Compass, ChevronDown, MoreHorizontal, Circle } from 'lucide-react';
 
 const App: React.FC = () => {
@@ -30,7 +31,7 @@ const App: React.FC = () => {
   });
 
   // Mock historical data
-  const [history] = useState<DailyRecord[]>([
+  const [history, setHistory] = useState<DailyRecord[]>([
     { date: '2023-10-21', weight: 72.1, systolic: 125, diastolic: 82, bpHand: 'left', edema: false, hematuria: false, foamyUrine: true, waterIntake: 1800 },
     { date: '2023-10-22', weight: 72.3, systolic: 128, diastolic: 84, bpHand: 'right', edema: true, hematuria: false, foamyUrine: false, waterIntake: 1500 },
     { date: '2023-10-23', weight: 72.4, systolic: 120, diastolic: 75, bpHand: 'left', edema: false, hematuria: false, foamyUrine: false, waterIntake: 2000 },
@@ -45,6 +46,28 @@ const App: React.FC = () => {
     }
   }, []);
 
+  // 当天记录变化后稍等片刻再同步：上传本地记录，其他设备上的变化合并进历史记录
+  useEffect(() => {
+    if (!isLoggedIn) return;
+    const userInfo = JSON.parse(localStorage.getItem('user_info') || 'null');
+    if (!userInfo?.id) return;
+    const timer = setTimeout(async () => {
+      const result = await syncRecords(userInfo.id, [record], localStorage.getItem('sync_watermark'));
+      if (!result) return;
+      localStorage.setItem('sync_watermark', result.watermark);
+      if (result.changes.length) {
+        setHistory(current => {
+          const byDate = new Map(current.map(r => [r.date, r]));
+          result.changes
+            .filter(r => r.date.slice(0, 10) !== record.date)
+            .forEach(r => byDate.set(r.date.slice(0, 10), { ...byDate.get(r.date.slice(0, 10)), ...r, date: r.date.slice(0, 10) }));
+          return Array.from(byDate.values()).sort((a, b) => a.date.localeCompare(b.date));
+        });
+      }
+    }, 2000);
+    return () => clearTimeout(timer);
+  }, [isLoggedIn, record]);
+
   useEffect(() => {
     const checkTime = () => {
       const now = new Date();
@@ -62,6 +85,7 @@ const App: React.FC = () => {
   const handleLogout = () => {
     localStorage.removeItem('access_token');
     localStorage.removeItem('user_info');
+    localStorage.removeItem('sync_watermark');
     setIsLoggedIn(false);
     setShowSettings(false);
     setActiveTab(AppTab.DASHBOARD);
@@ -0,0 +1,219 @@
+import datetime
+from collections import OrderedDict
+
+# 参与聚合的数值列（数据库列名）
+AGGREGATE_METRICS = ("weight", "systolic", "diastolic", "water_intake")
+PERIODS = ("day", "week", "month")
+
+_CAMEL_COLUMNS = {"water_intake": "waterIntake"}
+
+
+def bucket_keys(date: datetime.date) -> dict:
+    """日期 -> 各周期的桶键：day "2023-10-21"、week（ISO 周）"2023-W42"、month "2023-10" """
+    year, week, _ = date.isocalendar()
+    return {"day": date.isoformat(), "week": f"{year}-W{week:02d}", "month": f"{date.year}-{date.month:02d}"}
+
+
+def _parse_date(value) -> datetime.date:
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.date.fromisoformat(str(value)[:10])
+
+
+def _values(record: dict) -> tuple:
+    values = []
+    for metric in AGGREGATE_METRICS:
+        value = record.get(metric)
+        if value is None:
+            value = record.get(_CAMEL_COLUMNS.get(metric, metric))
+        values.append(float(value) if value is not None else None)
+    return tuple(values)
+
+
+class _Bucket:
+    """一个桶内每个指标的 [count, sum, min, max]，以及桶内包含的日期"""
+    __slots__ = ("stats", "days")
+
+    def __init__(self):
+        self.stats = [[0, 0.0, None, None] for _ in AGGREGATE_METRICS]
+        self.days = set()
+
+    def add(self, values):
+        for stat, value in zip(self.stats, values):
+            if value is None:
+                continue
+            stat[0] += 1
+            stat[1] += value
+            stat[2] = value if stat[2] is None else min(stat[2], value)
+            stat[3] = value if stat[3] is None else max(stat[3], value)
+
+    def subtract(self, values) -> bool:
+        """减去一天的值；被减去的值恰好是最小/最大值时返回 False，需要从日数据重算"""
+        exact = True
+        for stat, value in zip(self.stats, values):
+            if value is None:
+                continue
+            stat[0] -= 1
+            stat[1] -= value
+            if stat[0] == 0:
+                stat[1], stat[2], stat[3] = 0.0, None, None
+            elif value == stat[2] or value == stat[3]:
+                exact = False
+        return exact
+
+    def summary(self) -> dict:
+        result = {"days": len(self.days)}
+        for metric, (count, total, low, high) in zip(AGGREGATE_METRICS, self.stats):
+            result[metric] = {
+                "count": count,
+                "mean": round(total / count, 1) if count else None,
+                "min": low,
+                "max": high,
+            }
+        return result
+
+
+class UserAggregates:
+    """
+    单个用户的增量聚合：每天的原始值 + 周/月桶的 count/sum/min/max。
+
+    新增一天的记录是 O(1)；修改或删除已有的一天时先减去旧值，
+    只有旧值恰好是桶的最小/最大值时才从该桶的日数据重算（一个桶最多 31 天）。
+    """
+
+    def __init__(self):
+        self._days = {}  # 日期 -> 各指标的值
+        self._buckets = {period: {} for period in PERIODS if period != "day"}
+
+    def __len__(self):
+        return len(self._days)
+
+    def apply(self, record: dict):
+        """新增或更新一天的记录"""
+        date = _parse_date(record["date"])
+        values = _values(record)
+        if self._days.get(date) == values:
+            return
+        self.remove(date)
+        self._days[date] = values
+        for period, key in bucket_keys(date).items():
+            if period == "day":
+                continue
+            bucket = self._buckets[period].get(key)
+            if bucket is None:
+                bucket = self._buckets[period][key] = _Bucket()
+            bucket.add(values)
+            bucket.days.add(date)
+
+    def remove(self, date):
+        date = _parse_date(date)
+        values = self._days.pop(date, None)
+        if values is None:
+            return
+        for period, key in bucket_keys(date).items():
+            if period == "day":
+                continue
+            bucket = self._buckets[period][key]
+            bucket.days.discard(date)
+            if not bucket.days:
+                del self._buckets[period][key]
+            elif not bucket.subtract(values):
+                self._rebuild_bucket(period, key, bucket)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """从原始记录从头构建（回填）"""
+        aggregates = cls()
+        for row in rows:
+            if row.get("date"):
+                aggregates.apply(row)
+        return aggregates
+
+    def series(self, period: str, limit: int = 12) -> list:
+        """最近 limit 个桶，按时间升序；只遍历桶，不遍历日数据（day 周期除外）"""
+        if period == "day":
+            dates = sorted(self._days)[-limit:]
+            return [
+                {"bucket": date.isoformat(), "days": 1, **{
+                    metric: {"count": int(value is not None), "mean": value, "min": value, "max": value}
+                    for metric, value in zip(AGGREGATE_METRICS, self._days[date])
+                }}
+                for date in dates
+            ]
+        buckets = self._buckets[period]
+        return [{"bucket": key, **buckets[key].summary()} for key in sorted(buckets)[-limit:]]
+
+    def _rebuild_bucket(self, period, key, bucket):
+        rebuilt = _Bucket()
+        for date in bucket.days:
+            rebuilt.add(self._days[date])
+        bucket.stats = rebuilt.stats
+
+
+class AggregateStore:
+    """
+    按用户保存聚合结果的进程内存储，超过 max_users 时淘汰最久未使用的用户（之后按需重新回填）。
+
+    每个用户的结果附带回填时数据库中记录的版本（记录数, 最大 updated_at）。多个 worker 各有一份存储，
+    其他 worker 处理的同步或 webhook 不会更新本进程：读取时版本与数据库不一致就视为未命中，重新回填。
+    """
+
+    def __init__(self, max_users: int = 1000):
+        self.max_users = max_users
+        self._users = OrderedDict()
+        self._versions = {}
+        self.backfills = 0
+        self.updates = 0
+        self.stale = 0
+
+    def get(self, user_id: str, version=None):
+        """version 不为 None 时，只返回与该版本一致的结果"""
+        aggregates = self._users.get(user_id)
+        if aggregates is None:
+            return None
+        if version is not None and self._versions.get(user_id) != version:
+            self.stale += 1
+            return None
+        self._users.move_to_end(user_id)
+        return aggregates
+
+    def put(self, user_id: str, aggregates: UserAggregates, version=None) -> UserAggregates:
+        """保存回填得到的聚合结果及其版本"""
+        self._users[user_id] = aggregates
+        self._versions[user_id] = version
+        self._users.move_to_end(user_id)
+        while len(self._users) > self.max_users:
+            evicted, _ = self._users.popitem(last=False)
+            self._versions.pop(evicted, None)
+        self.backfills += 1
+        return aggregates
+
+    def apply(self, user_id: str, record: dict):
+        """新记录到达时增量更新；用户尚未加载时忽略，下次读取时会回填"""
+        aggregates = self._users.get(user_id)
+        if aggregates is not None and record.get("date"):
+            aggregates.apply(record)
+            self.updates += 1
+
+    def remove(self, user_id: str, date):
+        aggregates = self._users.get(user_id)
+        if aggregates is not None and date:
+            aggregates.remove(date)
+            self.updates += 1
+
+    def drop(self, user_id: str = None):
+        if user_id is None:
+            self._users.clear()
+            self._versions.clear()
+        else:
+            self._users.pop(user_id, None)
+            self._versions.pop(user_id, None)
+
+    def stats(self):
+        return {
+            "users": len(self._users),
+            "max_users": self.max_users,
+            "backfills": self.backfills,
+            "updates": self.updates,
+            "stale": self.stale,
+        }
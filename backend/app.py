@@ -1,23 +1,23 @@
 # Hugging Face Spaces 入口文件
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from uvicorn import run
 
 # 导入主应用
-from main import app as main_app
+from main import app as main_app, install_cors
 
-# 创建 Hugging Face Spaces 应用
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(_):
+    # 挂载的子应用不会收到 lifespan 事件，由外层应用代为执行主应用的启动/关闭任务
+    async with main_app.router.lifespan_context(main_app):
+        yield
 
-# 配置 CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# 创建 Hugging Face Spaces 应用；文档和 OpenAPI 由主应用提供
+app = FastAPI(lifespan=lifespan, docs_url=None, redoc_url=None, openapi_url=None, default_response_class=ORJSONResponse)
+# 外层自己的路由不经过主应用的中间件，需要单独配置 CORS；指标中间件只装在主应用上，避免挂载的请求被统计两次
+install_cors(app)
 
 # 根路径重定向到 main_app
 @app.get("/")
@@ -29,11 +29,10 @@ async def root():
 async def health_check():
     return {"status": "ok", "message": "Kidney Compass Backend is running!"}
 
-# 挂载主应用的所有路由
-for route in main_app.routes:
-    app.routes.append(route)
+# 其余路径交给主应用（连同它的 CORS 和指标中间件）处理，不再逐条复制路由
+app.mount("/", main_app)
 
 if __name__ == "__main__":
     # Hugging Face Spaces 使用 7860 端口
     port = int(os.environ.get("PORT", 7860))
-    run("app:app", host="0.0.0.0", port=port)
\ No newline at end of file
+    run("app:app", host="0.0.0.0", port=port)
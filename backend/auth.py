@@ -0,0 +1,160 @@
+import hashlib
+import os
+import time
+from collections import OrderedDict
+
+import jwt
+from fastapi import Header, HTTPException
+
+from db import run_sync
+
+
+class AuthError(Exception):
+    """令牌缺失、签名无效、已过期或无法获取验证密钥"""
+
+
+class TokenVerifier:
+    """
+    在本地验证 Supabase 签发的访问令牌（JWT），不再每个请求都调用 supabase.auth.get_user。
+
+    - 配置了 JWT 密钥时按 HS256 验证（旧版项目的共享密钥）；
+      否则从项目的 JWKS 地址获取公钥按 ES256/RS256 验证，公钥由 PyJWKClient 缓存。
+    - 验证通过的声明按令牌的 SHA-256 缓存，有效期不超过令牌自身的过期时间和 max_ttl。
+    """
+
+    def __init__(self, secret: str = None, jwks_url: str = None, audience: str = "authenticated",
+                 cache_size: int = 10000, max_ttl: float = 300, leeway: float = 10):
+        self.secret = secret
+        self.audience = audience
+        self.cache_size = cache_size
+        self.max_ttl = max_ttl
+        self.leeway = leeway
+        self._jwks = jwt.PyJWKClient(jwks_url, cache_keys=True, lifespan=3600) if jwks_url and not secret else None
+        self._cache = OrderedDict()  # 令牌哈希 -> (声明, 缓存到期时间)
+        self.hits = 0
+        self.misses = 0
+        self.failures = 0
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.secret or self._jwks)
+
+    async def verify(self, token: str) -> dict:
+        """返回令牌的声明；无效时抛出 AuthError"""
+        key = hashlib.sha256(token.encode()).hexdigest()
+        entry = self._cache.get(key)
+        now = time.time()
+        if entry is not None:
+            if entry[1] > now:
+                self.hits += 1
+                self._cache.move_to_end(key)
+                return entry[0]
+            del self._cache[key]
+
+        self.misses += 1
+        try:
+            if self._jwks is not None:
+                # 可能需要通过网络获取公钥（只在首次或密钥轮换时），放到线程池中执行
+                claims = await run_sync(self._decode, token)
+            else:
+                claims = self._decode(token)
+        except AuthError:
+            self.failures += 1
+            raise
+
+        expires = min(claims.get("exp", now), now + self.max_ttl)
+        self._cache[key] = (claims, expires)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return claims
+
+    def stats(self):
+        return {
+            "configured": self.configured,
+            "mode": "secret" if self.secret else "jwks" if self._jwks else "none",
+            "cached": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "failures": self.failures,
+        }
+
+    def _decode(self, token: str) -> dict:
+        if not self.configured:
+            raise AuthError("未配置令牌验证密钥")
+        try:
+            if self._jwks is not None:
+                signing_key = self._jwks.get_signing_key_from_jwt(token).key
+                algorithms = ["ES256", "RS256"]
+            else:
+                signing_key = self.secret
+                algorithms = ["HS256"]
+            return jwt.decode(
+                token, signing_key, algorithms=algorithms, audience=self.audience,
+                leeway=self.leeway, options={"require": ["exp", "sub"]}
+            )
+        except jwt.ExpiredSignatureError as e:
+            raise AuthError("令牌已过期") from e
+        except (jwt.InvalidTokenError, jwt.PyJWKClientError) as e:
+            raise AuthError(f"无效的令牌: {e}") from e
+
+
+def _jwks_url():
+    url = os.environ.get("SUPABASE_URL")
+    return f"{url.rstrip('/')}/auth/v1/.well-known/jwks.json" if url else None
+
+
+# 全局令牌验证器，配置见 README 中的环境变量说明
+token_verifier = TokenVerifier(
+    secret=os.environ.get("SUPABASE_JWT_SECRET") or None,
+    jwks_url=_jwks_url(),
+    cache_size=int(os.environ.get("AUTH_CACHE_SIZE", "10000")),
+    max_ttl=float(os.environ.get("AUTH_CACHE_TTL", "300")),
+)
+
+# 为 true 时，按用户读写数据的接口必须携带有效令牌
+AUTH_REQUIRED = os.environ.get("AUTH_REQUIRED", "false").lower() == "true"
+
+
+def _bearer(authorization: str):
+    scheme, _, token = (authorization or "").partition(" ")
+    return token.strip() if scheme.lower() == "bearer" and token.strip() else None
+
+
+async def current_user(authorization: str = Header(default="")) -> dict:
+    """FastAPI 依赖：要求 Authorization: Bearer <access_token>，返回令牌声明（sub 为用户 ID）"""
+    token = _bearer(authorization)
+    if token is None:
+        raise HTTPException(status_code=401, detail="缺少访问令牌")
+    try:
+        return await token_verifier.verify(token)
+    except AuthError as e:
+        raise HTTPException(status_code=401, detail=str(e))
+
+
+async def optional_user(authorization: str = Header(default="")):
+    """FastAPI 依赖：携带令牌时验证并返回声明，未携带时返回 None（AUTH_REQUIRED 时视为 401）"""
+    if _bearer(authorization) is None and not AUTH_REQUIRED:
+        return None
+    return await current_user(authorization)
+
+
+async def request_user(authorization: str = Header(default="")):
+    """FastAPI 依赖：只用于识别用户（例如限流），令牌缺失或无效时返回 None，不拒绝请求"""
+    token = _bearer(authorization)
+    if token is None:
+        return None
+    try:
+        return await token_verifier.verify(token)
+    except AuthError:
+        return None
+
+
+def resolve_user_id(claims, user_id: str = None) -> str:
+    """以令牌中的用户为准；请求中的 user_id 与令牌不一致时拒绝"""
+    if claims is None:
+        if not user_id:
+            raise HTTPException(status_code=400, detail="缺少 user_id")
+        return user_id
+    if user_id and user_id != claims["sub"]:
+        raise HTTPException(status_code=403, detail="无权访问其他用户的数据")
+    return claims["sub"]
@@ -0,0 +1,87 @@
+"""
+令牌验证耗时对比：本地 JWT 验证（未缓存 / 已缓存）与每次调用 supabase.auth.get_user 远程验证。
+
+默认不连接网络：用测试密钥签发令牌，远程验证用一次 --remote-latency 秒的阻塞调用模拟
+（supabase.auth.get_user 是线程池中的一次 HTTP 请求）。设置了 SUPABASE_URL / SUPABASE_KEY 且传入
+--token 时，远程路径改为真实调用 supabase.auth.get_user。
+
+用法（在 backend 目录下运行）：
+    python bench/auth_verify.py --requests 2000 --remote-latency 0.08
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jwt
+
+from auth import TokenVerifier
+from db import run_sync, supabase
+
+SECRET = "bench-secret-bench-secret-bench-secret"
+
+
+def make_token(i: int) -> str:
+    now = int(time.time())
+    return jwt.encode(
+        {"sub": f"user-{i}", "aud": "authenticated", "role": "authenticated", "iat": now, "exp": now + 3600},
+        SECRET, algorithm="HS256"
+    )
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def report(label, samples):
+    print(f"{label:<18} n={len(samples):<6} p50={percentile(samples, 50):10.2f}µs "
+          f"p99={percentile(samples, 99):10.2f}µs")
+
+
+async def measure(func, tokens):
+    samples = []
+    for token in tokens:
+        start = time.perf_counter()
+        await func(token)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return samples
+
+
+async def run(requests, users, remote_latency, real_token):
+    verifier = TokenVerifier(secret=SECRET)
+    tokens = [make_token(i) for i in range(users)]
+    stream = [tokens[i % users] for i in range(requests)]
+
+    # 第一轮每个令牌都未缓存（签名验证），之后全部命中缓存
+    cold = await measure(verifier.verify, tokens)
+    warm = await measure(verifier.verify, stream)
+
+    if real_token and supabase:
+        async def remote(_):
+            await run_sync(supabase.auth.get_user, real_token)
+        remote_stream = [real_token] * min(requests, 50)
+    else:
+        async def remote(_):
+            await run_sync(time.sleep, remote_latency)
+        remote_stream = stream[:min(requests, 50)]
+    remote_samples = await measure(remote, remote_stream)
+
+    report("local (uncached)", cold)
+    report("local (cached)", warm)
+    report("remote get_user", remote_samples)
+    print(f"缓存命中 {verifier.hits}，未命中 {verifier.misses}；"
+          f"已缓存的本地验证比远程快 {percentile(remote_samples, 50) / percentile(warm, 50):.0f} 倍（p50）")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000, help="本地验证的请求数")
+    parser.add_argument("--users", type=int, default=100, help="不同令牌的数量")
+    parser.add_argument("--remote-latency", type=float, default=0.08, help="模拟远程验证的延迟（秒）")
+    parser.add_argument("--token", help="真实的 Supabase 访问令牌，用于测量真实的远程验证")
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.users, args.remote_latency, args.token))
@@ -0,0 +1,112 @@
+"""
+/api/classify 并发压测：在 50 个慢速分类请求进行中时，测量 /api/health 的延迟。
+
+Gemini 调用被替换为本地的慢速假模型（默认 2 秒），数据库不连接，因此无需网络。
+如果事件循环被阻塞，health 的 p99 会被拉长到秒级；正常情况下应与空载时基本持平。
+
+用法（在 backend 目录下运行）：
+    python bench/classify_load.py --inflight 50 --gemini-latency 2.0
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# 压测不连接真实服务：清空配置，避免 .env 中的值被加载
+os.environ["SUPABASE_URL"] = ""
+os.environ["GEMINI_API_KEY"] = ""
+
+import httpx
+
+import llm
+import main
+
+
+class _FakeResponse:
+    text = '{"name": "测试", "level": "yellow", "reason": "压测数据", "advice": "压测数据"}'
+
+
+class _FakeModel:
+    """模拟 Gemini：异步接口用 asyncio.sleep，同步接口用 time.sleep（会阻塞事件循环）"""
+    latency = 2.0
+    calls = 0
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def generate_content(self, *args, **kwargs):
+        _FakeModel.calls += 1
+        time.sleep(self.latency)
+        return _FakeResponse()
+
+    async def generate_content_async(self, *args, **kwargs):
+        _FakeModel.calls += 1
+        await asyncio.sleep(self.latency)
+        return _FakeResponse()
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def probe_health(client, duration):
+    """在 duration 秒内持续请求 /api/health，返回每次延迟（毫秒）"""
+    latencies = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await client.get("/api/health")
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.01)
+    return latencies
+
+
+def report(label, latencies):
+    print(f"{label:<12} n={len(latencies):<5} "
+          f"p50={percentile(latencies, 50):7.2f}ms "
+          f"p99={percentile(latencies, 99):7.2f}ms "
+          f"max={max(latencies):7.2f}ms "
+          f"mean={statistics.mean(latencies):7.2f}ms")
+
+
+async def run(inflight, gemini_latency, same_query=False):
+    _FakeModel.latency = gemini_latency
+    llm.load_genai().GenerativeModel = _FakeModel
+    llm.llm.api_key = "bench"
+    llm.llm.max_concurrency = inflight
+    main.supabase = None
+    # 压测的是并发行为，不受按 IP 的限流影响
+    main.rate_limiter.per_ip = main.rate_limiter.per_user = None
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        idle = await probe_health(client, duration=1.0)
+
+        classify_calls = [
+            client.post("/api/classify", json={"query": "压测食物" if same_query else f"压测食物{i}", "type": "food"}, timeout=None)
+            for i in range(inflight)
+        ]
+        start = time.perf_counter()
+        results = await asyncio.gather(probe_health(client, duration=gemini_latency), *classify_calls)
+        elapsed = time.perf_counter() - start
+        loaded = results[0]
+
+    report("idle", idle)
+    report(f"{inflight} inflight", loaded)
+    print(f"{inflight} 个分类请求总耗时 {elapsed:.2f}s（单次 Gemini 延迟 {gemini_latency}s），Gemini 调用 {_FakeModel.calls} 次")
+    return percentile(idle, 99), percentile(loaded, 99)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--inflight", type=int, default=50, help="同时进行中的分类请求数")
+    parser.add_argument("--gemini-latency", type=float, default=2.0, help="假 Gemini 的响应延迟（秒）")
+    parser.add_argument("--same-query", action="store_true", help="所有请求使用同一个查询词，用于验证请求合并")
+    args = parser.parse_args()
+    asyncio.run(run(args.inflight, args.gemini_latency, args.same_query))
@@ -0,0 +1,97 @@
+"""
+冷启动耗时：从启动新进程到第一个请求成功应答的时间（Hugging Face Spaces / Render 缩容后的首个请求要等这么久）。
+
+每轮启动一个新的 uvicorn 进程，轮询 --path 直到返回 200，记录：
+- import：子进程导入应用模块的耗时（由子进程自己测量并打印）
+- first response：从创建进程到第一个 200 响应的总耗时
+中位数超过 --budget 秒时以非零状态退出，可以放在 CI 或部署前检查中。
+
+用法（在 backend 目录下运行；离线测量时清空 Supabase / Gemini 配置）：
+    SUPABASE_URL= GEMINI_API_KEY= python bench/cold_start.py --runs 5 --budget 3
+"""
+import argparse
+import http.client
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 子进程：测量导入耗时后启动 uvicorn
+CHILD = """
+import sys, time
+start = time.perf_counter()
+module, attr = sys.argv[1].split(":")
+app = getattr(__import__(module), attr)
+print(f"import {time.perf_counter() - start:.4f}", flush=True)
+import uvicorn
+uvicorn.run(app, host="127.0.0.1", port=int(sys.argv[2]), log_level="warning")
+"""
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(port: int, path: str, deadline: float) -> bool:
+    while time.perf_counter() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", path)
+            if conn.getresponse().status == 200:
+                return True
+        except OSError:
+            pass
+        time.sleep(0.005)
+    return False
+
+
+def measure(target: str, path: str, timeout: float):
+    port = free_port()
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-c", CHILD, target, str(port)],
+        cwd=BACKEND_DIR, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+    )
+    try:
+        if not wait_ready(port, path, start + timeout):
+            raise RuntimeError(f"{timeout}s 内未收到 {path} 的 200 响应")
+        first_response = time.perf_counter() - start
+    finally:
+        proc.terminate()
+        output, _ = proc.communicate(timeout=10)
+    import_time = next(float(line.split()[1]) for line in output.splitlines() if line.startswith("import "))
+    return import_time, first_response
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", default="app:app", help="应用对象，例如 app:app 或 main:app")
+    parser.add_argument("--path", default="/api/health", help="就绪探测的路径")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=3.0, help="首个响应耗时（中位数）的上限，秒")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    imports, responses = [], []
+    for i in range(args.runs):
+        import_time, first_response = measure(args.app, args.path, args.timeout)
+        imports.append(import_time)
+        responses.append(first_response)
+        print(f"run {i + 1}: import={import_time * 1000:7.1f}ms first response={first_response * 1000:7.1f}ms")
+
+    median = statistics.median(responses)
+    print(f"import 中位数 {statistics.median(imports) * 1000:.1f}ms，首个响应中位数 {median * 1000:.1f}ms，"
+          f"最大 {max(responses) * 1000:.1f}ms，预算 {args.budget * 1000:.0f}ms")
+    if median > args.budget:
+        print("超出冷启动预算")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
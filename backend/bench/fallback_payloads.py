@@ -0,0 +1,53 @@
+"""
+预设目录响应的开销：/api/fallback/foods 和 /api/fallback/recipes 每次请求重新序列化（FastAPI 默认的
+jsonable_encoder + json.dumps）与启动时预先序列化、压缩好的 PrebuiltPayload 对比，并列出各编码的响应体大小。
+
+用法（在 backend 目录下运行）：
+    SUPABASE_URL= GEMINI_API_KEY= python bench/fallback_payloads.py --requests 2000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from starlette.requests import Request
+
+from main import FOOD_ITEMS, RECIPES, fallback_foods_payload, fallback_recipes_payload
+
+
+def make_request(accept_encoding: str) -> Request:
+    headers = [(b"accept-encoding", accept_encoding.encode())] if accept_encoding else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+def per_request_us(fn, requests: int) -> float:
+    start = time.perf_counter()
+    for _ in range(requests):
+        fn()
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    for name, data, payload in (("foods", FOOD_ITEMS, fallback_foods_payload),
+                                ("recipes", RECIPES, fallback_recipes_payload)):
+        before = per_request_us(lambda: JSONResponse(jsonable_encoder(data)), args.requests)
+        print(f"{name}: 每次序列化 {before:8.1f}us/请求，原始 {len(JSONResponse(data).body)} 字节")
+        for accept_encoding in ("", "gzip", "gzip, deflate, br"):
+            request = make_request(accept_encoding)
+            after = per_request_us(lambda: payload.response(request), args.requests)
+            response = payload.response(request)
+            encoding = response.headers.get("content-encoding", "identity")
+            print(f"  Accept-Encoding={accept_encoding or '-':<18} 预构建 {after:6.1f}us/请求 "
+                  f"-> {encoding:<8} {len(response.body)} 字节")
+
+
+if __name__ == "__main__":
+    main()
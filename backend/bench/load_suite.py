@@ -0,0 +1,259 @@
+"""
+可重复的负载测试：在本地假 PostgREST / 假 Gemini（见 bench/stubs.py）上运行一组脚本化的负载，
+分别测量 main.app 和 app.app（Hugging Face Spaces 入口，挂载了主应用）的吞吐量和 p50/p95/p99 延迟。
+
+负载（--workloads 选择）：
+- classify：/api/classify，按 --hit-ratio 混合命中（预设食物，首次之后命中缓存）和未命中
+  （随机新查询：数据库查询 -> 营养成分表 -> 模糊匹配 -> 相似条目 -> Gemini -> 写入数据库）
+- recipe：/api/recipe（从食谱池取，后台用 Gemini 补充）
+- recipe_stream：/api/recipe/stream，读完整个 SSE 流
+- auth：带访问令牌的 /auth/me，令牌池中每个令牌第一次使用时需要验证签名
+- whitelist：/api/food-whitelist，gzip 协商，一半请求带 If-None-Match
+
+每个目标应用在单独的子进程中运行（进程内 ASGI 调用，不经过网络栈），替身服务在父进程中运行。
+--save 把结果写入 JSON 文件作为基线；--baseline 与之前记录的基线对比，任一负载的 p95 变慢超过
+--tolerance（百分比）时以非零状态退出。基线只在同一台机器、相同参数下才可比较。
+
+用法（在 backend 目录下运行）：
+    python bench/load_suite.py --save bench/baseline.json
+    python bench/load_suite.py --baseline bench/baseline.json --tolerance 20
+    python bench/load_suite.py --targets main:app --workloads classify --gemini-latency 0.5 --gemini-error-rate 0.1
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+import jwt
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+WORKLOADS = ("classify", "recipe", "recipe_stream", "auth", "whitelist")
+JWT_SECRET = "bench-secret-bench-secret-bench-secret"
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def make_token(i: int) -> str:
+    now = int(time.time())
+    return jwt.encode(
+        {"sub": f"bench-user-{i}", "aud": "authenticated", "role": "authenticated", "iat": now, "exp": now + 3600},
+        JWT_SECRET, algorithm="HS256"
+    )
+
+
+# ---------- 子进程：对一个目标应用运行负载 ----------
+
+def request_factory(workload, args, rng):
+    """返回一个协程函数 send(client) -> 状态码"""
+    import main
+
+    if workload == "classify":
+        hits = [item["name"] for item in main.FOOD_ITEMS]
+
+        def miss():
+            # 随机汉字组合：与已分类条目几乎没有共同 n-gram，不会被模糊匹配或相似条目命中
+            return "".join(chr(rng.randrange(0x4E00, 0x9FA5)) for _ in range(4))
+
+        async def send(client):
+            query = rng.choice(hits) if rng.random() < args.hit_ratio else miss()
+            return (await client.post("/api/classify", json={"query": query, "type": "food"})).status_code
+    elif workload == "recipe":
+        async def send(client):
+            headers = {"X-Session-Id": f"bench-{rng.randrange(100)}"}
+            return (await client.post("/api/recipe", headers=headers)).status_code
+    elif workload == "recipe_stream":
+        async def send(client):
+            async with client.stream("GET", "/api/recipe/stream") as response:
+                body = b"".join([chunk async for chunk in response.aiter_bytes()])
+            return response.status_code if b"event: done" in body else 599
+    elif workload == "auth":
+        tokens = [make_token(i) for i in range(args.auth_tokens)]
+
+        async def send(client):
+            headers = {"Authorization": f"Bearer {rng.choice(tokens)}"}
+            return (await client.get("/auth/me", headers=headers)).status_code
+    elif workload == "whitelist":
+        etag = None
+
+        async def send(client):
+            nonlocal etag
+            headers = {"Accept-Encoding": "gzip"}
+            if etag and rng.random() < 0.5:
+                headers["If-None-Match"] = etag
+            response = await client.get("/api/food-whitelist", headers=headers)
+            etag = response.headers.get("etag", etag)
+            return response.status_code
+    else:
+        raise ValueError(f"未知负载: {workload}")
+    return send
+
+
+async def run_workload(client, send, requests, concurrency):
+    latencies, errors = [], 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                status = await send(client)
+            except Exception:
+                status = 0
+            latencies.append((time.perf_counter() - start) * 1000)
+            if not (200 <= status < 300 or status == 304):
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": requests,
+        "errors": errors,
+        "rps": requests / elapsed,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+    }
+
+
+async def run_target(args):
+    import httpx
+
+    import llm
+    from stubs import GeminiRestModel
+
+    GeminiRestModel.endpoint = os.environ["BENCH_GEMINI_URL"]
+    llm.load_genai().GenerativeModel = GeminiRestModel
+
+    module, attr = args.child.split(":")
+    app = getattr(__import__(module), attr)
+    rng = random.Random(args.seed)
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            for workload in args.workloads:
+                send = request_factory(workload, args, rng)
+                await run_workload(client, send, args.warmup, args.concurrency)
+                results[workload] = await run_workload(client, send, args.requests, args.concurrency)
+    await GeminiRestModel.client().aclose()
+    print("RESULT " + json.dumps(results), flush=True)
+
+
+# ---------- 父进程：启动替身服务，逐个目标运行子进程，汇总并对比基线 ----------
+
+def run_child(target, args, env):
+    command = [sys.executable, os.path.abspath(__file__), "--child", target, *sys.argv[1:]]
+    proc = subprocess.run(command, cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+    for line in proc.stdout.splitlines():
+        if line.startswith("RESULT "):
+            return json.loads(line[7:])
+    raise RuntimeError(f"{target} 运行失败:\n{proc.stderr[-2000:]}")
+
+
+def compare(results, baseline, tolerance):
+    """打印与基线的差异，返回 p95 变慢超过 tolerance% 的负载"""
+    regressions = []
+    for target, workloads in results.items():
+        for workload, current in workloads.items():
+            previous = baseline.get("results", {}).get(target, {}).get(workload)
+            if previous is None:
+                continue
+            p95_change = (current["p95"] / previous["p95"] - 1) * 100 if previous["p95"] else 0.0
+            rps_change = (current["rps"] / previous["rps"] - 1) * 100 if previous["rps"] else 0.0
+            flag = ""
+            if p95_change > tolerance:
+                flag = "  <-- 变慢"
+                regressions.append(f"{target} {workload}")
+            print(f"{target:<9} {workload:<14} p95 {previous['p95']:8.2f} -> {current['p95']:8.2f}ms ({p95_change:+6.1f}%)"
+                  f"  rps {previous['rps']:8.1f} -> {current['rps']:8.1f} ({rps_change:+6.1f}%){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--targets", nargs="+", default=["main:app", "app:app"])
+    parser.add_argument("--workloads", nargs="+", default=list(WORKLOADS), choices=WORKLOADS)
+    parser.add_argument("--requests", type=int, default=500, help="每个负载计时的请求数")
+    parser.add_argument("--warmup", type=int, default=50, help="每个负载计时前的预热请求数")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--hit-ratio", type=float, default=0.8, help="classify 负载中命中本地数据的比例")
+    parser.add_argument("--auth-tokens", type=int, default=200, help="auth 负载的令牌池大小")
+    parser.add_argument("--db-latency", type=float, default=0.02, help="假 PostgREST 的响应延迟（秒）")
+    parser.add_argument("--db-error-rate", type=float, default=0.0)
+    parser.add_argument("--gemini-latency", type=float, default=0.3, help="假 Gemini 的响应延迟（秒）")
+    parser.add_argument("--gemini-error-rate", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0, help="替身服务延迟的随机抖动上限（秒）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="把结果写入该 JSON 文件，作为之后对比的基线")
+    parser.add_argument("--baseline", help="与该基线文件对比")
+    parser.add_argument("--tolerance", type=float, default=20.0, help="允许的 p95 变慢百分比")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        asyncio.run(run_target(args))
+        return
+
+    from stubs import FakeGemini, FakePostgREST
+
+    results = {}
+    for target in args.targets:
+        # 每个目标使用全新的替身服务（空表、同一随机种子），结果互不影响
+        db = FakePostgREST(latency=args.db_latency, jitter=args.jitter,
+                           error_rate=args.db_error_rate, seed=args.seed).start()
+        gemini = FakeGemini(latency=args.gemini_latency, jitter=args.jitter,
+                            error_rate=args.gemini_error_rate, seed=args.seed).start()
+        env = dict(
+            os.environ,
+            SUPABASE_URL=db.url,
+            SUPABASE_KEY=jwt.encode({"role": "anon"}, "bench", algorithm="HS256"),
+            SUPABASE_JWT_SECRET=JWT_SECRET,
+            GEMINI_API_KEY="bench",
+            BENCH_GEMINI_URL=gemini.url,
+            RATE_LIMIT_PER_IP="0",
+            RATE_LIMIT_PER_USER="0",
+            CATALOG_REFRESH_INTERVAL="0",
+            CLASSIFY_CACHE_PATH="",
+        )
+        try:
+            results[target] = run_child(target, args, env)
+        finally:
+            db.stop()
+            gemini.stop()
+
+        print(f"\n{target}（PostgREST {db.stats()['requests']} 次请求，Gemini {gemini.stats()['requests']} 次请求）")
+        print(f"{'workload':<14} {'n':>6} {'errors':>6} {'req/s':>9} {'p50':>9} {'p95':>9} {'p99':>9}")
+        for workload, r in results[target].items():
+            print(f"{workload:<14} {r['requests']:>6} {r['errors']:>6} {r['rps']:>9.1f} "
+                  f"{r['p50']:>7.2f}ms {r['p95']:>7.2f}ms {r['p99']:>7.2f}ms")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"args": {k: v for k, v in vars(args).items() if k not in ("save", "baseline", "child")},
+                       "results": results}, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已保存到 {args.save}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"\n与基线 {args.baseline} 对比（允许 p95 变慢 {args.tolerance:.0f}%）:")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("p95 超出允许范围: " + ", ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
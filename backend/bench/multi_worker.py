@@ -0,0 +1,113 @@
+"""
+多 worker 扩展性：分别以 1、2、4 个 worker 启动 gunicorn，测量本地可应答请求（/api/classify 命中预设索引、
+/api/foods/search）的吞吐量，以及每个 worker 的 PSS（按共享进程数分摊后的内存，来自 /proc/<pid>/smaps_rollup）。
+内存映射的食物目录和预加载的模块由所有 worker 共享，worker 增加时每个 worker 的 PSS 应当下降或持平。
+
+用法（在 backend 目录下运行，需要 Linux 和 gunicorn）：
+    SUPABASE_URL= GEMINI_API_KEY= python bench/multi_worker.py --workers 1 2 4 --duration 5 --concurrency 64
+"""
+import argparse
+import asyncio
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+QUERIES = ["苹果", "西红柿", "一个鸡蛋", "米饭200克", "香蕉", "冬瓜", "土豆", "牛奶"]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def pss_kb(pid: int) -> int:
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            if line.startswith("Pss:"):
+                return int(line.split()[1])
+    return 0
+
+
+def worker_pids(master: int):
+    with open(f"/proc/{master}/task/{master}/children") as f:
+        return [int(pid) for pid in f.read().split()]
+
+
+async def wait_ready(client, workers, timeout=60):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if (await client.get("/api/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError(f"{workers} 个 worker 在 {timeout}s 内未就绪")
+
+
+async def load(client, duration, concurrency):
+    count = 0
+    deadline = time.perf_counter() + duration
+
+    async def loop():
+        nonlocal count
+        while time.perf_counter() < deadline:
+            query = random.choice(QUERIES)
+            if random.random() < 0.5:
+                response = await client.post("/api/classify", json={"query": query, "type": "food"})
+            else:
+                response = await client.get("/api/foods/search", params={"q": query[:1]})
+            response.raise_for_status()
+            count += 1
+
+    await asyncio.gather(*(loop() for _ in range(concurrency)))
+    return count / duration
+
+
+async def measure(workers, duration, concurrency):
+    port = free_port()
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), PORT=str(port), HOST="127.0.0.1")
+    master = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        limits = httpx.Limits(max_connections=concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=30) as client:
+            await wait_ready(client, workers)
+            await load(client, 1.0, concurrency)  # 预热
+            throughput = await load(client, duration, concurrency)
+        pids = worker_pids(master.pid)
+        pss = [pss_kb(pid) for pid in pids]
+        return throughput, sum(pss) / len(pss) / 1024, (sum(pss) + pss_kb(master.pid)) / 1024
+    finally:
+        master.send_signal(signal.SIGTERM)
+        master.wait(timeout=30)
+
+
+async def run(worker_counts, duration, concurrency):
+    baseline = None
+    for workers in worker_counts:
+        throughput, per_worker, total = await measure(workers, duration, concurrency)
+        baseline = baseline or throughput
+        print(f"workers={workers:<2} {throughput:8.0f} req/s ({throughput / baseline:4.2f}x)  "
+              f"PSS/worker={per_worker:6.1f}MB  total={total:6.1f}MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+    asyncio.run(run(args.workers, args.duration, args.concurrency))
@@ -0,0 +1,96 @@
+"""
+营养成分规则分级的覆盖率和耗时：统计一组查询在各层（本地索引 / 营养成分表 / 模糊匹配）的命中比例，
+以及仍需调用 Gemini 的比例；再测量单次规则分级和整表向量化分级的耗时。
+
+不连接数据库和 Gemini。默认使用内置的常见饮食记录查询，也可以用 --queries 传入每行一个查询的文件。
+
+用法（在 backend 目录下运行）：
+    python bench/nutrient_coverage.py
+    python bench/nutrient_coverage.py --queries my_queries.txt
+"""
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["SUPABASE_URL"] = ""
+os.environ["GEMINI_API_KEY"] = ""
+
+import numpy as np
+
+import main
+from nutrients import NUTRIENTS, classify_values
+
+# 预设数据之外的常见查询：单一食材、带数量或做法的写法，以及少量菜品
+DEFAULT_QUERIES = [
+    "小米", "燕麦", "玉米", "红薯", "山药", "芋头", "粉丝", "馒头", "面包", "大米",
+    "生菜", "油菜", "丝瓜", "南瓜", "茄子", "洋葱", "胡萝卜", "白萝卜", "韭菜", "苦瓜",
+    "青椒", "莴笋", "竹笋", "香菇", "木耳", "紫菜", "海带", "豆芽", "芹菜", "菜花",
+    "葡萄", "草莓", "猕猴桃", "菠萝", "芒果", "哈密瓜", "柚子", "樱桃", "红枣", "榴莲",
+    "牛油果", "橘子", "鸭蛋", "咸鸭蛋", "羊肉", "鸡胸肉", "午餐肉", "香肠", "草鱼", "鲫鱼",
+    "带鱼", "虾皮", "三文鱼", "酸奶", "奶酪", "豆浆", "绿豆", "红豆", "核桃", "瓜子",
+    "杏仁", "巧克力", "酱油", "一根玉米", "半个南瓜", "清炒生菜", "蒸南瓜", "凉拌木耳",
+    "水煮西兰花", "新鲜草莓", "小米粥", "红烧肉", "宫保鸡丁", "麻婆豆腐", "鱼香肉丝",
+    "糖醋排骨", "蛋炒饭", "酸辣土豆丝", "回锅肉", "螺蛳粉",
+]
+
+
+def tier_of(query: str) -> str:
+    item = main.QueryItem(query=query, type="food")
+    if main.food_index.lookup(query) is not None:
+        return "index"
+    if main._classify_by_nutrients(item) is not None:
+        return "nutrients"
+    if main._classify_fuzzy(item) is not None:
+        return "fuzzy"
+    return "gemini"
+
+
+def time_per_call(func, arg, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(arg)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def run(queries, repeat):
+    tiers = Counter()
+    misses = []
+    for query in queries:
+        tier = tier_of(query)
+        tiers[tier] += 1
+        if tier == "gemini":
+            misses.append(query)
+
+    total = len(queries)
+    print(f"查询数 {total}，营养成分表收录 {len(main.nutrient_table)} 种食物")
+    for tier in ("index", "nutrients", "fuzzy", "gemini"):
+        print(f"  {tier:<10} {tiers[tier]:4d}  {tiers[tier] / total:6.1%}")
+    print(f"本地解决 {1 - tiers['gemini'] / total:.1%}，营养成分表解决 {tiers['nutrients'] / total:.1%}")
+    if misses:
+        print(f"仍需 Gemini: {'、'.join(misses)}")
+
+    table = main.nutrient_table
+    print(f"\n单次分级（精确匹配）   {time_per_call(table.classify, '香菇', repeat):8.2f}µs")
+    print(f"单次分级（包含匹配）   {time_per_call(table.classify, '凉拌木耳', repeat):8.2f}µs")
+    print(f"单次分级（未收录）     {time_per_call(table.classify, '螺蛳粉', repeat):8.2f}µs")
+
+    values = np.random.default_rng(0).uniform(0, 800, size=(100_000, len(NUTRIENTS))).astype(np.float32)
+    start = time.perf_counter()
+    classify_values(values)
+    elapsed = time.perf_counter() - start
+    print(f"向量化分级 {len(values)} 行    {elapsed * 1000:8.2f}ms（每行 {elapsed / len(values) * 1e9:.0f}ns）")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", help="每行一个查询的文本文件")
+    parser.add_argument("--repeat", type=int, default=10000, help="测量单次分级耗时的重复次数")
+    args = parser.parse_args()
+    queries = DEFAULT_QUERIES
+    if args.queries:
+        with open(args.queries, encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+    run(queries, args.repeat)
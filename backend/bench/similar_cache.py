@@ -0,0 +1,84 @@
+"""
+近似重复缓存（similarity.SimilarityIndex）的查询耗时和匹配效果。
+
+1. 用随机组合的食物名称填充到 --sizes 中的各个规模，测量加入耗时和单次查询的 p50/p95/p99；
+2. 在预设食物和几个菜名上，列出一组不同说法的查询匹配到的条目和相似度（阈值见 SIMILAR_MATCH_THRESHOLD）。
+
+用法（在 backend 目录下运行）：
+    SUPABASE_URL= GEMINI_API_KEY= python bench/similar_cache.py --sizes 1000 10000 100000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from similarity import SimilarityIndex, adds_modifier
+
+CHARS = "鱼肉鸡鸭猪牛羊虾蟹豆腐菜瓜茄椒葱姜蒜米面粉饭粥汤蛋奶果梨桃杏枣橙柚笋菇耳藻芹菠韭蒸炒煮炖烤炸煎焖卤拌红烧清白黑绿黄小嫩香酸甜辣"
+
+DISHES = ["清蒸鲈鱼", "红烧肉", "宫保鸡丁", "西红柿炒鸡蛋", "小米粥", "麻婆豆腐", "酸辣土豆丝",
+          "西红柿炒鸡蛋盖浇饭", "鸭蛋黄"]
+VARIANTS = ["蒸鲈鱼", "清蒸鲈鱼块", "清蒸鱼", "红烧肉块", "红烧猪肉", "宫爆鸡丁", "西红柿炒蛋", "番茄炒蛋",
+            "西红柿炒鸡蛋盖饭", "咸鸭蛋黄",
+            "小米稀饭", "麻婆豆腐饭", "酸辣土豆片", "苹果汁", "鸡蛋羹", "螺蛳粉"]
+
+
+def random_name(rng):
+    return "".join(rng.choice(CHARS) for _ in range(rng.randint(2, 6)))
+
+
+def measure(size, queries, rng):
+    index = SimilarityIndex(max_items=size)
+    start = time.perf_counter()
+    while len(index) < size:
+        index.add(random_name(rng), {"level": "green"})
+    build = time.perf_counter() - start
+
+    latencies = []
+    for _ in range(queries):
+        query = random_name(rng)
+        start = time.perf_counter()
+        index.nearest(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    print(f"{size:>7} 条: 加入 {build / size * 1e6:6.1f}us/条  查询 p50={p50:6.3f}ms p95={p95:6.3f}ms p99={p99:6.3f}ms")
+
+
+def show_matches(threshold):
+    import main
+
+    index = SimilarityIndex()
+    for item in main.FOOD_ITEMS:
+        index.add(item["name"], item)
+    for dish in DISHES:
+        index.add(dish, {"name": dish})
+    print(f"\n不同说法的匹配（阈值 {threshold}）:")
+    for query in VARIANTS:
+        match = index.nearest(query)
+        if match is None:
+            print(f"  {query:<10} -> 无共同 n-gram")
+            continue
+        similarity, name, _ = match
+        if adds_modifier(query, name):
+            verdict = "多了做法/调味，调用 Gemini"
+        else:
+            verdict = "采用" if similarity >= threshold else "调用 Gemini"
+        print(f"  {query:<10} -> {name:<10} {similarity:.3f}  {verdict}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    for size in args.sizes:
+        measure(size, args.queries, rng)
+    show_matches(float(os.environ.get("SIMILAR_MATCH_THRESHOLD", "0.75")))
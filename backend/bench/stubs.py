@@ -0,0 +1,306 @@
+"""
+压测用的本地替身服务：假 PostgREST（Supabase 的 /rest/v1）和假 Gemini（generateContent REST 接口），
+都在后台线程中运行，可以配置响应延迟、抖动和错误率，不需要网络。
+
+- FakePostgREST：内存中的表，支持 supabase-py 用到的 select / eq / in / gt / gte / lt / lte / order / limit、
+  insert 和 upsert（on_conflict + Prefer: resolution=merge-duplicates）
+- FakeGemini：按请求中的 responseSchema / 系统提示返回分类 JSON、食谱 JSON、食谱文本或总结文本，
+  支持 streamGenerateContent?alt=sse 分段返回
+- GeminiRestModel：替换 google.generativeai.GenerativeModel，通过 HTTP 调用 FakeGemini
+  （SDK 0.8.3 的 REST 传输没有异步接口，gRPC 传输无法指向本地的明文端口）
+"""
+import itertools
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import httpx
+
+
+class StubServer:
+    """在后台线程中运行的 HTTP 服务；每个请求先等待 latency（加上 0~jitter 的随机值），再按 error_rate 返回 503"""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                stub._dispatch(self)
+
+            do_POST = do_PATCH = do_DELETE = do_GET
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def stats(self):
+        return {"requests": self.requests, "errors": self.errors}
+
+    def _dispatch(self, handler):
+        length = int(handler.headers.get("content-length") or 0)
+        body = handler.rfile.read(length) if length else b""
+        with self._lock:
+            self.requests += 1
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        time.sleep(delay)
+        try:
+            if failed:
+                send_json(handler, 503, {"message": "injected error", "code": "503"})
+            else:
+                self.handle(handler, urlsplit(handler.path), body)
+        except (BrokenPipeError, ConnectionResetError):
+            # 客户端已断开（例如应用关闭时取消了进行中的调用）
+            handler.close_connection = True
+        except Exception as e:
+            send_json(handler, 500, {"message": repr(e)})
+
+    def handle(self, handler, url, body: bytes):
+        raise NotImplementedError
+
+
+def send_json(handler, status: int, data=None, headers=None):
+    payload = b"" if data is None else json.dumps(data, ensure_ascii=False).encode("utf-8")
+    handler.send_response(status)
+    handler.send_header("Content-Type", "application/json; charset=utf-8")
+    handler.send_header("Content-Length", str(len(payload)))
+    for name, value in (headers or {}).items():
+        handler.send_header(name, value)
+    handler.end_headers()
+    handler.wfile.write(payload)
+
+
+_RESERVED = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+
+def _matches(row: dict, column: str, condition: str) -> bool:
+    op, _, value = condition.partition(".")
+    actual = row.get(column)
+    if op == "eq":
+        return actual is not None and str(actual) == value
+    if op == "in":
+        return actual is not None and str(actual) in [v.strip('"') for v in value.strip("()").split(",")]
+    if actual is None:
+        return False
+    if op in ("gt", "gte", "lt", "lte"):
+        actual = str(actual)
+        return {"gt": actual > value, "gte": actual >= value, "lt": actual < value, "lte": actual <= value}[op]
+    return True  # 其他操作符不过滤
+
+
+class FakePostgREST(StubServer):
+    """Supabase 的 /rest/v1 替身，tables 为 {表名: [行]}"""
+
+    def __init__(self, tables=None, **kwargs):
+        super().__init__(**kwargs)
+        self.tables = {name: list(rows) for name, rows in (tables or {}).items()}
+        self._ids = itertools.count(1)
+
+    def handle(self, handler, url, body):
+        table = url.path.rsplit("/", 1)[-1]
+        params = parse_qsl(url.query, keep_blank_values=True)
+        method = handler.command
+        prefer = handler.headers.get("prefer") or ""
+
+        if method == "GET":
+            send_json(handler, 200, self.select(table, params))
+        elif method == "POST":
+            rows = json.loads(body or b"[]")
+            rows = rows if isinstance(rows, list) else [rows]
+            conflict = dict(params).get("on_conflict") if "merge-duplicates" in prefer else None
+            written = self.write(table, rows, conflict.split(",") if conflict else None)
+            send_json(handler, 201, written if "return=representation" in prefer else None)
+        else:
+            send_json(handler, 405, {"message": f"{method} 未实现"})
+
+    def select(self, table, params):
+        with self._lock:
+            rows = list(self.tables.get(table, []))
+        options = {}
+        for column, condition in params:
+            if column in _RESERVED:
+                options[column] = condition
+            else:
+                rows = [row for row in rows if _matches(row, column, condition)]
+        if options.get("order"):
+            column, _, direction = options["order"].split(",")[0].partition(".")
+            rows.sort(key=lambda row: str(row.get(column) or ""), reverse=direction.startswith("desc"))
+        if options.get("limit"):
+            rows = rows[:int(options["limit"])]
+        columns = options.get("select", "*")
+        if columns != "*":
+            names = columns.split(",")
+            rows = [{name: row.get(name) for name in names} for row in rows]
+        return rows
+
+    def write(self, table, rows, conflict_columns=None):
+        written = []
+        with self._lock:
+            existing = self.tables.setdefault(table, [])
+            for row in rows:
+                target = None
+                if conflict_columns:
+                    key = [str(row.get(c)) for c in conflict_columns]
+                    target = next((r for r in existing if [str(r.get(c)) for c in conflict_columns] == key), None)
+                if target is not None:
+                    target.update(row)
+                    written.append(dict(target))
+                else:
+                    row = {"id": next(self._ids), **row}
+                    existing.append(row)
+                    written.append(dict(row))
+        return written
+
+
+_LEVELS = ["green", "yellow", "red"]
+
+_RECIPE = {
+    "dishName": "压测冬瓜汤",
+    "tags": ["低钾", "低磷"],
+    "ingredients": ["冬瓜200克", "葱花少许"],
+    "steps": ["冬瓜切块", "加水煮熟", "撒葱花"],
+    "nutritionBenefit": "压测数据：低钾低磷，适合 CKD 患者。"
+}
+
+
+class FakeGemini(StubServer):
+    """Gemini generateContent / streamGenerateContent 的替身；stream_chunks 为流式响应的分段数"""
+
+    def __init__(self, stream_chunks=4, **kwargs):
+        super().__init__(**kwargs)
+        self.stream_chunks = stream_chunks
+
+    def handle(self, handler, url, body):
+        request = json.loads(body or b"{}")
+        text = self.reply(request)
+        if ":streamGenerateContent" in url.path:
+            self._stream(handler, text)
+        else:
+            send_json(handler, 200, _candidate(text))
+
+    def reply(self, request) -> str:
+        schema = ((request.get("generationConfig") or {}).get("responseSchema") or {}).get("properties") or {}
+        system = "".join(part.get("text", "") for part in (request.get("systemInstruction") or {}).get("parts", []))
+        prompt = "".join(
+            part.get("text", "") for content in request.get("contents", []) for part in content.get("parts", [])
+        )
+        if "dishName" in schema:
+            return json.dumps(_RECIPE, ensure_ascii=False)
+        if "level" in schema:
+            name = prompt.rsplit("：", 1)[-1]
+            return json.dumps({
+                "name": name,
+                "level": _LEVELS[sum(map(ord, name)) % 3],
+                "reason": f"压测数据：{name}",
+                "advice": "压测数据"
+            }, ensure_ascii=False)
+        if "dishName:" in system:
+            return "\n".join(
+                f"{field}: {', '.join(value) if isinstance(value, list) else value}" for field, value in _RECIPE.items()
+            )
+        return "压测数据：各项指标保持稳定。"
+
+    def _stream(self, handler, text):
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Connection", "close")
+        handler.end_headers()
+        size = max(1, -(-len(text) // self.stream_chunks))
+        for start in range(0, len(text), size):
+            chunk = json.dumps(_candidate(text[start:start + size]), ensure_ascii=False)
+            handler.wfile.write(f"data: {chunk}\r\n\r\n".encode("utf-8"))
+            handler.wfile.flush()
+        handler.close_connection = True
+
+
+def _candidate(text: str):
+    return {"candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": "STOP"}]}
+
+
+class _Text:
+    def __init__(self, text):
+        self.text = text
+
+
+class GeminiRestModel:
+    """
+    google.generativeai.GenerativeModel 的替身：把请求按 Gemini REST 格式发送到 endpoint（FakeGemini）。
+    只支持文本内容和 generation_config 中的 JSON 输出参数，足以覆盖 main.py 中的各类调用。
+    """
+
+    endpoint = None
+    _client = None
+
+    def __init__(self, model_name, system_instruction=None, generation_config=None, **kwargs):
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+        self.generation_config = generation_config or {}
+
+    @classmethod
+    def client(cls) -> httpx.AsyncClient:
+        if cls._client is None:
+            cls._client = httpx.AsyncClient(timeout=60, limits=httpx.Limits(max_connections=256))
+        return cls._client
+
+    def _body(self, contents):
+        parts = contents if isinstance(contents, list) else [contents]
+        body = {"contents": [{"role": "user", "parts": [{"text": p if isinstance(p, str) else "[image]"} for p in parts]}]}
+        if self.system_instruction:
+            body["systemInstruction"] = {"parts": [{"text": self.system_instruction}]}
+        config = self.generation_config
+        if config:
+            body["generationConfig"] = {
+                "responseMimeType": config.get("response_mime_type"),
+                "responseSchema": config.get("response_schema"),
+            }
+        return body
+
+    async def generate_content_async(self, contents, stream=False, **kwargs):
+        url = f"{self.endpoint}/v1beta/models/{self.model_name}"
+        if stream:
+            return self._stream(f"{url}:streamGenerateContent?alt=sse", self._body(contents))
+        response = await self.client().post(f"{url}:generateContent", json=self._body(contents))
+        response.raise_for_status()
+        return _Text(_text_of(response.json()))
+
+    async def _stream(self, url, body):
+        async with self.client().stream("POST", url, json=body) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line.startswith("data: "):
+                    yield _Text(_text_of(json.loads(line[6:])))
+
+
+def _text_of(data) -> str:
+    return "".join(part.get("text", "") for part in data["candidates"][0]["content"]["parts"])
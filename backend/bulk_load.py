@@ -0,0 +1,81 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# 各表用于去重的唯一列（需要在 Supabase 中为这些列建立唯一约束，见 README）
+CONFLICT_COLUMNS = {
+    "food_classifications": "name",
+    "recipes": "dish_name",
+    "food_whitelist": "name",
+    "food_blacklist": "name",
+}
+
+
+def read_seed_file(path: str) -> list:
+    """读取种子数据文件，按扩展名识别格式：.json（数组）、.ndjson / .jsonl（每行一个对象）、.csv"""
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, encoding="utf-8") as f:
+        if ext == ".json":
+            rows = json.load(f)
+        elif ext in (".ndjson", ".jsonl"):
+            rows = [json.loads(line) for line in f if line.strip()]
+        elif ext == ".csv":
+            # CSV 只适合没有数组列的表；空单元格视为 NULL
+            rows = [{k: (v if v != "" else None) for k, v in row.items()} for row in csv.DictReader(f)]
+        else:
+            raise ValueError(f"不支持的种子文件格式: {path}")
+    if not isinstance(rows, list):
+        raise ValueError(f"种子文件应包含对象数组: {path}")
+    return rows
+
+
+def dedupe_rows(rows: list, key: str) -> list:
+    """同一批次中唯一列重复会导致 upsert 报错，后出现的行覆盖先出现的行"""
+    by_key = {}
+    for row in rows:
+        if row.get(key):
+            by_key[row[key]] = row
+    return list(by_key.values())
+
+
+def chunked(rows: list, size: int):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+def bulk_upsert(client, table: str, rows: list, on_conflict: str = None, chunk_size: int = 500,
+                concurrency: int = 4, update: bool = False) -> dict:
+    """
+    按块并发执行批量 upsert，每块一次 HTTP 请求。
+
+    默认遇到已存在的行直接跳过（ON CONFLICT DO NOTHING），重复运行几乎没有开销；
+    update=True 时用种子数据覆盖已存在的行。单个块失败不影响其他块，失败信息在结果中返回。
+    """
+    on_conflict = on_conflict or CONFLICT_COLUMNS.get(table, "name")
+    rows = dedupe_rows(rows, on_conflict)
+    chunks = list(chunked(rows, chunk_size))
+    result = {"table": table, "rows": len(rows), "chunks": len(chunks), "loaded": 0, "failed": []}
+    if not chunks:
+        return result
+
+    def send(chunk):
+        client.table(table).upsert(
+            chunk, on_conflict=on_conflict, ignore_duplicates=not update, returning="minimal"
+        ).execute()
+        return len(chunk)
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {pool.submit(send, chunk): i for i, chunk in enumerate(chunks)}
+        for done, future in enumerate(as_completed(futures), 1):
+            i = futures[future]
+            try:
+                result["loaded"] += future.result()
+            except Exception as e:
+                result["failed"].append({"chunk": i, "rows": len(chunks[i]), "error": str(e)})
+                print(f"❌ {table} 第 {i + 1}/{len(chunks)} 块导入失败: {e}")
+            print(f"   {table}: {done}/{len(chunks)} 块完成，已处理 {result['loaded']}/{len(rows)} 行")
+    result["seconds"] = round(time.monotonic() - started, 2)
+    return result
@@ -0,0 +1,184 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from food_index import canonical_name
+
+
+# /api/classify 接受并缓存的查询类型；food_classifications 的行不区分类型，失效时需要覆盖全部类型
+ITEM_TYPES = ("food", "activity", "medicine")
+
+
+def classification_key(query: str, item_type: str = "food") -> str:
+    """分类缓存的键：规范化并映射同义词后的查询词 + 查询类型"""
+    return f"{item_type}:{canonical_name(query)}"
+
+
+class TieredCache:
+    """
+    两级缓存：进程内 LRU（带 TTL 和容量上限）+ 可选的本地 SQLite 持久层。
+
+    持久层用于在 Hugging Face Spaces 等环境重启后保留已分类的结果，
+    内存未命中时会先查持久层，命中后提升回内存。
+    set() 在事件循环中调用，持久层的写入先放进待写队列，攒够 flush_size 条或距上次提交超过
+    flush_interval 秒时一次提交；数据库使用 WAL 和 synchronous=NORMAL，提交时不等待 fsync。
+    """
+
+    def __init__(self, max_size=1024, ttl=3600, path=None, persist_ttl=7 * 24 * 3600,
+                 flush_size=32, flush_interval=2.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.persist_ttl = persist_ttl
+        self._data = OrderedDict()  # key -> (过期时间, 值)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._pending = {}  # key -> (JSON, 过期时间)，尚未提交到持久层
+        self._last_flush = time.monotonic()
+
+        self._db = None
+        if path:
+            try:
+                self._db = self._connect(path)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+                )
+                self._db.execute("DELETE FROM cache WHERE expires_at < ?", (time.time(),))
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"持久缓存初始化失败，仅使用内存缓存: {e}")
+                self._db = None
+        if self._db is not None:
+            # 预加载应用后 fork 出的 worker 进程不能沿用父进程的 SQLite 连接
+            os.register_at_fork(after_in_child=lambda: self._reconnect(path))
+
+    @staticmethod
+    def _connect(path):
+        db = sqlite3.connect(path, check_same_thread=False)
+        # WAL 下读写互不阻塞（多个 worker 共用一个文件），NORMAL 只在检查点时 fsync
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def _reconnect(self, path):
+        self._lock = threading.Lock()
+        self._pending = {}  # 父进程的待写队列由父进程提交
+        self._db = self._connect(path)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+                self.expirations += 1
+
+        value = self._get_persistent(key, now)
+        if value is not None:
+            self.persistent_hits += 1
+            self._set_memory(key, value, now)
+            return value
+
+        self.misses += 1
+        return None
+
+    def set(self, key, value):
+        now = time.time()
+        self._set_memory(key, value, now)
+        if self._db is not None:
+            with self._lock:
+                self._pending[key] = (json.dumps(value, ensure_ascii=False), now + self.persist_ttl)
+                if len(self._pending) >= self.flush_size or time.monotonic() - self._last_flush >= self.flush_interval:
+                    self._flush_locked()
+
+    def flush(self):
+        """提交待写队列，关闭时调用"""
+        if self._db is not None:
+            with self._lock:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        rows = [(key, value, expires_at) for key, (value, expires_at) in self._pending.items()]
+        self._pending.clear()
+        try:
+            self._db.executemany("INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)", rows)
+            self._db.commit()
+        except sqlite3.Error as e:
+            print(f"持久缓存写入错误: {e}")
+
+    def invalidate(self, key):
+        """删除两级缓存中的指定键，在数据库中的记录被改写时调用"""
+        with self._lock:
+            self._data.pop(key, None)
+            self._pending.pop(key, None)
+            self.invalidations += 1
+            if self._db is not None:
+                try:
+                    self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    print(f"持久缓存删除错误: {e}")
+
+    def stats(self):
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "persistent": self._db is not None,
+            "pending_writes": len(self._pending),
+        }
+
+    def _set_memory(self, key, value, now):
+        with self._lock:
+            self._data[key] = (now + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def _get_persistent(self, key, now):
+        if self._db is None:
+            return None
+        try:
+            with self._lock:
+                pending = self._pending.get(key)
+                if pending is not None:
+                    return json.loads(pending[0]) if pending[1] > now else None
+                row = self._db.execute(
+                    "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"持久缓存查询错误: {e}")
+            return None
+        return json.loads(row[0]) if row else None
+
+
+# 分类结果缓存，配置见 README 中的环境变量说明
+classification_cache = TieredCache(
+    max_size=int(os.environ.get("CLASSIFY_CACHE_SIZE", "1024")),
+    ttl=float(os.environ.get("CLASSIFY_CACHE_TTL", "3600")),
+    path=os.environ.get("CLASSIFY_CACHE_PATH") or None,
+    persist_ttl=float(os.environ.get("CLASSIFY_CACHE_PERSIST_TTL", str(7 * 24 * 3600))),
+)
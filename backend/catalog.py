@@ -0,0 +1,219 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+
+from food_index import ALIASES, FoodIndex
+
+# 文件格式版本；结构变化时修改，旧文件会被自动重新编译
+MAGIC = b"KCCATLG1"
+
+_HEADER = struct.Struct("=8s32sI")  # 魔数、源数据摘要、段数量
+_ENTRY = struct.Struct("=16sQQ")  # 段名、偏移、长度
+
+DEFAULT_CATALOG_PATH = os.path.join(tempfile.gettempdir(), "kidney-compass-catalog.bin")
+
+
+def _u32(values) -> bytes:
+    return array("I", values).tobytes()
+
+
+def _blob(items):
+    """[bytes] -> (偏移表, 拼接后的数据)，第 i 项为 data[offs[i]:offs[i+1]]"""
+    offsets = [0]
+    for item in items:
+        offsets.append(offsets[-1] + len(item))
+    return _u32(offsets), b"".join(items)
+
+
+def _dumps(value) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def source_digest(food_items, recipes) -> bytes:
+    """源数据（预设食物、食谱、同义词表）的摘要，用于判断已编译的文件是否过期"""
+    digest = hashlib.sha256(MAGIC)
+    for part in (food_items, recipes, ALIASES):
+        digest.update(_dumps(part))
+    return digest.digest()
+
+
+def compile_catalog(path: str, food_items, recipes):
+    """
+    把只读目录编译为一个二进制文件：
+    - 食物索引：按 UTF-8 字节序排序的键 + 每个键对应的分类结果（JSON）+ n-gram 倒排表，查询时二分查找
+    - 预设食物和食谱列表的 JSON（/api/fallback/* 直接返回这些字节）
+    先写临时文件再原子替换，正在映射旧文件的进程不受影响。
+    """
+    # 同义词不编译进文件，由每个进程的 build_index 加入（只有几十个键），以保持与黑白名单的优先级关系
+    index = FoodIndex()
+    for item in food_items:
+        index.add(item["name"], item)
+    entries, index_postings, gram_counts = index.tables()
+    keys = sorted(entries, key=lambda k: k.encode("utf-8"))
+    key_ids = {key: i for i, key in enumerate(keys)}
+
+    # 多个键可能对应同一条分类结果，结果只存一份
+    records, record_ids = [], {}
+    key_records = []
+    for key in keys:
+        result = entries[key]
+        if id(result) not in record_ids:
+            record_ids[id(result)] = len(records)
+            records.append(_dumps(result))
+        key_records.append(record_ids[id(result)])
+
+    gram_list = sorted(index_postings, key=lambda g: g.encode("utf-8"))
+    postings = [sorted(key_ids[key] for key in index_postings[gram]) for gram in gram_list]
+    post_offs = [0]
+    for keys_with_gram in postings:
+        post_offs.append(post_offs[-1] + len(keys_with_gram))
+
+    key_offs, key_blob = _blob([key.encode("utf-8") for key in keys])
+    rec_offs, rec_blob = _blob(records)
+    gram_offs, gram_blob = _blob([gram.encode("utf-8") for gram in gram_list])
+
+    sections = {
+        "key_offs": key_offs,
+        "key_blob": key_blob,
+        "key_recs": _u32(key_records),
+        "key_grams": _u32(gram_counts[key] for key in keys),
+        "rec_offs": rec_offs,
+        "rec_blob": rec_blob,
+        "gram_offs": gram_offs,
+        "gram_blob": gram_blob,
+        "post_offs": _u32(post_offs),
+        "postings": _u32(key for keys_with_gram in postings for key in keys_with_gram),
+        "foods": _dumps(list(food_items)),
+        "recipes": _dumps(list(recipes)),
+    }
+
+    digest = source_digest(food_items, recipes)
+    offset = _HEADER.size + _ENTRY.size * len(sections)
+    table, body = [], []
+    for name, data in sections.items():
+        padding = -offset % 8  # 段按 8 字节对齐
+        body.append(b"\0" * padding)
+        offset += padding
+        table.append(_ENTRY.pack(name.encode("ascii"), offset, len(data)))
+        body.append(data)
+        offset += len(data)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".catalog-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, digest, len(sections)))
+            f.writelines(table)
+            f.writelines(body)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class MappedCatalog:
+    """
+    以只读 mmap 打开编译好的目录文件。多个 worker 进程映射同一个文件时共享操作系统页缓存中的同一份物理内存，
+    进程内只保留几个偏移表的视图（零拷贝），分类结果在查询时才解码。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.digest, count = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"目录文件格式不匹配: {path}")
+        self._sections = {}
+        for i in range(count):
+            name, offset, length = _ENTRY.unpack_from(self._mm, _HEADER.size + i * _ENTRY.size)
+            self._sections[name.rstrip(b"\0").decode("ascii")] = (offset, length)
+
+        self._key_offs = self._array("key_offs")
+        self._key_base = self._sections["key_blob"][0]
+        self._key_recs = self._array("key_recs")
+        self._key_grams = self._array("key_grams")
+        self._rec_offs = self._array("rec_offs")
+        self._rec_base = self._sections["rec_blob"][0]
+        self._gram_offs = self._array("gram_offs")
+        self._gram_base = self._sections["gram_blob"][0]
+        self._post_offs = self._array("post_offs")
+        self._postings = self._array("postings")
+        self._decoded = {}  # 记录号 -> 解码后的分类结果
+
+    def _array(self, name):
+        offset, length = self._sections[name]
+        return memoryview(self._mm)[offset:offset + length].cast("I")
+
+    def section(self, name: str) -> bytes:
+        offset, length = self._sections[name]
+        return self._mm[offset:offset + length]
+
+    def __len__(self):
+        return len(self._key_recs)
+
+    def key(self, i: int) -> str:
+        return self._mm[self._key_base + self._key_offs[i]:self._key_base + self._key_offs[i + 1]].decode("utf-8")
+
+    def gram_count(self, i: int) -> int:
+        return self._key_grams[i]
+
+    def find(self, key: str) -> int:
+        """二分查找键的序号，不存在时返回 -1"""
+        return _bisect(key.encode("utf-8"), self._mm, self._key_base, self._key_offs, len(self._key_recs))
+
+    def record_id(self, i: int) -> int:
+        return self._key_recs[i]
+
+    def record(self, record_id: int) -> dict:
+        result = self._decoded.get(record_id)
+        if result is None:
+            start = self._rec_base + self._rec_offs[record_id]
+            result = json.loads(self._mm[start:self._rec_base + self._rec_offs[record_id + 1]])
+            # 只缓存有限条解码结果，进程内存不随目录大小增长
+            if len(self._decoded) >= 4096:
+                self._decoded.clear()
+            self._decoded[record_id] = result
+        return result
+
+    def get(self, key: str):
+        i = self.find(key)
+        return self.record(self._key_recs[i]) if i >= 0 else None
+
+    def postings(self, gram: str):
+        """包含该 n-gram 的键序号（零拷贝视图）"""
+        i = _bisect(gram.encode("utf-8"), self._mm, self._gram_base, self._gram_offs, len(self._gram_offs) - 1)
+        if i < 0:
+            return ()
+        return self._postings[self._post_offs[i]:self._post_offs[i + 1]]
+
+
+def _bisect(target: bytes, mm, base: int, offsets, count: int) -> int:
+    lo, hi = 0, count
+    while lo < hi:
+        mid = (lo + hi) // 2
+        value = mm[base + offsets[mid]:base + offsets[mid + 1]]
+        if value < target:
+            lo = mid + 1
+        elif value > target:
+            hi = mid
+        else:
+            return mid
+    return -1
+
+
+def open_catalog(path: str, food_items, recipes) -> MappedCatalog:
+    """映射目录文件；文件不存在、格式不符或源数据已变化时先重新编译"""
+    digest = source_digest(food_items, recipes)
+    try:
+        catalog = MappedCatalog(path)
+        if catalog.digest == digest:
+            return catalog
+    except (OSError, ValueError, struct.error):
+        pass
+    compile_catalog(path, food_items, recipes)
+    return MappedCatalog(path)
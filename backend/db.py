@@ -0,0 +1,87 @@
+import asyncio
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+from metrics import UPSTREAM_REQUESTS, UPSTREAM_SECONDS
+
+# 加载环境变量
+load_dotenv()
+
+# 获取 Supabase 配置
+url: str = os.environ.get("SUPABASE_URL")
+key: str = os.environ.get("SUPABASE_KEY")
+
+if not url or not key or "your_supabase" in url:
+    print("警告: 未检测到有效的 SUPABASE_URL 或 SUPABASE_KEY，请检查 .env 文件")
+
+class LazyClient:
+    """
+    Supabase 客户端的代理：第一次访问属性（如 supabase.table）时才导入 supabase SDK 并创建客户端。
+    导入 SDK 约需 0.5 秒，推迟到第一次数据库调用可以缩短冷启动时间；调用方的用法与客户端本身相同。
+    """
+
+    def __init__(self, url: str, key: str):
+        self._url = url
+        self._key = key
+        self._client = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from supabase import create_client
+                    self._client = create_client(self._url, self._key)
+        return self._client
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+
+# Supabase 客户端，未配置时为 None
+supabase = LazyClient(url, key) if url and key and "your_supabase" not in url else None
+
+# Supabase Python SDK 只有同步接口，所有数据库调用都放到有界线程池中执行，
+# 避免阻塞 uvicorn 的事件循环。线程数可通过 DB_POOL_SIZE 调整。
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "8"))
+_executor = ThreadPoolExecutor(max_workers=DB_POOL_SIZE, thread_name_prefix="supabase")
+
+async def run_sync(func, *args, **kwargs):
+    """在数据库线程池中执行同步函数"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+async def execute(query):
+    """在线程池中执行 Supabase 查询，例如 await execute(supabase.table("recipes").select("*"))"""
+    # 按 HTTP 方法和表记录耗时与成败，例如 "GET /food_classifications"
+    operation = f"{getattr(query, 'http_method', '')} {getattr(query, 'path', '')}".strip() or "query"
+    outcome = "error"
+    start = time.perf_counter()
+    try:
+        response = await run_sync(query.execute)
+        outcome = "ok"
+        return response
+    finally:
+        UPSTREAM_SECONDS.observe(time.perf_counter() - start, "supabase", operation)
+        UPSTREAM_REQUESTS.inc("supabase", operation, outcome)
+
+# 分页读取的每页行数，不能大于 PostgREST 的 max-rows（Supabase 默认 1000），否则会把被截断的页当作最后一页
+DB_PAGE_SIZE = int(os.environ.get("DB_PAGE_SIZE", "1000"))
+
+async def execute_all(build_query, page_size: int = None):
+    """
+    分页执行查询直到返回不足一页，返回全部行。build_query() 每次返回一个新的查询（需带确定的排序），
+    例如 await execute_all(lambda: supabase.table("daily_records").select("*").eq("user_id", uid).order("date"))
+    """
+    page_size = page_size or DB_PAGE_SIZE
+    rows = []
+    while True:
+        response = await execute(build_query().range(len(rows), len(rows) + page_size - 1))
+        page = response.data or []
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
@@ -0,0 +1,327 @@
+import re
+import unicodedata
+from collections import Counter
+
+# 开头的数量词，例如 "一个苹果"、"2根香蕉"、"半碗米饭"
+_QUANTITY_PREFIX = re.compile(r"^[0-9一二两三四五六七八九十百半几]+(个|份|碗|杯|根|片|块|只|条|颗|粒|盘|勺|把|瓣|斤|两|克|g|ml|毫升)")
+# 以数字开头的菜名，开头的 "数字+量词" 不是数量，例如 "三杯鸡" 不能变成 "鸡"
+_NUMERAL_DISHES = ("三杯", "一品", "八宝", "五香", "四喜", "三鲜", "十三香")
+# 结尾的重量/容量，例如 "米饭200克"、"牛奶250ml"
+_QUANTITY_SUFFIX = re.compile(r"[0-9]+(克|g|kg|千克|ml|毫升|升)$")
+# 名称中的括号注释，例如 "麦淀粉(澄粉)"
+_PARENTHESES = re.compile(r"\((.*?)\)")
+
+# 同义词表：别名 -> 标准名称（均为规范化后的形式）
+ALIASES = {
+    "番茄": "西红柿",
+    "马铃薯": "土豆",
+    "洋芋": "土豆",
+    "花菜": "菜花",
+    "花椰菜": "菜花",
+    "青花菜": "西兰花",
+    "蕃茄": "西红柿",
+    "包心菜": "包菜",
+    "卷心菜": "包菜",
+    "圆白菜": "包菜",
+    "大白菜": "白菜",
+    "鸡子": "鸡蛋",
+    "蛋": "鸡蛋",
+    "蛋清": "鸡蛋清",
+    "蛋黄": "鸡蛋黄",
+    "米": "米饭",
+    "白米饭": "米饭",
+    "大米饭": "米饭",
+    "面": "面条",
+    "挂面": "面条",
+    "鱼": "鱼肉",
+    "鸡": "鸡肉",
+    "鸭": "鸭肉",
+    "纯牛奶": "牛奶",
+    "鲜牛奶": "牛奶",
+    "螃蟹": "蟹",
+    "大闸蟹": "蟹",
+    "虾仁": "虾",
+    "大虾": "虾",
+    "桃子": "桃",
+    "杏子": "杏",
+    "梨子": "梨",
+    "橘": "橘子",
+    "桔子": "橘子",
+    "柑橘": "橘子",
+    "甜橙": "橙子",
+    "土豆条": "薯条",
+    "炸薯条": "薯条",
+    "土豆片": "薯片",
+    "比萨": "披萨",
+    "汉堡包": "汉堡",
+    "泡面": "方便面",
+    "火腿": "火腿肠",
+    "咸肉": "腊肉",
+    "榨菜": "咸菜",
+    "可口可乐": "可乐",
+    "百事可乐": "可乐",
+    "白开水": "纯净水",
+    "开水": "纯净水",
+    "水": "纯净水",
+    "茶水": "茶",
+    "绿茶": "茶",
+    "红茶": "茶",
+    "冰激凌": "冰淇淋",
+    "雪糕": "冰淇淋",
+}
+
+
+def normalize_name(text: str, strip_quantity: bool = True) -> str:
+    """
+    规范化食物名称：NFKC（全角转半角）、转小写、去除空白和标点，
+    再去掉开头的数量词和结尾的重量，例如 "一个 苹果！" -> "苹果"。
+    数量词之后没有剩余文字，或名称本身以数字开头（"三杯鸡"）时保留开头；strip_quantity=False 时不去掉开头。
+    """
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    text = "".join(
+        ch for ch in text
+        if not unicodedata.category(ch).startswith(("P", "Z", "C")) or ch in "()"
+    )
+    if strip_quantity and not text.startswith(_NUMERAL_DISHES):
+        text = _QUANTITY_PREFIX.sub("", text) or text
+    text = _QUANTITY_SUFFIX.sub("", text) or text
+    return text.replace("(", "").replace(")", "")
+
+
+def canonical_name(text: str) -> str:
+    """规范化后再通过同义词表映射为标准名称"""
+    key = normalize_name(text)
+    return ALIASES.get(key, key)
+
+
+def name_variants(name: str):
+    """数据表中的名称可能是 "鲈鱼/草鱼"、"麦淀粉(澄粉)" 这样的组合形式，拆成多个键"""
+    name = unicodedata.normalize("NFKC", name or "")
+    variants = [name]
+    for inner in _PARENTHESES.findall(name):
+        variants.append(inner)
+    base = _PARENTHESES.sub("", name)
+    variants.extend(part for part in base.split("/") if part)
+    return {normalize_name(v) for v in variants if normalize_name(v)}
+
+
+def _grams(key: str):
+    """单字 + 带首尾标记的二元组，例如 "西兰花" -> {西, 兰, 花, ^西, 西兰, 兰花, 花$}"""
+    padded = f"^{key}$"
+    grams = set(key)
+    grams.update(padded[i:i + 2] for i in range(len(padded) - 1))
+    return grams
+
+
+class FoodIndex:
+    """
+    以规范化名称为键的哈希索引，精确查询为 O(1)；
+    同时维护 n-gram 倒排表，用于模糊/前缀搜索。
+
+    base 为可选的只读底层（catalog.MappedCatalog，多进程共享的内存映射文件）：
+    本对象只保存与底层不同的键（数据库新增/覆盖、AI 分类结果），查询时先查本层再查底层。
+    """
+
+    def __init__(self, base=None):
+        self.base = base
+        self._entries = {}
+        self._postings = {}  # n-gram -> 包含它的键集合
+        self._gram_counts = {}  # 键 -> n-gram 数量
+        self._removed = set()  # 在本层中删除的底层键
+
+    def add(self, name: str, result: dict, override: bool = True, shadow_base: bool = True):
+        """shadow_base=False 时底层中已有的名称保持不变"""
+        for key in name_variants(name):
+            self._add_key(key, result, override, shadow_base)
+
+    def add_aliases(self, aliases: dict):
+        """把同义词也加入索引，使其可以被搜索到"""
+        for alias, target in aliases.items():
+            result = self._get(target)
+            if result is not None:
+                self._add_key(alias, result, override=False)
+
+    def remove(self, name: str):
+        for key in name_variants(name):
+            if self._entries.pop(key, None) is not None:
+                for gram in _grams(key):
+                    self._postings.get(gram, set()).discard(key)
+                self._gram_counts.pop(key, None)
+            if self.base is not None and self.base.find(key) >= 0:
+                self._removed.add(key)
+
+    def lookup(self, query: str):
+        # 原名称（不去掉开头的数量词）精确匹配时优先，例如索引中已有的 "三杯鸡"
+        for key in dict.fromkeys((normalize_name(query, strip_quantity=False), normalize_name(query))):
+            result = self._get(key)
+            if result is None and key in ALIASES:
+                result = self._get(ALIASES[key])
+            if result is not None:
+                return result
+        return None
+
+    def tables(self):
+        """本层的 (键 -> 结果, n-gram 倒排表, 键 -> n-gram 数量)，供 catalog 编译使用"""
+        return self._entries, self._postings, self._gram_counts
+
+    def _get(self, key: str):
+        result = self._entries.get(key)
+        if result is None and self.base is not None and key not in self._removed:
+            result = self.base.get(key)
+        return result
+
+    def search(self, query: str, limit: int = 10, prefix_bonus: bool = True):
+        """
+        按 n-gram Dice 系数排序返回候选项 [(分数, 键, 分类结果)]，分数在 0~1 之间。
+        查询是键的前缀时（用户还没输完）会额外加分；用于分类而不是自动补全时传 prefix_bonus=False，
+        否则 "西兰" 会被当作 "西兰花"。
+        """
+        q = normalize_name(query)
+        if not q:
+            return []
+        query_grams = _grams(q)
+        common = Counter()
+        for gram in query_grams:
+            for key in self._postings.get(gram, ()):
+                common[key] += 1
+
+        # (键, 分类结果, 共同 n-gram 数, 键的 n-gram 数)
+        candidates = [(key, self._entries[key], count, self._gram_counts[key]) for key, count in common.items()]
+        if self.base is not None:
+            base_common = Counter()
+            for gram in query_grams:
+                base_common.update(self.base.postings(gram))
+            for i, count in base_common.items():
+                key = self.base.key(i)
+                if key not in self._entries and key not in self._removed:
+                    candidates.append((key, self.base.record(self.base.record_id(i)), count, self.base.gram_count(i)))
+
+        best = {}  # 同一条分类结果可能对应多个键，只保留得分最高的
+        for key, result, count, gram_count in candidates:
+            score = 2 * count / (len(query_grams) + gram_count)
+            if prefix_bonus and key.startswith(q):
+                score = max(score, 0.5 + 0.5 * len(q) / len(key))
+            # 得分高者优先，其次是较短的键，最后按键排序，使结果与键的加入顺序无关
+            rank = (-score, len(key), key)
+            current = best.get(id(result))
+            if current is None or rank < current[0]:
+                best[id(result)] = (rank, (score, key, result))
+
+        ranked = sorted(best.values(), key=lambda item: item[0])
+        return [candidate for _, candidate in ranked[:limit]]
+
+    def __len__(self):
+        if self.base is None:
+            return len(self._entries)
+        shadowed = sum(1 for key in self._entries if self.base.find(key) >= 0)
+        return len(self.base) + len(self._entries) - shadowed - len(self._removed)
+
+    def _add_key(self, key: str, result: dict, override: bool, shadow_base: bool = True):
+        if self.base is not None and key not in self._entries and key not in self._removed:
+            current = self.base.get(key)
+            # 与底层相同的结果不重复保存
+            if current is not None and (not shadow_base or current == result):
+                return
+        self._removed.discard(key)
+        if key in self._entries:
+            if override:
+                self._entries[key] = result
+            return
+        self._entries[key] = result
+        grams = _grams(key)
+        self._gram_counts[key] = len(grams)
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(key)
+
+
+def classification_from_row(row: dict) -> dict:
+    """food_classifications 表中的一行 -> 分类结果"""
+    return {
+        "name": row.get("food_name") or row.get("name"),
+        "level": row.get("level"),
+        "reason": row.get("reason"),
+        "advice": row.get("advice")
+    }
+
+
+def classification_from_whitelist(row: dict) -> dict:
+    """food_whitelist 表中的一行 -> 分类结果（与前端 DietWaterManager 的展示一致）"""
+    return {
+        "name": row.get("name"),
+        "level": "green",
+        "reason": f"该食物在护肾白名单中，属于{row.get('category')}",
+        "advice": row.get("note")
+    }
+
+
+def classification_from_blacklist(row: dict) -> dict:
+    """food_blacklist 表中的一行 -> 分类结果（与前端 DietWaterManager 的展示一致）"""
+    return {
+        "name": row.get("name"),
+        "level": row.get("level"),
+        "reason": row.get("reason"),
+        "advice": "建议避免食用" if row.get("level") == "red" else "建议限量食用"
+    }
+
+
+def build_index(food_items, classifications=(), whitelist=(), blacklist=(), base=None) -> FoodIndex:
+    """
+    构建食物索引（精确查询 + 模糊搜索）。优先级从低到高：白名单/黑名单 < 预设数据 < food_classifications 表，
+    与原先 "先查数据库、再查预设" 的顺序一致。
+
+    base 为已编译预设数据（food_items）的只读底层时，预设数据不再逐条加入，
+    黑白名单只补充底层中没有的名称。
+    """
+    index = FoodIndex(base)
+    for row in whitelist:
+        index.add(row.get("name"), classification_from_whitelist(row), shadow_base=False)
+    for row in blacklist:
+        index.add(row.get("name"), classification_from_blacklist(row), shadow_base=False)
+    if base is None:
+        for item in food_items:
+            index.add(item["name"], item)
+    for row in classifications:
+        result = classification_from_row(row)
+        if result["name"] and result["level"]:
+            index.add(result["name"], result)
+    index.add_aliases(ALIASES)
+    return index
+
+
+def _merge_lists(rows, presets):
+    """数据库行优先；预设项的任一名称已被数据库行覆盖时跳过"""
+    covered = set()
+    for row in rows:
+        covered.update(name_variants(row.get("name")))
+    merged = list(rows)
+    for item in presets:
+        if not name_variants(item["name"]) & covered:
+            merged.append(item)
+            covered.update(name_variants(item["name"]))
+    return merged
+
+
+def build_whitelist(food_items, rows=()) -> list:
+    """food_whitelist 表 + 预设数据中的绿色食物，字段与前端一致：category / name / note"""
+    rows = [
+        {"category": row.get("category"), "name": row.get("name"), "note": row.get("note")}
+        for row in rows if row.get("name")
+    ]
+    presets = [
+        {"category": "推荐食物", "name": item["name"], "note": item["advice"]}
+        for item in food_items if item["level"] == "green"
+    ]
+    return _merge_lists(rows, presets)
+
+
+def build_blacklist(food_items, rows=()) -> list:
+    """food_blacklist 表 + 预设数据中的红色食物，字段与前端一致：name / reason / level"""
+    rows = [
+        {"name": row.get("name"), "reason": row.get("reason"), "level": row.get("level")}
+        for row in rows if row.get("name")
+    ]
+    presets = [
+        {"name": item["name"], "reason": item["reason"], "level": item["level"]}
+        for item in food_items if item["level"] == "red"
+    ]
+    return _merge_lists(rows, presets)
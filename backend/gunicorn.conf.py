@@ -0,0 +1,40 @@
+# 多进程部署：gunicorn 管理多个 uvicorn worker，用法见 README 中的 "Multi-worker Serving"
+#   gunicorn -c gunicorn.conf.py app:app
+# 平滑重载：kill -HUP <master pid>（逐个替换 worker，进行中的请求在 graceful_timeout 内完成）
+import gc
+import multiprocessing
+import os
+import tempfile
+
+bind = f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', '7860')}"
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# 默认每个 CPU 核心一个 worker（异步 worker 不需要 2n+1）
+workers = int(os.environ.get("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+
+# 预加载：在 master 中导入应用（编译并映射食物目录）后再 fork，worker 共享这部分内存且启动更快。
+# 代价是 HUP 重载不会加载新代码；需要热更新代码时设为 false
+preload_app = os.environ.get("GUNICORN_PRELOAD", "true").lower() == "true"
+
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+# Gemini 调用和 SSE 可能持续较久，worker 心跳超时要留足余量
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "120"))
+keepalive = 5
+
+# 多个 worker 时，限流和报告任务状态需要在进程间共享（应用导入前设置，已显式配置的不覆盖）
+if workers > 1:
+    shared_dir = os.path.join(tempfile.gettempdir(), "kidney-compass")
+    os.makedirs(shared_dir, exist_ok=True)
+    os.environ.setdefault("RATE_LIMIT_BACKEND", "sqlite")
+    os.environ.setdefault("RATE_LIMIT_PATH", os.path.join(shared_dir, "ratelimit.sqlite3"))
+    os.environ.setdefault("REPORT_STATE_DIR", os.path.join(shared_dir, "reports"))
+    # 分类缓存的内存层在各 worker 中独立，webhook 只让收到它的 worker 失效，缩短其他 worker 沿用旧结果的时间
+    os.environ.setdefault("CLASSIFY_CACHE_TTL", "300")
+    # 每个 worker 各自维护食谱池，总量按 worker 数分摊，避免启动时每个 worker 都生成一整池
+    os.environ.setdefault("RECIPE_POOL_SIZE", str(max(6, 20 // workers)))
+
+
+def when_ready(server):
+    # 预加载的对象移入永久代，避免 worker 中的垃圾回收触碰这些页面导致写时复制
+    if preload_app:
+        gc.freeze()
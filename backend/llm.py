@@ -0,0 +1,286 @@
+import asyncio
+import os
+import random
+import time
+
+from metrics import LLM_PARSE_SECONDS, UPSTREAM_REQUESTS, UPSTREAM_SECONDS
+
+
+genai = None  # google.generativeai，见 load_genai
+
+
+def load_genai():
+    """导入 google.generativeai（约 1 秒）；推迟到第一次构建模型时，缩短冷启动时间"""
+    global genai
+    if genai is None:
+        import google.generativeai
+        genai = google.generativeai
+    return genai
+
+
+class LLMUnavailable(Exception):
+    """Gemini 未配置、处于熔断状态，或重试后仍然失败；调用方应立即使用预设数据兜底"""
+
+
+def is_transient(error: Exception) -> bool:
+    """超时、429 和 5xx 值得重试并计入熔断；其它错误（400、403、内容被拦截等）重试也不会成功"""
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError)):
+        return True
+    # google.api_core 的异常在 code 上带 HTTP 状态码（例如 TooManyRequests 为 429，ServiceUnavailable 为 503）
+    code = getattr(error, "code", None)
+    if not isinstance(code, int):
+        code = getattr(error, "status_code", None)
+    return isinstance(code, int) and (code == 429 or code >= 500)
+
+
+class CircuitBreaker:
+    """
+    连续失败 failure_threshold 次后熔断 reset_timeout 秒，期间所有调用立即失败；
+    到期后放行一个探测请求（半开），成功则恢复，失败则重新熔断。
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if self._probing or time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        if not self._probing and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._probing or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self._probing = False
+
+    def release(self):
+        """探测请求没有结果就结束（被取消、调用方提前停止读取）时放弃本次探测，之后的请求可以重新探测"""
+        self._probing = False
+
+
+class LLMClient:
+    """
+    共享的 Gemini 客户端。
+
+    - 每种用途（classify / recipe ...）的模型只构建一次，系统提示通过 system_instruction 设置，
+      不再随每次请求重复发送；模型复用 SDK 内部的连接。
+    - 信号量限制同时进行的调用数。
+    - 每次调用有超时，超时、429 和 5xx 按指数退避加随机抖动重试，其它错误立即失败。
+    - 熔断器在 Gemini 故障时让调用立即失败，而不是每个请求都等满超时。
+    """
+
+    def __init__(self, api_key=None, model_name="gemini-2.0-flash", max_concurrency=8,
+                 timeout=20.0, max_retries=2, backoff=0.5, breaker=None):
+        self.api_key = api_key
+        self.model_name = model_name
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self._specs = {}  # 用途 -> 模型参数
+        self._models = {}  # 用途 -> GenerativeModel
+        self._semaphore = None
+        self._configured = False
+        self.inflight = 0
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.retries = 0
+        self.rejected = 0
+        self.invalid_responses = 0
+
+    @property
+    def available(self) -> bool:
+        return bool(self.api_key)
+
+    def register(self, kind: str, system_instruction: str = None, **generation_config):
+        """注册一种用途的模型参数，模型在第一次使用时构建"""
+        self._specs[kind] = {
+            "system_instruction": system_instruction,
+            "generation_config": generation_config or None,
+        }
+        self._models.pop(kind, None)
+
+    def model(self, kind: str):
+        model = self._models.get(kind)
+        if model is None:
+            sdk = load_genai()
+            if not self._configured:
+                sdk.configure(api_key=self.api_key)
+                self._configured = True
+            model = sdk.GenerativeModel(self.model_name, **self._specs.get(kind, {}))
+            self._models[kind] = model
+        return model
+
+    async def generate(self, kind: str, contents, **kwargs):
+        """调用 Gemini 并返回完整响应；失败时抛出 LLMUnavailable"""
+        probe = self._admit()
+        try:
+            async with self._get_semaphore():
+                self.inflight += 1
+                try:
+                    last_error = None
+                    for attempt in range(self.max_retries + 1):
+                        if attempt:
+                            self.retries += 1
+                            await asyncio.sleep(self.backoff * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5))
+                        outcome = "error"
+                        start = time.perf_counter()
+                        try:
+                            self.calls += 1
+                            response = await asyncio.wait_for(
+                                self.model(kind).generate_content_async(contents, **kwargs), self.timeout
+                            )
+                            self.breaker.record_success()
+                            outcome = "ok"
+                            return response
+                        except asyncio.TimeoutError as e:
+                            self.timeouts += 1
+                            outcome = "timeout"
+                            last_error = e
+                        except Exception as e:
+                            if not is_transient(e):
+                                # 请求本身的问题（参数错误、被拦截、无权限）重试也不会成功，也不说明 Gemini 故障
+                                self.failures += 1
+                                raise LLMUnavailable(f"Gemini 调用失败: {e!r}") from e
+                            last_error = e
+                        finally:
+                            UPSTREAM_SECONDS.observe(time.perf_counter() - start, "gemini", kind)
+                            UPSTREAM_REQUESTS.inc("gemini", kind, outcome)
+                    self._record_failure()
+                    raise LLMUnavailable(f"Gemini 调用失败: {last_error!r}") from last_error
+                finally:
+                    self.inflight -= 1
+        finally:
+            # 取消（CancelledError 不是 Exception）时既没有记录成功也没有记录失败
+            if probe:
+                self.breaker.release()
+
+    async def generate_json(self, kind: str, contents, model_cls, attempts: int = 2):
+        """
+        调用 JSON 输出模式的模型，把响应直接校验为 Pydantic 模型 model_cls；
+        只有校验失败时才重新请求，调用失败由 generate 自身的重试处理。
+        """
+        last_error = None
+        for _ in range(attempts):
+            response = await self.generate(kind, contents)
+            start = time.perf_counter()
+            try:
+                return model_cls.model_validate_json(response.text)
+            except ValueError as e:  # 包括 pydantic 的 ValidationError 和被拦截时 response.text 的异常
+                self.invalid_responses += 1
+                UPSTREAM_REQUESTS.inc("gemini", kind, "invalid")
+                last_error = e
+            finally:
+                LLM_PARSE_SECONDS.observe(time.perf_counter() - start, kind)
+        raise LLMUnavailable(f"Gemini 返回结果校验失败: {last_error}") from last_error
+
+    async def stream(self, kind: str, contents, **kwargs):
+        """流式调用 Gemini，逐段返回文本；开始输出后不再重试"""
+        probe = self._admit()
+        try:
+            async with self._get_semaphore():
+                self.inflight += 1
+                outcome = "cancelled"  # 调用方提前停止读取（例如客户端断开）
+                start = time.perf_counter()
+                try:
+                    self.calls += 1
+                    response = await asyncio.wait_for(
+                        self.model(kind).generate_content_async(contents, stream=True, **kwargs), self.timeout
+                    )
+                    # 每一段都有超时：连接建立后上游停止输出时不会无限期占用信号量
+                    chunks = response.__aiter__()
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(chunks.__anext__(), self.timeout)
+                        except StopAsyncIteration:
+                            break
+                        yield chunk.text
+                    outcome = "ok"
+                except Exception as e:
+                    outcome = "error"
+                    if isinstance(e, asyncio.TimeoutError):
+                        self.timeouts += 1
+                        outcome = "timeout"
+                    if is_transient(e):
+                        self._record_failure()
+                    else:
+                        self.failures += 1
+                    raise LLMUnavailable(f"Gemini 流式调用失败: {e!r}") from e
+                finally:
+                    self.inflight -= 1
+                    UPSTREAM_SECONDS.observe(time.perf_counter() - start, "gemini", f"{kind}_stream")
+                    UPSTREAM_REQUESTS.inc("gemini", f"{kind}_stream", outcome)
+            self.breaker.record_success()
+        finally:
+            if probe:
+                self.breaker.release()
+
+    def stats(self):
+        return {
+            "available": self.available,
+            "circuit": self.breaker.state,
+            "inflight": self.inflight,
+            "max_concurrency": self.max_concurrency,
+            "calls": self.calls,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "retries": self.retries,
+            "rejected": self.rejected,
+            "invalid_responses": self.invalid_responses,
+        }
+
+    def _admit(self) -> bool:
+        """放行时返回本次调用是否为半开状态下的探测请求"""
+        if not self.available:
+            raise LLMUnavailable("AI 服务不可用")
+        if not self.breaker.allow():
+            self.rejected += 1
+            UPSTREAM_REQUESTS.inc("gemini", "breaker", "rejected")
+            raise LLMUnavailable("AI 服务暂时不可用（熔断中）")
+        return self.breaker.state == "half-open"
+
+    def _record_failure(self):
+        self.failures += 1
+        self.breaker.record_failure()
+
+    def _get_semaphore(self):
+        # 在事件循环中首次使用时再创建，避免 Python 3.9 下绑定到错误的事件循环
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+
+# 全局共享的 Gemini 客户端，配置见 README 中的环境变量说明
+llm = LLMClient(
+    api_key=os.environ.get("GEMINI_API_KEY"),
+    model_name=os.environ.get("GEMINI_MODEL", "gemini-2.0-flash"),
+    max_concurrency=int(os.environ.get("LLM_MAX_CONCURRENCY", "8")),
+    timeout=float(os.environ.get("LLM_TIMEOUT", "20")),
+    max_retries=int(os.environ.get("LLM_MAX_RETRIES", "2")),
+    breaker=CircuitBreaker(
+        failure_threshold=int(os.environ.get("LLM_BREAKER_THRESHOLD", "5")),
+        reset_timeout=float(os.environ.get("LLM_BREAKER_RESET", "30")),
+    ),
+)
@@ -1,41 +1,91 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
-from supabase import create_client, Client
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError, field_validator
+from typing import List, Optional
+import asyncio
+import datetime
+import functools
+import json
 import os
-from dotenv import load_dotenv
-import google.generativeai as genai
+import random
 
-# 加载环境变量
-load_dotenv()
+# Supabase 客户端及数据库线程池（同时负责加载环境变量）
+from db import supabase, execute, execute_all, run_sync
+from cache import ITEM_TYPES, classification_cache, classification_key
+from singleflight import SingleFlight
+from food_index import build_index, build_whitelist, build_blacklist, classification_from_row, normalize_name
+# 预设食物索引和食谱编译为内存映射文件，多个 worker 进程共享同一份
+from catalog import DEFAULT_CATALOG_PATH, open_catalog
+from payloads import PrebuiltPayload, dumps
+from recipe_stream import RecipeStreamParser
+from recipe_pool import RecipePool, is_valid_recipe, recipe_from_row
+from aggregates import AggregateStore, UserAggregates, PERIODS
+from records import complete_row, decode_body, encode_body, parse_timestamp, record_to_row, row_to_record
+from reports import ReportJobQueue, ReportRejected, ReportTooLarge
+# 本地验证 Supabase 访问令牌（签名 + 过期时间），验证结果按令牌缓存
+from auth import current_user, optional_user, request_user, resolve_user_id, token_verifier
+# 调用 Gemini 的路径按 IP / 用户限流，超限时用缓存、本地数据或预设结果应答
+from ratelimit import client_ip, rate_limiter
+# 请求耗时、分类各阶段耗时、分类命中层级和上游调用的指标，由 /metrics 导出
+from metrics import CLASSIFY_STAGE_SECONDS, CLASSIFY_TIER, MetricsMiddleware, registry
+# 共享的 Gemini 客户端（模型复用、并发限制、超时重试和熔断）
+from llm import llm, load_genai, LLMUnavailable
+from schemas import (
+    ActivityClassification, DailyRecord, Recipe, ReportAnalysis,
+    CLASSIFICATION_RESPONSE_SCHEMA, RECIPE_RESPONSE_SCHEMA, REPORT_RESPONSE_SCHEMA
+)
 
-# 获取 Supabase 配置
-url: str = os.environ.get("SUPABASE_URL")
-key: str = os.environ.get("SUPABASE_KEY")
-gemini_key: str = os.environ.get("GEMINI_API_KEY")
+# 所有 JSON 响应用 orjson 序列化
+app = FastAPI(default_response_class=ORJSONResponse)
 
-if not url or not key or "your_supabase" in url:
-    print("警告: 未检测到有效的 SUPABASE_URL 或 SUPABASE_KEY，请检查 .env 文件")
+# 模糊匹配得分不低于该阈值时直接采用，不再调用 Gemini
+FUZZY_MATCH_THRESHOLD = float(os.environ.get("FUZZY_MATCH_THRESHOLD", "0.8"))
 
-# 初始化 Supabase 客户端
-supabase: Client = create_client(url, key) if url and key and "your_supabase" not in url else None
+# 与已分类食物的 n-gram 余弦相似度不低于该阈值时，沿用最相似条目的分类，不再调用 Gemini
+SIMILAR_MATCH_THRESHOLD = float(os.environ.get("SIMILAR_MATCH_THRESHOLD", "0.75"))
+SIMILAR_CACHE_SIZE = int(os.environ.get("SIMILAR_CACHE_SIZE", "100000"))
 
-# 初始化 Gemini 客户端
-if gemini_key:
-    genai.configure(api_key=gemini_key)
-ai_client = genai if gemini_key else None
+# 批量分类的单次请求条目上限，以及调用 Gemini 的并发上限
+BATCH_MAX_ITEMS = int(os.environ.get("BATCH_MAX_ITEMS", "50"))
+BATCH_AI_CONCURRENCY = int(os.environ.get("BATCH_AI_CONCURRENCY", "4"))
 
-app = FastAPI()
+# 黑白名单等目录数据的定时刷新间隔（秒，0 表示只在启动和 Webhook 通知时刷新）及客户端缓存时间
+CATALOG_REFRESH_INTERVAL = float(os.environ.get("CATALOG_REFRESH_INTERVAL", "600"))
+CATALOG_MAX_AGE = int(os.environ.get("CATALOG_MAX_AGE", "300"))
 
-# 配置 CORS，允许前端访问
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # 在生产环境中应该限制为前端的实际 URL
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# 趋势分析最多读取的历史天数
+TRENDS_MAX_DAYS = int(os.environ.get("TRENDS_MAX_DAYS", "3650"))
+
+# 记录同步的单次条数上限和请求体（解压后）大小上限
+SYNC_MAX_RECORDS = int(os.environ.get("SYNC_MAX_RECORDS", "1000"))
+SYNC_MAX_BYTES = int(os.environ.get("SYNC_MAX_BYTES", str(5 * 1024 * 1024)))
+SYNC_OVERLAP_SECONDS = float(os.environ.get("SYNC_OVERLAP_SECONDS", "60"))
+
+# 分类请求合并器
+classify_flight = SingleFlight()
+
+# 每个用户的日/周/月增量聚合，首次读取时回填，同一用户的并发回填合并为一次
+aggregate_store = AggregateStore(max_users=int(os.environ.get("AGGREGATES_MAX_USERS", "1000")))
+aggregate_flight = SingleFlight()
+
+def install_cors(target: FastAPI):
+    """CORS 中间件；app.py 的外层应用也用它，使外层自己的路由同样允许跨域访问"""
+    # 配置 CORS，允许前端访问
+    target.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # 在生产环境中应该限制为前端的实际 URL
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+def install_middleware(target: FastAPI):
+    """CORS 和请求指标中间件"""
+    install_cors(target)
+    target.add_middleware(MetricsMiddleware)
+
+install_middleware(app)
 
 # 定义请求模型
 class UserLogin(BaseModel):
@@ -46,249 +96,688 @@ class QueryItem(BaseModel):
     query: str
     type: str = "food"  # food, activity, medicine
 
+    @field_validator("query")
+    @classmethod
+    def _check_query(cls, value: str) -> str:
+        # 只有空白或标点的查询规范化后为空，不应进入数据库查询和 Gemini
+        if not normalize_name(value):
+            raise ValueError("query 不能为空")
+        return value
+
+class BatchQuery(BaseModel):
+    items: List[QueryItem] = Field(..., min_length=1, max_length=BATCH_MAX_ITEMS)
+
+class SyncRequest(BaseModel):
+    user_id: Optional[str] = None  # 兼容旧客户端，已忽略：只同步令牌中的用户
+    since: Optional[str] = None  # 上次同步返回的水位线，为空表示首次同步
+    records: List[DailyRecord] = Field([], max_length=SYNC_MAX_RECORDS)
+
+    @field_validator("since")
+    @classmethod
+    def _check_since(cls, value: Optional[str]) -> Optional[str]:
+        if value:
+            try:
+                parse_timestamp(value)
+            except ValueError:
+                raise ValueError("since 必须是 ISO 格式的时间戳")
+        return value
+
+class TrendQuery(BaseModel):
+    user_id: Optional[str] = None  # 只用于与令牌核对；历史记录按令牌中的用户读取
+    records: List[DailyRecord] = []  # 客户端本地的记录，同一天覆盖数据库中的记录
+    days: int = Field(90, ge=1, le=TRENDS_MAX_DAYS)
+    window: int = Field(7, ge=2, le=90)
+    use_ai: bool = False  # 是否用 Gemini 润色总结
+
 # 路由定义
 @app.get("/")
 def read_root():
     return {"message": "Kidney Compass Backend is running!"}
 
 @app.post("/api/classify")
-async def classify_item(item: QueryItem):
-    # 首先尝试从数据库中查找
+async def classify_item(item: QueryItem, request: Request, claims: Optional[dict] = Depends(request_user)):
+    # 首先查询分类缓存
+    cache_key = classification_key(item.query, item.type)
+    with CLASSIFY_STAGE_SECONDS.time("cache"):
+        cached = classification_cache.get(cache_key)
+    if cached is not None:
+        CLASSIFY_TIER.inc("cache")
+        return cached
+
+    # 只有需要调用 Gemini 时才消耗限流令牌
+    ip, user = client_ip(request), claims and claims["sub"]
+    admit = lambda: rate_limiter.allow("classify", ip, user)
+
+    # 相同查询的并发请求合并为一次数据库查询 / Gemini 调用 / 数据库写入
+    return await classify_flight.do(
+        cache_key, lambda: _classify_and_cache(item, cache_key, functools.partial(_classify_uncached, admit=admit))
+    )
+
+async def _classify_and_cache(item: QueryItem, cache_key: str, resolve=None):
+    result, cacheable = await (resolve or _classify_uncached)(item)
+    if cacheable:
+        classification_cache.set(cache_key, result)
+    return result
+
+async def _classify_uncached(item: QueryItem, admit=None):
+    """
+    依次查询本地索引、数据库、营养成分表、模糊匹配和 Gemini，返回 (分类结果, 是否可缓存)；
+    admit() 返回 False（被限流）时不调用 Gemini，直接返回不缓存的默认结果
+    """
+    # 首先查询本地索引（预设数据 + 启动时加载的数据库分类和黑白名单），O(1) 且支持规范化和同义词
+    with CLASSIFY_STAGE_SECONDS.time("local_index"):
+        local_result = food_index.lookup(item.query)
+    if local_result is not None:
+        CLASSIFY_TIER.inc("local_index")
+        return local_result, True
+
+    # 再查询数据库中启动后新增的分类
     if supabase:
         try:
-            response = supabase.table("food_classifications").select("*").eq("food_name", item.query).execute()
+            with CLASSIFY_STAGE_SECONDS.time("db_lookup"):
+                response = await execute(supabase.table("food_classifications").select("*").eq("food_name", item.query))
             if response.data and len(response.data) > 0:
                 # 从数据库返回结果
-                db_result = response.data[0]
-                return {
-                    "name": db_result.get("food_name"),
-                    "level": db_result.get("level"),
-                    "reason": db_result.get("reason"),
-                    "advice": db_result.get("advice")
-                }
+                CLASSIFY_TIER.inc("database")
+                return classification_from_row(response.data[0]), True
         except Exception as e:
             print(f"数据库查询错误: {e}")
     
-    # 如果数据库查询失败或没有结果，使用预设数据
-    # 检查是否在预设食物列表中
-    for food_item in FOOD_ITEMS:
-        if food_item["name"] == item.query:
-            return food_item
-    
-    # 如果不在预设列表中，使用 Gemini API 分类
-    if ai_client:
+    # 再用本地营养成分表按规则分级（微秒级，结果确定）
+    with CLASSIFY_STAGE_SECONDS.time("nutrients"):
+        nutrient_result = _classify_by_nutrients(item)
+    if nutrient_result is not None:
+        CLASSIFY_TIER.inc("nutrients")
+        return nutrient_result, True
+
+    # 精确匹配都失败时，使用高置信度的模糊匹配，避免调用 LLM
+    with CLASSIFY_STAGE_SECONDS.time("fuzzy"):
+        fuzzy_result = _classify_fuzzy(item)
+    if fuzzy_result is not None:
+        CLASSIFY_TIER.inc("fuzzy")
+        return fuzzy_result, True
+
+    # 同一种食物的其他说法（"蒸鲈鱼" / "清蒸鲈鱼块"）沿用最相似的已分类条目
+    with CLASSIFY_STAGE_SECONDS.time("similar"):
+        similar_result = _classify_similar(item)
+    if similar_result is not None:
+        CLASSIFY_TIER.inc("similar")
+        return similar_result, True
+
+    # 如果本地和数据库都没有结果，使用 Gemini API 分类
+    if admit is not None and not admit():
+        CLASSIFY_TIER.inc("rate_limited")
+        return _rate_limited_result(item), False
+    return await _classify_with_ai(item)
+
+def _rate_limited_result(item: QueryItem):
+    return {
+        "name": item.query,
+        "level": "yellow",
+        "reason": "请求过于频繁，暂时无法进行 AI 分析，请稍后重试",
+        "advice": "建议咨询医生或营养师"
+    }
+
+def _classify_by_nutrients(item: QueryItem):
+    if item.type != "food":
+        return None
+    return _nutrient_table().classify(item.query)
+
+def _classify_fuzzy(item: QueryItem):
+    # 只按 n-gram 相似度打分，不加自动补全的前缀分：未输完的 "西兰" 不能当作 "西兰花" 分类
+    candidates = food_index.search(item.query, limit=1, prefix_bonus=False)
+    if not candidates or candidates[0][0] < FUZZY_MATCH_THRESHOLD:
+        return None
+    score, key, result = candidates[0]
+    # 名称保持用户的查询，与近似重复缓存一样附带所沿用的条目
+    return {**result, "name": item.query, "matched": {"name": result.get("name") or key, "similarity": round(score, 3)}}
+
+def _classify_similar(item: QueryItem):
+    from similarity import adds_modifier
+
+    match = _similar_index().nearest(item.query)
+    if match is None or match[0] < SIMILAR_MATCH_THRESHOLD:
+        return None
+    similarity, name, result = match
+    # 多了腌、炸、卤等做法的说法不是同一种食物（"咸鸭蛋黄" 的钠远高于 "鸭蛋黄"），交给后面的分类
+    if adds_modifier(item.query, name):
+        return None
+    # 附带所沿用的条目和相似度，客户端可以提示"按 xx 的分类"
+    return {**result, "name": item.query, "matched": {"name": name, "similarity": round(similarity, 3)}}
+
+async def _classify_with_ai(item: QueryItem):
+    """调用 Gemini 分类并保存到数据库，返回 (分类结果, 是否可缓存)"""
+    if llm.available:
         try:
-            # 构建 Gemini API 请求
-            model = genai.GenerativeModel('gemini-2.0-flash')
-            
-            # 系统提示
-            system_prompt = ("你是一位专注于肾脏健康的医疗专家，精通慢性肾病（CKD）患者的饮食管理。"  
-                           "请对用户提供的食物进行分类，并基于其对肾脏健康的影响给出明确的指导。"  
-                           "分类标准："  
-                           "- 绿色（green）：对所有 CKD 患者（包括透析患者）安全，推荐食用。"  
-                           "- 黄色（yellow）：需在医生或营养师指导下，根据个人肾功能和当前阶段控制食用量。"  
-                           "- 红色（red）：对大多数 CKD 患者（尤其是中晚期患者）不推荐食用，应避免。"  
-                           "分析维度："  
-                           "1. 蛋白质含量（过高会增加肾脏负担）"  
-                           "2. 钠含量（过高会导致血压升高，加重水肿）"  
-                           "3. 钾含量（肾功能不全时易引发高血钾）"  
-                           "4. 磷含量（肾功能不全时易引发高血磷）"  
-                           "5. 其他可能对肾脏产生影响的成分。"  
-                           "回答要求："  
-                           "- 明确给出分类结果（仅 green、yellow 或 red）。"  
-                           "- 详细说明分类理由，特别是基于上述五个维度的分析。"  
-                           "- 提供针对 CKD 患者的具体饮食建议，包括食用量、烹饪方法等。"  
-                           "- 使用专业、客观的医学术语，同时确保表达清晰易懂。"  
-                           "- 如遇不确定情况，请基于现有医学知识给出最合理的判断，并建议用户咨询其主治医生。"  
-                           "- 输出格式："  
-                           "  name: [食物名称]\n"  
-                           "  level: [green/yellow/red]\n"  
-                           "  reason: [分类理由]\n"  
-                           "  advice: [饮食建议]")
-            
-            # 用户提示
+            # 用户提示（系统提示已通过 system_instruction 设置在共享模型上）
             user_prompt = f"请对以下食物进行分类：{item.query}"
             
-            # 生成响应
-            response = model.generate_content(
-                [system_prompt, user_prompt]
-            )
-            
-            # 解析响应
-            response_text = response.text
-            lines = response_text.strip().split('\n')
-            
-            result = {
-                "name": item.query,
-                "level": "yellow",  # 默认值
-                "reason": "AI 分析未返回有效结果",
-                "advice": "建议咨询医生或营养师"
-            }
-            
-            for line in lines:
-                line = line.strip()
-                if line.startswith('level:'):
-                    level = line.split(':', 1)[1].strip().lower()
-                    if level in ['green', 'yellow', 'red']:
-                        result['level'] = level
-                elif line.startswith('reason:'):
-                    result['reason'] = line.split(':', 1)[1].strip()
-                elif line.startswith('advice:'):
-                    result['advice'] = line.split(':', 1)[1].strip()
+            # JSON 输出模式，直接校验为 ActivityClassification（校验耗时见 llm_parse_duration_seconds）
+            with CLASSIFY_STAGE_SECONDS.time("gemini"):
+                classification = await llm.generate_json("classify", user_prompt, ActivityClassification)
+            result = classification.model_dump()
+            result["name"] = item.query
             
             # 保存到数据库
             if supabase:
                 try:
-                    supabase.table("food_classifications").insert({
-                        "food_name": item.query,
-                        "level": result["level"],
-                        "reason": result["reason"],
-                        "advice": result["advice"]
-                    }).execute()
+                    with CLASSIFY_STAGE_SECONDS.time("db_insert"):
+                        await execute(supabase.table("food_classifications").insert({
+                            "food_name": item.query,
+                            "level": result["level"],
+                            "reason": result["reason"],
+                            "advice": result["advice"]
+                        }))
                 except Exception as e:
                     print(f"数据库保存错误: {e}")
             
-            return result
+            food_index.add(item.query, result)
+            _similar_index().add(item.query, result)
+            CLASSIFY_TIER.inc("gemini")
+            return result, True
             
+        except LLMUnavailable as e:
+            CLASSIFY_TIER.inc("fallback")
+            # Gemini 故障或熔断中：立即返回默认结果，不等待超时
+            print(f"AI 分析不可用: {e}")
+            return {
+                "name": item.query,
+                "level": "yellow",
+                "reason": "AI 服务暂时不可用，请稍后重试",
+                "advice": "建议咨询医生或营养师"
+            }, False
         except Exception as e:
             print(f"AI 分析错误: {e}")
+            CLASSIFY_TIER.inc("fallback")
             # 返回默认结果
             return {
                 "name": item.query,
                 "level": "yellow",
                 "reason": f"AI 分析失败: {str(e)}",
                 "advice": "建议咨询医生或营养师"
-            }
+            }, False
     else:
         # 没有 AI 客户端，返回默认结果
+        CLASSIFY_TIER.inc("fallback")
         return {
             "name": item.query,
             "level": "yellow",
             "reason": "AI 服务不可用",
             "advice": "建议咨询医生或营养师"
-        }
+        }, False
+
+# 批量分类
+@app.post("/api/classify/batch")
+async def classify_batch(batch: BatchQuery, request: Request, claims: Optional[dict] = Depends(request_user)):
+    """
+    批量分类：缓存和本地索引批量命中，数据库未命中项合并为一次 in_ 查询，
+    其余项以有限并发调用 Gemini。结果按输入顺序以 NDJSON 逐行流式返回。
+    """
+    items = batch.items
+    keys = [classification_key(item.query, item.type) for item in items]
+    results = [None] * len(items)
+
+    # 1. 缓存和本地索引
+    pending = []
+    for i, (item, cache_key) in enumerate(zip(items, keys)):
+        result = classification_cache.get(cache_key)
+        if result is not None:
+            CLASSIFY_TIER.inc("cache")
+        else:
+            result = food_index.lookup(item.query)
+            if result is not None:
+                CLASSIFY_TIER.inc("local_index")
+                classification_cache.set(cache_key, result)
+        if result is None:
+            pending.append(i)
+        else:
+            results[i] = result
+
+    # 2. 数据库：所有未命中项合并为一次查询
+    if pending and supabase:
+        names = sorted({items[i].query for i in pending})
+        rows = {}
+        try:
+            response = await execute(supabase.table("food_classifications").select("*").in_("food_name", names))
+            rows = {row.get("food_name"): row for row in response.data or []}
+        except Exception as e:
+            print(f"数据库批量查询错误: {e}")
+        remaining = []
+        for i in pending:
+            row = rows.get(items[i].query)
+            if row:
+                CLASSIFY_TIER.inc("database")
+                results[i] = classification_from_row(row)
+                classification_cache.set(keys[i], results[i])
+            else:
+                remaining.append(i)
+        pending = remaining
+
+    # 3. 营养成分规则分级，其次是高置信度模糊匹配和相似条目
+    remaining = []
+    for i in pending:
+        results[i] = _classify_by_nutrients(items[i])
+        tier = "nutrients"
+        if results[i] is None:
+            results[i] = _classify_fuzzy(items[i])
+            tier = "fuzzy"
+        if results[i] is None:
+            results[i] = _classify_similar(items[i])
+            tier = "similar"
+        if results[i] is None:
+            remaining.append(i)
+        else:
+            CLASSIFY_TIER.inc(tier)
+            classification_cache.set(keys[i], results[i])
+    pending = remaining
+
+    # 4. Gemini：相同的键只调用一次，并发数受 BATCH_AI_CONCURRENCY 限制
+    semaphore = asyncio.Semaphore(BATCH_AI_CONCURRENCY)
+
+    async def classify_with_limit(i):
+        async with semaphore:
+            return await classify_flight.do(
+                keys[i], lambda: _classify_and_cache(items[i], keys[i], _classify_with_ai)
+            )
+
+    # 每个不同的键消耗一个限流令牌，超限的项直接返回默认结果
+    ip, user = client_ip(request), claims and claims["sub"]
+    tasks = {}
+    limited = {}
+    for i in pending:
+        if keys[i] in tasks or keys[i] in limited:
+            continue
+        if rate_limiter.allow("classify", ip, user):
+            tasks[keys[i]] = asyncio.ensure_future(classify_with_limit(i))
+        else:
+            CLASSIFY_TIER.inc("rate_limited")
+            limited[keys[i]] = _rate_limited_result(items[i])
+
+    async def stream():
+        try:
+            for i, item in enumerate(items):
+                if results[i] is not None:
+                    result = results[i]
+                elif keys[i] in limited:
+                    result = limited[keys[i]]
+                else:
+                    result = await tasks[keys[i]]
+                yield dumps({"index": i, "query": item.query, "result": result}) + b"\n"
+        finally:
+            for task in tasks.values():
+                task.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+# 食物名称模糊/前缀搜索
+@app.get("/api/foods/search")
+async def search_foods(q: str, limit: int = 10):
+    candidates = food_index.search(q, limit=max(1, min(limit, 50)))
+    return {
+        "query": q,
+        "results": [
+            {"name": result["name"], "level": result["level"], "score": round(score, 3)}
+            for score, _, result in candidates
+        ]
+    }
 
 @app.post("/api/recipe")
-async def generate_recipe():
-    # 首先尝试从数据库中获取
+async def generate_recipe(request: Request, x_session_id: str = Header(default=""),
+                          claims: Optional[dict] = Depends(request_user)):
+    # 从预生成的食谱池中随机取一个，同一会话内不重复；池由后台任务补充，不在请求中调用 LLM。
+    # 只有发放新生成的食谱（池需要调用 Gemini 补充）时才消耗限流令牌，被限流时只从已有食谱中选取
+    ip, user = client_ip(request), claims and claims["sub"]
+    recipe = recipe_pool.take(x_session_id or None, admit=lambda: rate_limiter.allow("recipe", ip, user))
+    return recipe if recipe is not None else random.choice(RECIPES)
+
+async def _generate_recipe_with_ai():
+    """调用 Gemini 生成一个新食谱，供食谱池的后台任务使用"""
+    recipe = await llm.generate_json("recipe", RECIPE_USER_PROMPT, Recipe)
+    return recipe.model_dump()
+
+async def _save_recipe(result: dict):
     if supabase:
         try:
-            response = supabase.table("recipes").select("*").limit(1).execute()
-            if response.data and len(response.data) > 0:
-                # 从数据库返回结果
-                db_result = response.data[0]
-                return {
-                    "dishName": db_result.get("dish_name"),
-                    "tags": db_result.get("tags", "").split(","),
-                    "ingredients": db_result.get("ingredients", "").split(","),
-                    "steps": db_result.get("steps", "").split(","),
-                    "nutritionBenefit": db_result.get("nutrition_benefit")
-                }
+            await execute(supabase.table("recipes").insert({
+                "dish_name": result["dishName"],
+                "tags": ",".join(result["tags"]),
+                "ingredients": ",".join(result["ingredients"]),
+                "steps": ",".join(result["steps"]),
+                "nutrition_benefit": result["nutritionBenefit"]
+            }))
+        except Exception as e:
+            print(f"数据库保存错误: {e}")
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {dumps(data).decode()}\n\n"
+
+# 流式生成食谱（Server-Sent Events）
+@app.get("/api/recipe/stream")
+async def stream_recipe(request: Request, claims: Optional[dict] = Depends(request_user)):
+    """
+    使用 Gemini 的流式输出，每解析出一个完整字段就推送一个 field 事件，
+    最后推送包含完整食谱的 done 事件。AI 不可用、被限流或出错时，done 事件携带已有食谱。
+    """
+    admitted = llm.available and rate_limiter.allow("recipe", client_ip(request), claims and claims["sub"])
+
+    async def events():
+        # 先发送 start 事件，让客户端立即收到响应头
+        yield _sse("start", {})
+
+        if not admitted:
+            yield _sse("done", recipe_pool.take(fresh=False) or random.choice(RECIPES))
+            return
+
+        try:
+            parser = RecipeStreamParser()
+            async for text in llm.stream("recipe_stream", RECIPE_USER_PROMPT):
+                for field, value in parser.feed(text):
+                    yield _sse("field", {"field": field, "value": value})
+            for field, value in parser.close():
+                yield _sse("field", {"field": field, "value": value})
+
+            yield _sse("done", parser.result)
+            if is_valid_recipe(parser.result):
+                recipe_pool.add_known([parser.result])
+                await _save_recipe(parser.result)
+        except Exception as e:
+            print(f"AI 食谱流式生成错误: {e}")
+            yield _sse("error", {"detail": "AI 食谱生成失败，已返回预设食谱"})
+            yield _sse("done", random.choice(RECIPES))
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# 健康记录趋势分析
+@app.post("/api/analysis/trends")
+async def analyze_health_trends(query: TrendQuery, request: Request, claims: Optional[dict] = Depends(optional_user)):
+    """
+    一次查询读取用户最近 days 天的 daily_records，与客户端提交的记录合并后，
+    用 NumPy 对整段序列做向量化统计，返回 HealthAnalysis。只有 use_ai 时才调用 Gemini 润色总结。
+    服务端记录只按令牌中的用户读取；未携带令牌时只分析客户端提交的记录，忽略请求中的 user_id。
+    """
+    user_id = resolve_user_id(claims, query.user_id) if claims else None
+    rows = []
+    if user_id and supabase:
+        since = (datetime.date.today() - datetime.timedelta(days=query.days - 1)).isoformat()
+        try:
+            response = await execute(
+                supabase.table("daily_records")
+                .select("date,weight,systolic,diastolic,edema,hematuria,foamy_urine,water_intake")
+                .eq("user_id", user_id)
+                .gte("date", since)
+                .order("date", desc=True)
+                .limit(query.days)
+            )
+            # 按日期倒序并显式限制条数（每天一条）：PostgREST 默认最多返回 1000 行，升序读取会丢掉最近的记录
+            rows = (response.data or [])[::-1]
         except Exception as e:
             print(f"数据库查询错误: {e}")
-    
-    # 如果数据库查询失败或没有结果，使用预设数据
-    import random
-    recipe = random.choice(RECIPES)
-    
-    # 如果有 AI 客户端，尝试生成新食谱
-    if ai_client:
+
+    # trends 依赖 NumPy（导入约 0.1 秒），第一次分析时才导入
+    from trends import analyze_trends, merge_records
+
+    records = merge_records(rows, [record.model_dump() for record in query.records])
+    analysis = await run_sync(analyze_trends, records, query.window)
+
+    if query.use_ai and records and rate_limiter.allow("trends", client_ip(request), user_id):
+        analysis["summary"] = await _phrase_trend_summary(analysis)
+    return analysis
+
+async def _phrase_trend_summary(analysis: dict) -> str:
+    """用 Gemini 把统计结果改写成更自然的总结；失败时保留规则生成的总结"""
+    prompt = (f"统计结果：{json.dumps(analysis['metrics'], ensure_ascii=False)}\n"
+              f"规则总结：{analysis['summary']}\n趋势：{analysis['trend']}")
+    try:
+        response = await llm.generate("trend_summary", prompt)
+        return response.text.strip() or analysis["summary"]
+    except (LLMUnavailable, ValueError) as e:
+        print(f"AI 总结不可用: {e}")
+        return analysis["summary"]
+
+# 健康记录批量同步
+@app.post("/api/records/sync")
+async def sync_records(request: Request, claims: dict = Depends(current_user)):
+    """
+    客户端一次上传上次同步以来的本地记录（请求体可用 gzip 压缩），服务端一次 upsert 写入 daily_records，
+    再一次查询返回水位线之后服务端的变化（不含本次上传的日期），响应在客户端接受时 gzip 压缩。
+    需要访问令牌，只读写令牌中的用户的记录。
+    """
+    if not supabase:
+        return ORJSONResponse(
+            status_code=503,
+            content={"detail": "数据库服务暂时不可用"}
+        )
+
+    user_id = claims["sub"]
+    try:
+        payload = decode_body(await request.body(), request.headers.get("content-encoding"), SYNC_MAX_BYTES)
+        sync = SyncRequest.model_validate(payload)
+    except ValidationError as e:
+        return ORJSONResponse(status_code=422, content={"detail": e.errors(include_url=False, include_context=False)})
+    except ValueError as e:
+        return ORJSONResponse(status_code=400, content={"detail": f"无效的请求体: {e}"})
+
+    # 同一天只保留最后一条；updated_at 作为下次同步的水位线依据，
+    # 数据库按 README 配置了触发器时由数据库时钟覆盖，这里的值只在没有触发器时生效
+    now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    rows = {}
+    for record in sync.records:
+        rows[record.date[:10]] = {**record_to_row(record.model_dump(), user_id), "updated_at": now}
+
+    try:
+        if rows:
+            # 只上传部分字段的记录沿用已存储的值补全，各行的列相同才能一次批量 upsert
+            existing = await execute(
+                supabase.table("daily_records").select("*").eq("user_id", user_id).in_("date", list(rows))
+            )
+            stored = {str(row["date"])[:10]: row for row in existing.data or []}
+            rows = {date: complete_row(row, stored.get(date)) for date, row in rows.items()}
+            await execute(
+                supabase.table("daily_records")
+                .upsert(list(rows.values()), on_conflict="user_id,date", returning="minimal")
+            )
+        query = supabase.table("daily_records").select("*").eq("user_id", user_id)
+        if sync.since:
+            # updated_at 在事务开始时确定，提交可能更晚：并发同步中较早时间戳的行可能在水位线推进之后才可见，
+            # 因此从水位线往前多读 SYNC_OVERLAP_SECONDS 秒，重复返回的行由客户端按 (date, updatedAt) 去重
+            overlap_start = parse_timestamp(sync.since) - datetime.timedelta(seconds=SYNC_OVERLAP_SECONDS)
+            query = query.gt("updated_at", overlap_start.isoformat())
+        response = await execute(query.order("updated_at"))
+    except Exception as e:
+        print(f"记录同步错误: {e}")
+        return ORJSONResponse(
+            status_code=500,
+            content={"detail": "同步失败，请稍后重试"}
+        )
+
+    for row in rows.values():
+        aggregate_store.apply(user_id, row)
+
+    server_rows = response.data or []
+    # 水位线不后退：重叠窗口内的行可能早于上次的水位线
+    watermark = max(
+        (row["updated_at"] for row in server_rows if row.get("updated_at")),
+        default=sync.since or now, key=parse_timestamp
+    )
+    if sync.since and parse_timestamp(watermark) < parse_timestamp(sync.since):
+        watermark = sync.since
+    body, headers = encode_body({
+        "watermark": watermark,
+        "upserted": len(rows),
+        "changes": [row_to_record(row) for row in server_rows if str(row.get("date"))[:10] not in rows]
+    }, request.headers.get("accept-encoding"))
+    return Response(body, media_type="application/json", headers=headers)
+
+# 化验报告图片分析：上传后立即返回任务 ID，后台 worker 调用 Gemini 分析
+@app.post("/api/reports", status_code=202)
+async def submit_report(request: Request, claims: Optional[dict] = Depends(request_user)):
+    content_type = (request.headers.get("content-type") or "").split(";")[0].strip()
+    if not content_type.startswith("image/"):
+        return ORJSONResponse(
+            status_code=415,
+            content={"detail": "请上传图片（Content-Type 为 image/*）"}
+        )
+    if not llm.available:
+        return ORJSONResponse(
+            status_code=503,
+            content={"detail": "AI 服务不可用"}
+        )
+
+    # 相同图片已有结果时直接返回，只有需要新分析时才消耗限流令牌
+    ip, user = client_ip(request), claims and claims["sub"]
+    try:
+        job = await report_queue.submit(
+            request.stream(), content_type, admit=lambda: rate_limiter.allow("report", ip, user)
+        )
+    except ReportTooLarge as e:
+        return ORJSONResponse(status_code=413, content={"detail": str(e)})
+    except ReportRejected:
+        return ORJSONResponse(status_code=429, content={"detail": "请求过于频繁，请稍后再上传报告"})
+    return job.to_dict()
+
+# 查询报告分析任务；Accept: text/event-stream 时以 SSE 推送状态变化，直到完成
+@app.get("/api/reports/{job_id}")
+async def get_report(job_id: str, request: Request):
+    job = report_queue.get(job_id)
+    if job is None:
+        return ORJSONResponse(
+            status_code=404,
+            content={"detail": "任务不存在或已过期"}
+        )
+    if "text/event-stream" not in request.headers.get("accept", ""):
+        return job.to_dict()
+
+    async def events():
+        yield _sse("status", job.to_dict())
+        while not job.finished.is_set():
+            if await job.wait_change(REPORT_SSE_HEARTBEAT):
+                yield _sse("status", job.to_dict())
+            else:
+                yield ": heartbeat\n\n"
+        yield _sse("done" if job.status == "done" else "error", job.to_dict())
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def _analyze_report(path: str, content_type: str) -> dict:
+    """读取临时文件中的图片，调用 Gemini 多模态模型提取指标"""
+    def read():
+        with open(path, "rb") as f:
+            return f.read()
+
+    image = await run_sync(read)
+    analysis = await llm.generate_json(
+        "report",
+        [REPORT_USER_PROMPT, {"mime_type": content_type, "data": image}],
+        ReportAnalysis
+    )
+    return analysis.model_dump()
+
+# 健康记录的日/周/月聚合（仪表盘使用，读取量与桶数成正比，与历史天数无关）
+@app.get("/api/records/aggregates")
+async def get_record_aggregates(user_id: Optional[str] = None, period: str = "week", limit: int = 12,
+                                claims: dict = Depends(current_user)):
+    # 只返回令牌中的用户的聚合；user_id 只用于与令牌核对
+    user_id = resolve_user_id(claims, user_id)
+    if period not in PERIODS:
+        return ORJSONResponse(
+            status_code=400,
+            content={"detail": f"period 必须是 {', '.join(PERIODS)} 之一"}
+        )
+    aggregates = await _load_aggregates(user_id)
+    return {
+        "user_id": user_id,
+        "period": period,
+        "buckets": aggregates.series(period, max(1, min(limit, 366)))
+    }
+
+async def _load_aggregates(user_id: str) -> UserAggregates:
+    # 先用一次带索引的小查询核对版本：其他 worker 写入或删除过记录时重新回填
+    version = await _aggregate_version(user_id)
+    aggregates = aggregate_store.get(user_id, version)
+    if aggregates is not None:
+        return aggregates
+    return await aggregate_flight.do(user_id, lambda: _backfill_aggregates(user_id, version))
+
+async def _aggregate_version(user_id: str):
+    """daily_records 中该用户的 (记录数, 最大 updated_at)；查询失败时返回 None，沿用已有结果"""
+    if not supabase:
+        return None
+    try:
+        response = await execute(
+            supabase.table("daily_records")
+            .select("updated_at", count="exact")
+            .eq("user_id", user_id)
+            .order("updated_at", desc=True)
+            .limit(1)
+        )
+    except Exception as e:
+        print(f"数据库查询错误: {e}")
+        return None
+    latest = response.data[0].get("updated_at") if response.data else None
+    return response.count, latest
+
+async def _backfill_aggregates(user_id: str, version=None) -> UserAggregates:
+    """从 daily_records 读取用户的全部记录，从头重建聚合"""
+    rows = []
+    if supabase:
         try:
-            # 构建 Gemini API 请求
-            model = genai.GenerativeModel('gemini-2.0-flash')
-            
-            # 系统提示
-            system_prompt = ("你是一位专业的肾脏健康营养师，擅长为慢性肾病（CKD）患者设计食谱。"  
-                           "请基于以下原则创建一个适合 CKD 患者的健康食谱："  
-                           "1. 低蛋白质（对于未透析患者）或适量优质蛋白（对于透析患者）"  
-                           "2. 低钠、低钾、低磷"  
-                           "3. 富含必需氨基酸和维生素"  
-                           "4. 易于准备，食材常见"  
-                           "5. 美味可口，适合长期食用"  
-                           "请提供："  
-                           "- 菜名"  
-                           "- 适合人群标签（如：低蛋白、低磷、低钠、低钾等）"  
-                           "- 详细的食材清单及用量"  
-                           "- 详细的烹饪步骤"  
-                           "- 营养价值和对肾脏健康的益处"  
-                           "输出格式："  
-                           "  dishName: [菜名]\n"  
-                           "  tags: [标签1], [标签2], ...\n"  
-                           "  ingredients: [食材1], [食材2], ...\n"  
-                           "  steps: [步骤1], [步骤2], ...\n"  
-                           "  nutritionBenefit: [营养价值和益处]")
-            
-            # 用户提示
-            user_prompt = "请生成一个适合 CKD 患者的健康食谱"
-            
-            # 生成响应
-            response = model.generate_content(
-                [system_prompt, user_prompt]
+            # PostgREST 单次最多返回 1000 行，逐页读取全部历史
+            rows = await execute_all(
+                lambda: supabase.table("daily_records")
+                .select("date,weight,systolic,diastolic,water_intake")
+                .eq("user_id", user_id)
+                .order("date")
             )
-            
-            # 解析响应
-            response_text = response.text
-            lines = response_text.strip().split('\n')
-            
-            result = {
-                "dishName": "未知菜品",
-                "tags": [],
-                "ingredients": [],
-                "steps": [],
-                "nutritionBenefit": ""
-            }
-            
-            for line in lines:
-                line = line.strip()
-                if line.startswith('dishName:'):
-                    result['dishName'] = line.split(':', 1)[1].strip()
-                elif line.startswith('tags:'):
-                    tags_str = line.split(':', 1)[1].strip()
-                    result['tags'] = [tag.strip() for tag in tags_str.split(',')]
-                elif line.startswith('ingredients:'):
-                    ingredients_str = line.split(':', 1)[1].strip()
-                    result['ingredients'] = [ingredient.strip() for ingredient in ingredients_str.split(',')]
-                elif line.startswith('steps:'):
-                    steps_str = line.split(':', 1)[1].strip()
-                    result['steps'] = [step.strip() for step in steps_str.split(',')]
-                elif line.startswith('nutritionBenefit:'):
-                    result['nutritionBenefit'] = line.split(':', 1)[1].strip()
-            
-            # 保存到数据库
-            if supabase:
-                try:
-                    supabase.table("recipes").insert({
-                        "dish_name": result["dishName"],
-                        "tags": ",".join(result["tags"]),
-                        "ingredients": ",".join(result["ingredients"]),
-                        "steps": ",".join(result["steps"]),
-                        "nutrition_benefit": result["nutritionBenefit"]
-                    }).execute()
-                except Exception as e:
-                    print(f"数据库保存错误: {e}")
-            
-            return result
-            
         except Exception as e:
-            print(f"AI 食谱生成错误: {e}")
-            # 返回预设食谱
-            return recipe
-    else:
-        # 没有 AI 客户端，返回预设食谱
-        return recipe
+            print(f"数据库查询错误: {e}")
+            # 读取失败时不缓存空结果，下次请求重试
+            return UserAggregates()
+    aggregates = await run_sync(UserAggregates.from_rows, rows)
+    return aggregate_store.put(user_id, aggregates, version)
+
+# 重建聚合：指定 user_id 时立即重建该用户，否则清空全部，之后按需回填
+@app.post("/api/records/aggregates/rebuild")
+async def rebuild_record_aggregates(payload: dict, x_webhook_secret: str = Header(default="")):
+    secret = os.environ.get("CACHE_WEBHOOK_SECRET")
+    if not secret or x_webhook_secret != secret:
+        return ORJSONResponse(
+            status_code=403,
+            content={"detail": "无效的 Webhook 密钥"}
+        )
+
+    user_id = payload.get("user_id")
+    if not user_id:
+        aggregate_store.drop()
+        return {"rebuilt": "all"}
+    aggregate_store.drop(user_id)
+    aggregates = await _load_aggregates(user_id)
+    return {"rebuilt": user_id, "days": len(aggregates)}
 
 # 用户认证相关路由
+@app.get("/auth/me")
+async def get_current_user(claims: dict = Depends(current_user)):
+    return {"user_id": claims["sub"], "email": claims.get("email"), "role": claims.get("role"), "exp": claims["exp"]}
+
 @app.post("/auth/signup")
 async def signup(user: UserLogin):
     if not supabase:
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=503,
             content={"detail": "数据库服务暂时不可用"}
         )
     
     try:
         # 使用 Supabase Auth 进行注册
-        response = supabase.auth.sign_up(
+        response = await run_sync(
+            supabase.auth.sign_up,
             {
                 "email": user.email,
                 "password": user.password
@@ -298,13 +787,13 @@ async def signup(user: UserLogin):
         if response.user:
             return {"message": "注册成功", "user": response.user}
         else:
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=400,
                 content={"detail": "注册失败，请检查邮箱和密码"}
             )
     except Exception as e:
         print(f"注册错误: {e}")
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=500,
             content={"detail": f"注册失败: {str(e)}"}
         )
@@ -312,14 +801,15 @@ async def signup(user: UserLogin):
 @app.post("/auth/login")
 async def login(user: UserLogin):
     if not supabase:
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=503,
             content={"detail": "数据库服务暂时不可用"}
         )
     
     try:
         # 使用 Supabase Auth 进行登录
-        response = supabase.auth.sign_in_with_password(
+        response = await run_sync(
+            supabase.auth.sign_in_with_password,
             {
                 "email": user.email,
                 "password": user.password
@@ -333,29 +823,132 @@ async def login(user: UserLogin):
                 "token": response.session.access_token
             }
         else:
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=401,
                 content={"detail": "登录失败，请检查邮箱和密码"}
             )
     except Exception as e:
         print(f"登录错误: {e}")
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=500,
             content={"detail": f"登录失败: {str(e)}"}
         )
 
 @app.get("/api/health")
 async def health_check():
-    status = "ok" if (supabase or ai_client) else "partial"
+    status = "ok" if (supabase or llm.available) else "partial"
     return {
         "status": status,
         "message": "Kidney Compass Backend is running!",
         "services": {
             "database": "connected" if supabase else "disconnected",
-            "ai": "available" if ai_client else "unavailable"
+            "ai": "available" if llm.available else "unavailable"
+        },
+        "llm": llm.stats(),
+        "cache": classification_cache.stats(),
+        "singleflight": classify_flight.stats(),
+        "recipe_pool": recipe_pool.stats(),
+        "aggregates": aggregate_store.stats(),
+        "reports": report_queue.stats(),
+        "auth": token_verifier.stats(),
+        "rate_limit": rate_limiter.stats(),
+        "similar": _similar_stats(),
+        "catalog": {
+            "shared": food_catalog is not None,
+            "shared_keys": len(food_catalog) if food_catalog is not None else 0,
+            "index_keys": len(food_index),
+            "pid": os.getpid()
         }
     }
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus 文本格式的指标；各组件 stats() 中的数值在抓取时导出为 gauge"""
+    return Response(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@registry.collector
+def _component_metrics():
+    families = []
+    components = {
+        "llm": llm.stats(),
+        "classify_cache": classification_cache.stats(),
+        "singleflight": classify_flight.stats(),
+        "recipe_pool": recipe_pool.stats(),
+        "aggregates": aggregate_store.stats(),
+        "reports": report_queue.stats(),
+        "auth": token_verifier.stats(),
+        "similar_cache": _similar_stats(),
+    }
+    for component, stats in components.items():
+        for stat, value in stats.items():
+            if isinstance(value, bool):
+                value = int(value)
+            if isinstance(value, (int, float)):
+                families.append((f"{component}_{stat}", "gauge", f"{component} {stat}", ((), {(): value})))
+    families.append(("llm_circuit_state", "gauge", "Gemini circuit breaker state (1 for the current state)",
+                     (("state",), {(state,): int(llm.breaker.state == state) for state in ("closed", "open", "half-open")})))
+
+    limits = rate_limiter.stats()
+    families.append(("rate_limit_tracked_keys", "gauge", "Token buckets currently tracked",
+                     ((), {(): limits["tracked_keys"]})))
+    families.append(("rate_limit_allowed_total", "counter", "Gemini-backed requests admitted by the rate limiter",
+                     (("scope",), {(scope,): count for scope, count in rate_limiter.allowed.items()})))
+    families.append(("rate_limit_rejected_total", "counter", "Requests rejected by the rate limiter",
+                     (("scope", "limit"), dict(rate_limiter.rejected))))
+    return families
+
+# Supabase 数据库 Webhook：food_classifications 中的行被改写或删除时使对应缓存失效，
+# 黑白名单表变化时刷新目录，daily_records 变化时增量更新聚合
+@app.post("/api/cache/invalidate")
+async def invalidate_classification_cache(payload: dict, x_webhook_secret: str = Header(default="")):
+    secret = os.environ.get("CACHE_WEBHOOK_SECRET")
+    if not secret or x_webhook_secret != secret:
+        return ORJSONResponse(
+            status_code=403,
+            content={"detail": "无效的 Webhook 密钥"}
+        )
+
+    # 健康记录变化时增量更新聚合
+    if payload.get("table") == "daily_records":
+        record, old_record = payload.get("record"), payload.get("old_record")
+        if old_record and old_record.get("user_id") and (
+            payload.get("type") == "DELETE" or not record or record.get("date") != old_record.get("date")
+        ):
+            aggregate_store.remove(old_record["user_id"], old_record.get("date"))
+        if record and record.get("user_id") and payload.get("type") != "DELETE":
+            aggregate_store.apply(record["user_id"], record)
+        return {"invalidated": 0}
+
+    # 黑白名单变化时重新加载目录
+    if payload.get("table") in ("food_whitelist", "food_blacklist"):
+        run_in_background(refresh_catalog(), "refresh_catalog")
+        return {"invalidated": 0}
+
+    if payload.get("table") != "food_classifications":
+        return {"invalidated": 0}
+
+    invalidated = 0
+    for row in (payload.get("record"), payload.get("old_record")):
+        if not row:
+            continue
+        name = row.get("food_name") or row.get("name")
+        if name:
+            for item_type in ITEM_TYPES:
+                classification_cache.invalidate(classification_key(name, item_type))
+            invalidated += 1
+
+    # 同步更新本地索引：新增/修改直接写入，删除时重新构建（删除很少发生）
+    record = payload.get("record")
+    if payload.get("type") == "DELETE":
+        old_record = payload.get("old_record") or {}
+        _similar_index().remove(old_record.get("food_name") or old_record.get("name") or "")
+        run_in_background(refresh_catalog(), "refresh_catalog")
+    elif record and (record.get("food_name") or record.get("name")):
+        result = classification_from_row(record)
+        food_index.add(result["name"], result)
+        _similar_index().add(result["name"], result)
+    return {"invalidated": invalidated}
+
 # 预设食物分类数据
 FOOD_ITEMS = [
     {"name": "苹果", "level": "green", "reason": "苹果是低蛋白、低钾、低磷的水果，富含维生素C和纤维素，适合所有CKD患者食用。", "advice": "每天可食用1-2个中等大小的苹果。"},
@@ -472,6 +1065,90 @@ FOOD_ITEMS = [
     {"name": "纯净水", "level": "green", "reason": "纯净水是低钠、低钾、低磷的饮品，适合所有CKD患者食用。", "advice": "每天可饮用1500-2000毫升纯净水。"}
 ]
 
+# 食物分类提示词
+CLASSIFY_SYSTEM_PROMPT = ("你是一位专注于肾脏健康的医疗专家，精通慢性肾病（CKD）患者的饮食管理。"  
+                          "请对用户提供的食物进行分类，并基于其对肾脏健康的影响给出明确的指导。"  
+                          "分类标准："  
+                          "- 绿色（green）：对所有 CKD 患者（包括透析患者）安全，推荐食用。"  
+                          "- 黄色（yellow）：需在医生或营养师指导下，根据个人肾功能和当前阶段控制食用量。"  
+                          "- 红色（red）：对大多数 CKD 患者（尤其是中晚期患者）不推荐食用，应避免。"  
+                          "分析维度："  
+                          "1. 蛋白质含量（过高会增加肾脏负担）"  
+                          "2. 钠含量（过高会导致血压升高，加重水肿）"  
+                          "3. 钾含量（肾功能不全时易引发高血钾）"  
+                          "4. 磷含量（肾功能不全时易引发高血磷）"  
+                          "5. 其他可能对肾脏产生影响的成分。"  
+                          "回答要求："  
+                          "- 明确给出分类结果（仅 green、yellow 或 red）。"  
+                          "- 详细说明分类理由，特别是基于上述五个维度的分析。"  
+                          "- 提供针对 CKD 患者的具体饮食建议，包括食用量、烹饪方法等。"  
+                          "- 使用专业、客观的医学术语，同时确保表达清晰易懂。"  
+                          "- 如遇不确定情况，请基于现有医学知识给出最合理的判断，并建议用户咨询其主治医生。"  
+                          "- 按给定的 JSON 结构输出：name（食物名称）、level（green/yellow/red）、reason（分类理由）、advice（饮食建议）。")
+
+# 食谱生成提示词
+RECIPE_SYSTEM_PROMPT = ("你是一位专业的肾脏健康营养师，擅长为慢性肾病（CKD）患者设计食谱。"  
+                        "请基于以下原则创建一个适合 CKD 患者的健康食谱："  
+                        "1. 低蛋白质（对于未透析患者）或适量优质蛋白（对于透析患者）"  
+                        "2. 低钠、低钾、低磷"  
+                        "3. 富含必需氨基酸和维生素"  
+                        "4. 易于准备，食材常见"  
+                        "5. 美味可口，适合长期食用"  
+                        "请提供："  
+                        "- 菜名"  
+                        "- 适合人群标签（如：低蛋白、低磷、低钠、低钾等）"  
+                        "- 详细的食材清单及用量"  
+                        "- 详细的烹饪步骤"  
+                        "- 营养价值和对肾脏健康的益处")
+
+# JSON 输出模式下的字段说明
+RECIPE_JSON_FORMAT = ("按给定的 JSON 结构输出：dishName（菜名）、tags（标签列表）、"
+                      "ingredients（食材及用量列表）、steps（步骤列表，每个元素一步）、nutritionBenefit（营养价值和益处）。")
+
+# 流式输出使用逐行文本格式，便于增量解析
+RECIPE_TEXT_FORMAT = ("输出格式："  
+                      "  dishName: [菜名]\n"  
+                      "  tags: [标签1], [标签2], ...\n"  
+                      "  ingredients: [食材1], [食材2], ...\n"  
+                      "  steps: [步骤1], [步骤2], ...\n"  
+                      "  nutritionBenefit: [营养价值和益处]")
+
+RECIPE_USER_PROMPT = "请生成一个适合 CKD 患者的健康食谱"
+
+llm.register(
+    "classify",
+    system_instruction=CLASSIFY_SYSTEM_PROMPT,
+    response_mime_type="application/json",
+    response_schema=CLASSIFICATION_RESPONSE_SCHEMA
+)
+llm.register(
+    "recipe",
+    system_instruction=RECIPE_SYSTEM_PROMPT + RECIPE_JSON_FORMAT,
+    response_mime_type="application/json",
+    response_schema=RECIPE_RESPONSE_SCHEMA
+)
+llm.register("recipe_stream", system_instruction=RECIPE_SYSTEM_PROMPT + RECIPE_TEXT_FORMAT)
+
+# 化验报告分析提示词
+REPORT_SYSTEM_PROMPT = ("你是一位肾内科医生，负责解读慢性肾病（CKD）患者上传的化验报告照片。"
+                        "请从图片中读取报告日期和以下指标的数值及单位：肌酐（creatinine）、估算肾小球滤过率（egfr）、"
+                        "尿酸（uricAcid）、尿蛋白（proteinuria）；图片中没有的指标填写 \"?\"，日期无法识别时留空。"
+                        "根据指标给出整体状态：stable（稳定）、warning（需关注）、critical（需尽快就医），"
+                        "并在 tailoredStrategy 中给出针对性的饮食和复查建议。不要编造图片中不存在的数值。")
+REPORT_USER_PROMPT = "请分析这张化验报告"
+llm.register(
+    "report",
+    system_instruction=REPORT_SYSTEM_PROMPT,
+    response_mime_type="application/json",
+    response_schema=REPORT_RESPONSE_SCHEMA
+)
+
+# 趋势总结润色提示词：只改写表达，不做新的判断
+TREND_SUMMARY_PROMPT = ("你是一位肾内科随访护士。下面是 CKD 患者日常记录（血压、体重、饮水、症状）的统计结果和规则生成的总结。"
+                        "请用温和、易懂的中文把总结改写为 2-3 句话，保留关键数字，不要给出统计结果之外的判断或诊断，"
+                        "只输出总结正文。")
+llm.register("trend_summary", system_instruction=TREND_SUMMARY_PROMPT)
+
 # 预设食谱数据
 RECIPES = [
     {
@@ -532,24 +1209,205 @@ RECIPES = [
     }
 ]
 
+def _open_food_catalog():
+    path = os.environ.get("CATALOG_PATH") or DEFAULT_CATALOG_PATH
+    try:
+        return open_catalog(path, FOOD_ITEMS, RECIPES)
+    except OSError as e:
+        # 无法写入目录文件（例如只读文件系统）时退回进程内索引
+        print(f"目录文件不可用（{path}），使用进程内索引: {e}")
+        return None
+
+food_catalog = _open_food_catalog()
+
+# 食物索引及黑白名单：先由预设数据构建，数据库中的分类和黑白名单在启动时及定时刷新时补充
+food_index = build_index(FOOD_ITEMS, base=food_catalog)
+whitelist_payload = PrebuiltPayload({"whitelist": build_whitelist(FOOD_ITEMS)}, max_age=CATALOG_MAX_AGE)
+blacklist_payload = PrebuiltPayload({"blacklist": build_blacklist(FOOD_ITEMS)}, max_age=CATALOG_MAX_AGE)
+
+# 预设食物和食谱不随数据库变化，直接使用目录文件中已序列化的字节
+if food_catalog is not None:
+    fallback_foods_payload = PrebuiltPayload(body=food_catalog.section("foods"), max_age=CATALOG_MAX_AGE)
+    fallback_recipes_payload = PrebuiltPayload(body=food_catalog.section("recipes"), max_age=CATALOG_MAX_AGE)
+else:
+    fallback_foods_payload = PrebuiltPayload(FOOD_ITEMS, max_age=CATALOG_MAX_AGE)
+    fallback_recipes_payload = PrebuiltPayload(RECIPES, max_age=CATALOG_MAX_AGE)
+
+async def _fetch_table(table: str):
+    try:
+        response = await execute(supabase.table(table).select("*"))
+        return response.data or []
+    except Exception as e:
+        print(f"数据库查询错误（{table}）: {e}")
+        return []
+
+# 不等待结果的后台任务：事件循环只持有任务的弱引用，在这里保留引用直到完成，异常也在完成时打印
+_background_tasks = set()
+
+def _log_task_result(task: asyncio.Task):
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"后台任务 {task.get_name()} 失败: {task.exception()!r}")
+
+def run_in_background(coro, name: str = None) -> asyncio.Task:
+    task = asyncio.ensure_future(coro)
+    if name:
+        task.set_name(name)
+    _background_tasks.add(task)
+    task.add_done_callback(_log_task_result)
+    return task
+
+async def refresh_catalog():
+    """从数据库重新加载分类和黑白名单，重建食物索引和预序列化的黑白名单"""
+    global food_index, whitelist_payload, blacklist_payload
+    if not supabase:
+        return
+    classifications, whitelist, blacklist = await asyncio.gather(
+        _fetch_table("food_classifications"),
+        _fetch_table("food_whitelist"),
+        _fetch_table("food_blacklist"),
+    )
+    food_index = build_index(FOOD_ITEMS, classifications, whitelist, blacklist, base=food_catalog)
+    similar = _similar_index()
+    for row in classifications:
+        result = classification_from_row(row)
+        similar.add(result["name"], result)
+    whitelist_payload = PrebuiltPayload({"whitelist": build_whitelist(FOOD_ITEMS, whitelist)}, max_age=CATALOG_MAX_AGE)
+    blacklist_payload = PrebuiltPayload({"blacklist": build_blacklist(FOOD_ITEMS, blacklist)}, max_age=CATALOG_MAX_AGE)
+    print(f"食物目录已刷新: 索引 {len(food_index)} 个键")
+
+async def _catalog_refresh_loop():
+    await refresh_catalog()
+    while CATALOG_REFRESH_INTERVAL > 0:
+        await asyncio.sleep(CATALOG_REFRESH_INTERVAL)
+        await refresh_catalog()
+
+_catalog_refresh_task = None
+
+@app.on_event("startup")
+async def start_catalog_refresh():
+    # 首次加载也在后台进行，不阻塞启动：加载完成前由预设数据构建的索引应答
+    global _catalog_refresh_task
+    if supabase:
+        _catalog_refresh_task = asyncio.create_task(_catalog_refresh_loop())
+
+_nutrient_table_instance = None
+
+def _nutrient_table():
+    """营养成分表在第一次使用时加载（依赖 NumPy）"""
+    global _nutrient_table_instance
+    if _nutrient_table_instance is None:
+        from nutrients import load_nutrient_table
+        _nutrient_table_instance = load_nutrient_table()
+    return _nutrient_table_instance
+
+_similar_index_instance = None
+
+def _similar_index():
+    """近似重复缓存在第一次使用时构建（依赖 NumPy），先放入预设食物，数据库分类在目录刷新时加入"""
+    global _similar_index_instance
+    if _similar_index_instance is None:
+        from similarity import SimilarityIndex
+        index = SimilarityIndex(max_items=SIMILAR_CACHE_SIZE)
+        for item in FOOD_ITEMS:
+            index.add(item["name"], item)
+        _similar_index_instance = index
+    return _similar_index_instance
+
+def _similar_stats():
+    return _similar_index_instance.stats() if _similar_index_instance is not None else {"items": 0}
+
+def _preload():
+    # 在线程池中提前导入 SDK 并加载营养成分表，第一个需要它们的请求不必等待
+    try:
+        if llm.available:
+            load_genai()
+        if supabase:
+            supabase.get()
+        _nutrient_table()
+    except Exception as e:
+        print(f"预加载错误: {e}")
+
+@app.on_event("startup")
+async def start_preload():
+    # 不等待完成：服务在导入期间已经可以应答
+    run_in_background(run_sync(_preload), "preload")
+
+@app.on_event("shutdown")
+def flush_classification_cache():
+    # 提交持久缓存中还没写入的分类结果
+    classification_cache.flush()
+
+@app.on_event("shutdown")
+async def stop_catalog_refresh():
+    if _catalog_refresh_task is not None:
+        _catalog_refresh_task.cancel()
+
+# 预生成食谱池
+recipe_pool = RecipePool(
+    generate=_generate_recipe_with_ai if llm.available else None,
+    persist=_save_recipe,
+    max_size=int(os.environ.get("RECIPE_POOL_SIZE", "20")),
+    low_water=int(os.environ.get("RECIPE_POOL_LOW_WATER", "5")),
+)
+recipe_pool.add_known(RECIPES)
+
+async def _load_known_recipes():
+    try:
+        response = await execute(supabase.table("recipes").select("*").limit(500))
+        recipes = [recipe_from_row(row) for row in response.data or []]
+        recipe_pool.add_known(recipes)
+        # 数据库中已生成的食谱（不含预设）直接作为池中的存货，各 worker 和重启后不必重新生成一整池
+        preset = {recipe["dishName"] for recipe in RECIPES}
+        generated = [recipe for recipe in recipes if recipe["dishName"] not in preset]
+        recipe_pool.add_stock(random.sample(generated, min(len(generated), recipe_pool.max_size)))
+    except Exception as e:
+        print(f"数据库查询错误（recipes）: {e}")
+
+async def _start_recipe_pool():
+    if supabase:
+        await _load_known_recipes()
+    recipe_pool.start()
+
+@app.on_event("startup")
+async def start_recipe_pool():
+    # 先从数据库加载已有食谱作为存货，再启动后台补充；加载完成前使用预设食谱
+    run_in_background(_start_recipe_pool(), "start_recipe_pool")
+
+@app.on_event("shutdown")
+async def stop_recipe_pool():
+    await recipe_pool.stop()
+
+# 化验报告分析队列
+report_queue = ReportJobQueue(
+    analyze=_analyze_report,
+    workers=int(os.environ.get("REPORT_WORKERS", "2")),
+    max_jobs=int(os.environ.get("REPORT_MAX_JOBS", "500")),
+    max_bytes=int(os.environ.get("REPORT_MAX_BYTES", str(10 * 1024 * 1024))),
+    spool_dir=os.environ.get("REPORT_SPOOL_DIR") or None,
+    state_dir=os.environ.get("REPORT_STATE_DIR") or None,
+)
+REPORT_SSE_HEARTBEAT = 15
+
+@app.on_event("shutdown")
+async def stop_report_queue():
+    await report_queue.stop()
+
+# 预设食物和食谱（启动时序列化并压缩一次，按 Accept-Encoding 返回，支持 ETag）
 @app.get("/api/fallback/foods")
-async def get_fallback_foods():
-    return FOOD_ITEMS
+async def get_fallback_foods(request: Request):
+    return fallback_foods_payload.response(request)
 
 @app.get("/api/fallback/recipes")
-async def get_fallback_recipes():
-    return RECIPES
+async def get_fallback_recipes(request: Request):
+    return fallback_recipes_payload.response(request)
 
-# 食物白名单
+# 食物白名单（数据库 + 预设数据，预先序列化，支持 ETag）
 @app.get("/api/food-whitelist")
-async def get_food_whitelist():
-    # 从预设食物数据中筛选绿色级别食物
-    whitelist = [item for item in FOOD_ITEMS if item["level"] == "green"]
-    return whitelist
+async def get_food_whitelist(request: Request):
+    return whitelist_payload.response(request)
 
-# 食物黑名单
+# 食物黑名单（数据库 + 预设数据，预先序列化，支持 ETag）
 @app.get("/api/food-blacklist")
-async def get_food_blacklist():
-    # 从预设食物数据中筛选红色级别食物
-    blacklist = [item for item in FOOD_ITEMS if item["level"] == "red"]
-    return blacklist
\ No newline at end of file
+async def get_food_blacklist(request: Request):
+    return blacklist_payload.response(request)
@@ -0,0 +1,188 @@
+import bisect
+import time
+
+# 默认的延迟分桶（秒），覆盖从本地索引命中（微秒级）到 Gemini 调用（数秒）
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """单调递增计数器，按标签值分组"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in self._values.items():
+            yield self.name, _format_labels(self.labels, labels), value
+
+
+class Histogram:
+    """
+    直方图：每组标签一个计数数组（最后一格为 +Inf），observe 只做一次二分查找和两次加法。
+    只在事件循环线程中调用，不加锁。
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # 标签值 -> [各分桶计数..., 总和]
+
+    def observe(self, value: float, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 2)
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def time(self, *labels):
+        """with histogram.time("db_lookup"): ... 记录代码块的耗时"""
+        return _Timer(self, labels)
+
+    def samples(self):
+        for labels, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                yield (f"{self.name}_bucket",
+                       _format_labels(self.labels, labels, ("le", _format_value(float(bound)))), cumulative)
+            yield f"{self.name}_sum", _format_labels(self.labels, labels), series[-1]
+            yield f"{self.name}_count", _format_labels(self.labels, labels), cumulative
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+        return False
+
+
+class Registry:
+    """
+    指标注册表，render() 输出 Prometheus 文本格式。
+    除计数器和直方图外，还可以注册 collector：抓取时调用，返回 (名称, 类型, 说明, {标签元组: 值})，
+    用于把各组件已有的 stats()（缓存、熔断器、限流器等）导出为 gauge，热路径上没有额外开销。
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, help, labels=()):
+        metric = Counter(name, help, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, help, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, func):
+        self._collectors.append(func)
+        return func
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        for func in self._collectors:
+            try:
+                families = func()
+            except Exception as e:
+                print(f"指标采集错误: {e}")
+                continue
+            for name, kind, help, (label_names, values) in families:
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in values.items():
+                    lines.append(f"{name}{_format_labels(label_names, labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    ASGI 中间件：按路由模板（如 /api/reports/{job_id}）记录请求耗时和状态码。
+    流式响应（NDJSON、SSE）记录到响应结束为止的时间。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_SECONDS.observe(time.perf_counter() - start, scope["method"], route)
+            REQUESTS.inc(scope["method"], route, str(status[0]))
+
+
+# 全局指标，供 /metrics 导出
+registry = Registry()
+
+REQUESTS = registry.counter(
+    "http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+REQUEST_SECONDS = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route"))
+CLASSIFY_STAGE_SECONDS = registry.histogram(
+    "classify_stage_duration_seconds", "Time spent in each classification stage", ("stage",))
+CLASSIFY_TIER = registry.counter(
+    "classify_answers_total", "Classifications by the tier that answered them", ("tier",))
+UPSTREAM_SECONDS = registry.histogram(
+    "upstream_request_duration_seconds", "Latency of calls to Supabase and Gemini", ("upstream", "operation"))
+UPSTREAM_REQUESTS = registry.counter(
+    "upstream_requests_total", "Calls to Supabase and Gemini by outcome", ("upstream", "operation", "outcome"))
+LLM_PARSE_SECONDS = registry.histogram(
+    "llm_parse_duration_seconds", "Time spent validating Gemini JSON responses", ("kind",))
@@ -0,0 +1,126 @@
+import csv
+import os
+
+import numpy as np
+
+from food_index import ALIASES, canonical_name, name_variants
+
+# 每 100 克可食部的营养成分列：蛋白质（克）、钠、钾、磷（毫克）
+NUTRIENTS = ("protein", "sodium", "potassium", "phosphorus")
+NUTRIENT_LABELS = {"protein": "蛋白质", "sodium": "钠", "potassium": "钾", "phosphorus": "磷"}
+NUTRIENT_UNITS = {"protein": "克", "sodium": "毫克", "potassium": "毫克", "phosphorus": "毫克"}
+
+# 分级阈值（每 100 克）：不超过第一列为绿色，超过第二列为红色，其间为黄色
+THRESHOLDS = np.array([
+    [20.0, 30.0],    # 蛋白质
+    [200.0, 600.0],  # 钠
+    [200.0, 500.0],  # 钾
+    [200.0, 300.0],  # 磷
+], dtype=np.float32)
+
+LEVELS = ("green", "yellow", "red")
+
+# 每种成分偏高时的饮食建议
+NUTRIENT_ADVICE = {
+    "protein": "蛋白质含量较高，需计入每日蛋白质限量",
+    "sodium": "钠含量较高，应少量食用且不再额外加盐",
+    "potassium": "钾含量较高，可切小块浸泡或焯水后食用以减少钾",
+    "phosphorus": "磷含量较高，注意控制份量，避免与其他高磷食物同餐",
+}
+LEVEL_ADVICE = {
+    "green": "可作为日常饮食的一部分，注意总量和烹饪时少盐少油。",
+    "yellow": "需在医生或营养师指导下，根据个人肾功能控制食用量。",
+    "red": "不推荐 CKD 患者食用，应尽量避免。",
+}
+
+DEFAULT_NUTRIENT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "seed_data", "nutrients.csv")
+
+
+def classify_values(values: np.ndarray) -> tuple:
+    """
+    向量化规则引擎：values 为 (n, 4) 的营养成分矩阵，
+    返回每行的总分级（0/1/2）和每项成分的分级矩阵 (n, 4)。
+    """
+    grades = (values > THRESHOLDS[:, 0]).astype(np.int8) + (values > THRESHOLDS[:, 1])
+    return grades.max(axis=1), grades
+
+
+def _describe(name: str, values, grades, level: int) -> dict:
+    amounts = "、".join(
+        f"{NUTRIENT_LABELS[n]}{value:g}{NUTRIENT_UNITS[n]}" for n, value in zip(NUTRIENTS, values)
+    )
+    high = [n for n, grade in zip(NUTRIENTS, grades) if grade > 0]
+    if high:
+        findings = "，".join(
+            f"{NUTRIENT_LABELS[n]}含量{'过高' if grades[i] == 2 else '偏高'}"
+            for i, n in enumerate(NUTRIENTS) if n in high
+        )
+        reason = f"每100克含{amounts}。{findings}。"
+        advice = LEVEL_ADVICE[LEVELS[level]] + "；".join(NUTRIENT_ADVICE[n] for n in high) + "。"
+    else:
+        reason = f"每100克含{amounts}，蛋白质、钠、钾、磷均处于较低水平。"
+        advice = LEVEL_ADVICE[LEVELS[level]]
+    return {
+        "name": name,
+        "level": LEVELS[level],
+        "reason": reason + "（根据营养成分数据判断，仅供参考）",
+        "advice": advice,
+    }
+
+
+class NutrientTable:
+    """
+    本地营养成分表：名称 -> 行号的哈希表 + float32 矩阵。
+    加载时对整张表一次性向量化分级并生成结果，查询时只是一次字典查找。
+    """
+
+    def __init__(self, names, values):
+        self.names = list(names)
+        self.values = np.asarray(values, dtype=np.float32).reshape(-1, len(NUTRIENTS))
+        self.levels, self.grades = classify_values(self.values)
+        self._rows = {}
+        for row, name in enumerate(self.names):
+            for key in name_variants(name):
+                self._rows.setdefault(ALIASES.get(key, key), row)
+        self._results = [None] * len(self.names)
+
+    @classmethod
+    def from_csv(cls, path: str = DEFAULT_NUTRIENT_PATH):
+        names, values = [], []
+        with open(path, encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                names.append(row["name"])
+                values.append([float(row[n]) for n in NUTRIENTS])
+        return cls(names, values)
+
+    def __len__(self):
+        return len(self.names)
+
+    def find(self, query: str):
+        """
+        返回匹配的行号：只接受规范化名称或同义词的精确匹配。
+        不做子串匹配，"牛奶糖"、"牛肉干"、"苹果醋" 与表中的 牛奶 / 牛肉 / 苹果 营养成分完全不同。
+        """
+        return self._rows.get(canonical_name(query))
+
+    def classify(self, query: str):
+        """返回与 ActivityClassification 结构一致的分类结果（名称为用户的查询），未收录时返回 None"""
+        row = self.find(query)
+        if row is None:
+            return None
+        result = self._results[row]
+        if result is None:
+            result = self._results[row] = _describe(
+                self.names[row].split("/")[0], self.values[row].tolist(), self.grades[row].tolist(), int(self.levels[row])
+            )
+        return {**result, "name": query}
+
+
+def load_nutrient_table(path: str = None):
+    """加载营养成分表；文件不存在或格式错误时返回空表，分类流程直接跳过这一层"""
+    path = path or os.environ.get("NUTRIENT_TABLE_PATH") or DEFAULT_NUTRIENT_PATH
+    try:
+        return NutrientTable.from_csv(path)
+    except Exception as e:
+        print(f"营养成分表加载失败（{path}）: {e}")
+        return NutrientTable([], [])
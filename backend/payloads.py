@@ -0,0 +1,101 @@
+import gzip
+import hashlib
+
+import orjson
+from fastapi import Request, Response
+
+try:
+    import brotli
+except ImportError:  # 未安装 Brotli 时只提供 gzip
+    brotli = None
+
+
+def dumps(data) -> bytes:
+    """紧凑的 UTF-8 JSON（中文不转义），与默认响应类 ORJSONResponse 的输出一致"""
+    return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+def _compressors():
+    compressors = {"gzip": lambda body: gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        compressors["br"] = lambda body: brotli.compress(body, quality=11)
+    return compressors
+
+
+def negotiate_encoding(accept_encoding: str, available) -> str:
+    """
+    按 Accept-Encoding（含 q 值和 *）从 available 中选出内容编码，都不可接受时返回 "identity"。
+    q 值相同时按 available 的顺序优先。
+    """
+    weights = {}
+    for part in (accept_encoding or "").lower().split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding] = q
+
+    best, best_q = "identity", 0.0
+    for coding in available:
+        q = weights.get(coding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def _etag_matches(if_none_match: str, etags) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip() in etags for tag in if_none_match.split(","))
+
+
+class PrebuiltPayload:
+    """
+    预先序列化好的 JSON 响应体，带强 ETag 和 Cache-Control。
+
+    数据只在构建时序列化并压缩（gzip，安装了 Brotli 时还有 br）一次，请求时按 Accept-Encoding 选择现成的字节，
+    不做任何序列化或压缩；客户端带上 If-None-Match 再次请求时直接返回 304。
+    """
+
+    def __init__(self, data=None, max_age: int = 300, body: bytes = None, min_size: int = 1024):
+        self.body = dumps(data) if body is None else bytes(body)
+        digest = hashlib.sha256(self.body).hexdigest()[:32]
+        self.etag = f'"{digest}"'
+        cache_control = f"public, max-age={max_age}, must-revalidate"
+
+        # 编码 -> (响应体, 响应头)；每种编码的表示不同，ETag 也不同
+        self.variants = {}
+        if len(self.body) >= min_size:
+            for coding, compress in _compressors().items():
+                compressed = compress(self.body)
+                if len(compressed) < len(self.body):
+                    self.variants[coding] = (compressed, {
+                        "ETag": f'"{digest}-{coding}"',
+                        "Cache-Control": cache_control,
+                        "Content-Encoding": coding,
+                        "Vary": "Accept-Encoding",
+                    })
+        self.headers = {"ETag": self.etag, "Cache-Control": cache_control}
+        if self.variants:
+            self.headers["Vary"] = "Accept-Encoding"
+        self.variants["identity"] = (self.body, self.headers)
+        self._etags = {headers["ETag"] for _, headers in self.variants.values()}
+        # 协商时优先体积更小的编码
+        self._preference = sorted(self.variants, key=lambda coding: len(self.variants[coding][0]))
+
+    def response(self, request: Request) -> Response:
+        coding = negotiate_encoding(request.headers.get("accept-encoding"), self._preference)
+        body, headers = self.variants[coding]
+        # 内容相同，客户端缓存的是任一编码的表示都可以复用
+        if _etag_matches(request.headers.get("if-none-match"), self._etags):
+            return Response(status_code=304, headers=headers)
+        return Response(body, media_type="application/json", headers=headers)
@@ -0,0 +1,175 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+_UNITS = {"s": 1, "sec": 1, "min": 60, "hour": 3600, "h": 3600, "day": 86400, "d": 86400}
+
+
+def parse_limit(spec: str):
+    """"30/min" -> (容量 30, 每秒补充 0.5 个令牌)；空字符串或 "0" 表示不限制，返回 None"""
+    spec = (spec or "").strip().lower()
+    if spec in ("", "0", "off", "none"):
+        return None
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)\s*/\s*(\d*)\s*([a-z]+)", spec)
+    if not match or match.group(3) not in _UNITS:
+        raise ValueError(f"无效的限流配置: {spec}")
+    count = float(match.group(1))
+    period = float(match.group(2) or 1) * _UNITS[match.group(3)]
+    return count, count / period
+
+
+def _refill(tokens, updated, now, capacity, rate):
+    return min(capacity, tokens + (now - updated) * rate)
+
+
+class MemoryBucketStore:
+    """进程内令牌桶，超过 max_keys 时淘汰最久未使用的键（被淘汰的键相当于桶已装满）"""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # 键 -> (令牌数, 更新时间)
+        self._lock = threading.Lock()
+
+    def take(self, keys, cost, now):
+        """
+        keys 为 [(键, 容量, 每秒补充)]：所有桶都有 cost 个令牌时才从每个桶中取出，
+        返回第一个令牌不足的键的下标，全部允许时返回 None
+        """
+        with self._lock:
+            levels = []
+            for key, capacity, rate in keys:
+                tokens, updated = self._buckets.get(key, (capacity, now))
+                levels.append(_refill(tokens, updated, now, capacity, rate))
+            denied = next((i for i, tokens in enumerate(levels) if tokens < cost), None)
+            for (key, _, _), tokens in zip(keys, levels):
+                self._buckets[key] = (tokens - cost if denied is None else tokens, now)
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return denied
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class SQLiteBucketStore:
+    """
+    SQLite 令牌桶，多个 worker 进程共享同一个文件即可共享限额。
+    每次取令牌在一个 IMMEDIATE 事务中完成读-改-写，进程间互斥由 SQLite 的写锁保证。
+    """
+
+    def __init__(self, path: str, max_age: float = 86400):
+        self._connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        self._db.execute("DELETE FROM buckets WHERE updated < ?", (time.time() - max_age,))
+        # 预加载应用后 fork 出的 worker 进程不能沿用父进程的 SQLite 连接
+        os.register_at_fork(after_in_child=lambda: self._connect(path))
+
+    def _connect(self, path: str):
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=1.0, isolation_level=None)
+        self._lock = threading.Lock()
+
+    def take(self, keys, cost, now):
+        with self._lock:
+            try:
+                self._db.execute("BEGIN IMMEDIATE")
+                levels = []
+                for key, capacity, rate in keys:
+                    row = self._db.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+                    levels.append(_refill(*(row or (capacity, now)), now, capacity, rate))
+                denied = next((i for i, tokens in enumerate(levels) if tokens < cost), None)
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                    [(key, tokens - cost if denied is None else tokens, now)
+                     for (key, _, _), tokens in zip(keys, levels)]
+                )
+                self._db.execute("COMMIT")
+                return denied
+            except sqlite3.Error as e:
+                # 限流存储故障时放行，不因限流器影响正常请求
+                print(f"限流存储错误: {e}")
+                try:
+                    self._db.execute("ROLLBACK")
+                except sqlite3.Error:
+                    pass
+                return None
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM buckets").fetchone()[0]
+
+
+class RateLimiter:
+    """
+    按 IP 和按用户的令牌桶限流，两个桶都有令牌时才放行，被拒绝的请求不消耗任何一个桶的令牌。
+
+    只用于保护会调用 Gemini 的路径：被拒绝的请求不排队，由调用方改用缓存、本地数据或预设结果应答。
+    """
+
+    def __init__(self, store, per_ip=None, per_user=None):
+        self.store = store
+        self.per_ip = per_ip
+        self.per_user = per_user
+        self.allowed = {}  # 用途 -> 放行次数
+        self.rejected = {}  # (用途, ip/user) -> 拒绝次数
+
+    def allow(self, scope: str, ip: str = None, user: str = None, cost: float = 1) -> bool:
+        now = time.time()
+        checks = []
+        if self.per_user is not None and user:
+            checks.append(("user", f"{scope}:user:{user}", self.per_user))
+        if self.per_ip is not None and ip:
+            checks.append(("ip", f"{scope}:ip:{ip}", self.per_ip))
+        denied = self.store.take([(key, *limit) for _, key, limit in checks], cost, now) if checks else None
+        if denied is not None:
+            kind = checks[denied][0]
+            self.rejected[(scope, kind)] = self.rejected.get((scope, kind), 0) + 1
+            return False
+        self.allowed[scope] = self.allowed.get(scope, 0) + 1
+        return True
+
+    def stats(self):
+        return {
+            "backend": type(self.store).__name__,
+            "tracked_keys": len(self.store),
+            "allowed": dict(self.allowed),
+            "rejected": {f"{scope}:{kind}": count for (scope, kind), count in self.rejected.items()},
+        }
+
+
+def _build_store():
+    if os.environ.get("RATE_LIMIT_BACKEND", "memory").lower() == "sqlite":
+        path = os.environ.get("RATE_LIMIT_PATH", "ratelimit.sqlite3")
+        try:
+            return SQLiteBucketStore(path)
+        except sqlite3.Error as e:
+            print(f"限流存储初始化失败，改用内存: {e}")
+    return MemoryBucketStore()
+
+
+# 全局限流器，配置见 README 中的环境变量说明
+rate_limiter = RateLimiter(
+    _build_store(),
+    per_ip=parse_limit(os.environ.get("RATE_LIMIT_PER_IP", "30/min")),
+    per_user=parse_limit(os.environ.get("RATE_LIMIT_PER_USER", "300/day")),
+)
+
+# 部署在反向代理之后（Hugging Face Spaces、Render 等）时，从 X-Forwarded-For 读取客户端 IP。
+# 最左边的条目可以由客户端任意伪造，只有受信任的代理追加在右侧的条目可信：
+# PROXY_HOPS 为应用前面的代理层数，取从右数第 PROXY_HOPS 个条目
+TRUST_PROXY = os.environ.get("RATE_LIMIT_TRUST_PROXY", "false").lower() == "true"
+PROXY_HOPS = max(1, int(os.environ.get("RATE_LIMIT_PROXY_HOPS", "1")))
+
+
+def client_ip(request) -> str:
+    if TRUST_PROXY:
+        forwarded = [part.strip() for part in request.headers.get("x-forwarded-for", "").split(",") if part.strip()]
+        if len(forwarded) >= PROXY_HOPS:
+            return forwarded[-PROXY_HOPS]
+    return request.client.host if request.client else "unknown"
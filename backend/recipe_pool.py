@@ -0,0 +1,172 @@
+import asyncio
+import random
+from collections import OrderedDict
+
+
+def recipe_from_row(row: dict) -> dict:
+    """recipes 表中的一行 -> 食谱。列表字段可能是数组，也可能是逗号拼接的字符串"""
+    def as_list(value):
+        if isinstance(value, list):
+            return value
+        return [part.strip() for part in (value or "").split(",") if part.strip()]
+
+    return {
+        "dishName": row.get("dish_name"),
+        "tags": as_list(row.get("tags")),
+        "ingredients": as_list(row.get("ingredients")),
+        "steps": as_list(row.get("steps")),
+        "nutritionBenefit": row.get("nutrition_benefit") or ""
+    }
+
+
+def is_valid_recipe(recipe: dict) -> bool:
+    """过滤解析失败或字段缺失的食谱"""
+    return bool(
+        recipe.get("dishName")
+        and recipe["dishName"] != "未知菜品"
+        and recipe.get("ingredients")
+        and recipe.get("steps")
+        and recipe.get("nutritionBenefit")
+    )
+
+
+class RecipePool:
+    """
+    预生成食谱池。
+
+    后台任务在空闲时调用 generate() 生成新食谱，校验后通过 persist() 写入数据库，
+    保持池中有 max_size 个未发放的新食谱；数量低于 low_water 时立即唤醒补充。
+    请求只从池中取食谱（O(1)），LLM 永远不在请求的关键路径上。
+    池为空时从预设和数据库中已有的食谱中随机选取，同一会话内不重复。
+    启动时可以先用 add_stock() 放入数据库中已生成的食谱，池已满时不再调用 Gemini。
+    """
+
+    def __init__(self, generate=None, persist=None, max_size=20, low_water=5,
+                 max_sessions=1000, retry_delay=30):
+        self.generate = generate
+        self.persist = persist
+        self.max_size = max_size
+        self.low_water = low_water
+        self.max_sessions = max_sessions
+        self.retry_delay = retry_delay
+        self._fresh = []  # 新生成、尚未发放的食谱
+        self._known = []  # 所有可作为兜底的食谱
+        self._known_names = set()
+        self._seen = OrderedDict()  # 会话 ID -> 已发放的菜名集合
+        self._wakeup = None  # 在 start() 中创建，避免预加载时绑定到 master 进程的事件循环
+        self._task = None
+        self.generated = 0
+        self.failures = 0
+
+    def add_known(self, recipes):
+        for recipe in recipes:
+            if is_valid_recipe(recipe) and recipe["dishName"] not in self._known_names:
+                self._known.append(recipe)
+                self._known_names.add(recipe["dishName"])
+
+    def add_stock(self, recipes):
+        """把已生成的食谱（例如其他进程写入数据库的）作为未发放的食谱放入池中，最多补满 max_size 个"""
+        for recipe in recipes:
+            if len(self._fresh) >= self.max_size:
+                break
+            if is_valid_recipe(recipe):
+                self._fresh.append(recipe)
+                self.add_known([recipe])
+
+    def take(self, session_id: str = None, fresh: bool = True, admit=None) -> dict:
+        """
+        fresh=False 时只从已有食谱中选取，不消耗新生成的食谱。
+        admit 在即将发放一个新生成的食谱（之后需要调用 Gemini 补充）时调用，返回 False（例如被限流）时改用已有食谱。
+        """
+        seen = self._session_seen(session_id)
+
+        recipe = self._pop_fresh(seen, admit) if fresh else None
+        if recipe is None:
+            recipe = self._pick_known(seen)
+
+        if len(self._fresh) < self.low_water and self._wakeup is not None:
+            self._wakeup.set()
+        if recipe is not None and seen is not None:
+            seen.add(recipe["dishName"])
+        return recipe
+
+    def start(self):
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        if self.generate is not None and self._task is None:
+            self._task = asyncio.create_task(self._refill_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self):
+        return {
+            "fresh": len(self._fresh),
+            "known": len(self._known),
+            "generated": self.generated,
+            "failures": self.failures,
+            "running": self._task is not None,
+        }
+
+    def _session_seen(self, session_id):
+        if not session_id:
+            return None
+        seen = self._seen.get(session_id)
+        if seen is None:
+            seen = self._seen[session_id] = set()
+            while len(self._seen) > self.max_sessions:
+                self._seen.popitem(last=False)
+        else:
+            self._seen.move_to_end(session_id)
+        return seen
+
+    def _pop_fresh(self, seen, admit=None):
+        # 随机取一个下标，与末尾交换后弹出，O(1)
+        for _ in range(min(3, len(self._fresh))):
+            i = random.randrange(len(self._fresh))
+            if seen is None or self._fresh[i]["dishName"] not in seen:
+                if admit is not None and not admit():
+                    return None
+                self._fresh[i], self._fresh[-1] = self._fresh[-1], self._fresh[i]
+                return self._fresh.pop()
+        return None
+
+    def _pick_known(self, seen):
+        if not self._known:
+            return None
+        for _ in range(8):
+            recipe = random.choice(self._known)
+            if seen is None or recipe["dishName"] not in seen:
+                return recipe
+        # 随机几次都已看过：该会话已经看过大部分食谱，清空记录重新开始
+        if seen is not None:
+            seen.clear()
+        return random.choice(self._known)
+
+    async def _refill_loop(self):
+        while True:
+            if len(self._fresh) >= self.max_size:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            try:
+                recipe = await self.generate()
+            except Exception as e:
+                print(f"食谱池生成错误: {e}")
+                recipe = None
+            if recipe is None or not is_valid_recipe(recipe):
+                self.failures += 1
+                await asyncio.sleep(self.retry_delay)
+                continue
+
+            self.generated += 1
+            self._fresh.append(recipe)
+            self.add_known([recipe])
+            if self.persist is not None:
+                await self.persist(recipe)
@@ -0,0 +1,81 @@
+RECIPE_FIELDS = ("dishName", "tags", "ingredients", "steps", "nutritionBenefit")
+LIST_FIELDS = {"tags", "ingredients", "steps"}
+
+
+def empty_recipe() -> dict:
+    return {
+        "dishName": "未知菜品",
+        "tags": [],
+        "ingredients": [],
+        "steps": [],
+        "nutritionBenefit": ""
+    }
+
+
+def parse_field_value(field: str, value: str):
+    """列表字段按逗号拆分，其余字段去除首尾空白"""
+    if field in LIST_FIELDS:
+        return [part.strip() for part in value.split(",") if part.strip()]
+    return value.strip()
+
+
+class RecipeStreamParser:
+    """
+    增量解析 "dishName: / tags: / ingredients: / steps: / nutritionBenefit:" 格式的食谱文本。
+
+    每次 feed 一段流式输出，返回其中已经完整的字段 [(字段名, 值)]：
+    一个字段在下一个字段开始时即视为完整，最后一个字段在 close 时完成。
+    字段值跨多行时，列表字段的每一行作为一个元素，文本字段直接拼接。
+    """
+
+    def __init__(self):
+        self.result = empty_recipe()
+        self._buffer = ""
+        self._field = None
+        self._lines = []
+
+    def feed(self, text: str):
+        self._buffer += text
+        *lines, self._buffer = self._buffer.split("\n")
+        completed = []
+        for line in lines:
+            completed.extend(self._handle_line(line))
+        return completed
+
+    def close(self):
+        completed = []
+        if self._buffer:
+            completed.extend(self._handle_line(self._buffer))
+            self._buffer = ""
+        completed.extend(self._finish_field())
+        return completed
+
+    def _handle_line(self, line: str):
+        # 兼容模型偶尔输出的 Markdown 标记，例如 "**dishName:** 清蒸鲈鱼"、"- tags: ..."
+        stripped = line.strip().lstrip("-*# ").replace("**", "")
+        for field in RECIPE_FIELDS:
+            if stripped.startswith(field + ":"):
+                completed = self._finish_field()
+                self._field = field
+                self._lines = [stripped.split(":", 1)[1].strip()]
+                return completed
+        if self._field is not None and stripped:
+            self._lines.append(stripped)
+        return []
+
+    def _finish_field(self):
+        if self._field is None:
+            return []
+        separator = "," if self._field in LIST_FIELDS else ""
+        value = parse_field_value(self._field, separator.join(line for line in self._lines if line))
+        self.result[self._field] = value
+        field, self._field, self._lines = self._field, None, []
+        return [(field, value)]
+
+
+def parse_recipe_text(text: str) -> dict:
+    """一次性解析完整的食谱文本"""
+    parser = RecipeStreamParser()
+    parser.feed(text)
+    parser.close()
+    return parser.result
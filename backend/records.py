@@ -0,0 +1,85 @@
+import datetime
+import gzip
+import json
+import re
+import zlib
+
+from payloads import dumps
+
+# 前端 DailyRecord 字段 -> daily_records 表的列
+RECORD_COLUMNS = {
+    "date": "date",
+    "weight": "weight",
+    "systolic": "systolic",
+    "diastolic": "diastolic",
+    "bpHand": "bp_hand",
+    "edema": "edema",
+    "hematuria": "hematuria",
+    "foamyUrine": "foamy_urine",
+    "waterIntake": "water_intake",
+}
+
+
+def record_to_row(record: dict, user_id: str) -> dict:
+    """DailyRecord -> daily_records 行；未提供的字段不写入，避免覆盖服务端已有的值"""
+    row = {"user_id": user_id}
+    for field, column in RECORD_COLUMNS.items():
+        if record.get(field) is not None:
+            row[column] = record[field]
+    return row
+
+
+def complete_row(row: dict, stored: dict = None) -> dict:
+    """
+    补全为 daily_records 的全部列：未提供的字段沿用已存储的值，没有则为 null。
+    批量 upsert 要求各行的列完全相同（否则 PostgREST 返回 PGRST102），补全后的行也就是写入后存储的行。
+    """
+    stored = stored or {}
+    full = {"user_id": row["user_id"]}
+    for column in RECORD_COLUMNS.values():
+        full[column] = row[column] if column in row else stored.get(column)
+    for column, value in row.items():
+        full.setdefault(column, value)
+    return full
+
+
+def row_to_record(row: dict) -> dict:
+    """daily_records 行 -> DailyRecord（附带 updatedAt，供客户端判断新旧）"""
+    record = {field: row.get(column) for field, column in RECORD_COLUMNS.items()}
+    record["date"] = str(record["date"])[:10] if record["date"] else None
+    record["updatedAt"] = row.get("updated_at")
+    return record
+
+
+def parse_timestamp(value: str) -> datetime.datetime:
+    """ISO 时间戳（PostgREST 返回的 updated_at 或客户端的水位线）-> 带时区的 datetime，未带时区按 UTC"""
+    text = str(value).replace("Z", "+00:00")
+    # PostgREST 省略小数秒末尾的 0（".12345"），Python 3.9 的 fromisoformat 只接受 3 或 6 位
+    text = re.sub(r"\.(\d{1,6})\d*", lambda m: "." + m.group(1).ljust(6, "0"), text, count=1)
+    parsed = datetime.datetime.fromisoformat(text)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=datetime.timezone.utc)
+
+
+def decode_body(body: bytes, content_encoding: str, max_bytes: int):
+    """解析可能经过 gzip 压缩的 JSON 请求体；解压失败或解压后超过 max_bytes 时抛出 ValueError"""
+    if (content_encoding or "").lower() == "gzip":
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        try:
+            body = decompressor.decompress(body, max_bytes + 1)
+        except zlib.error as e:
+            raise ValueError(f"gzip 解压失败: {e}")
+        if len(body) > max_bytes or decompressor.unconsumed_tail:
+            raise ValueError("请求体解压后过大")
+    elif len(body) > max_bytes:
+        raise ValueError("请求体过大")
+    return json.loads(body)
+
+
+def encode_body(data, accept_encoding: str, min_size: int = 1024):
+    """序列化 JSON 响应，客户端接受 gzip 且足够大时压缩，返回 (body, headers)"""
+    body = dumps(data)
+    headers = {"Vary": "Accept-Encoding"}
+    if len(body) >= min_size and "gzip" in (accept_encoding or "").lower():
+        body = gzip.compress(body, compresslevel=6)
+        headers["Content-Encoding"] = "gzip"
+    return body, headers
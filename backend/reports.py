@@ -0,0 +1,262 @@
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import time
+from collections import OrderedDict
+
+
+class ReportTooLarge(Exception):
+    """上传的报告图片超过大小上限"""
+
+
+class ReportRejected(Exception):
+    """需要新分析但 admit() 拒绝（例如被限流）"""
+
+
+class ReportJob:
+    __slots__ = ("id", "content_type", "path", "status", "result", "error", "created_at", "finished", "_changed")
+
+    def __init__(self, job_id: str, content_type: str, path: str):
+        self.id = job_id
+        self.content_type = content_type
+        self.path = path
+        self.status = "queued"  # queued -> processing -> done / failed
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished = asyncio.Event()
+        self._changed = asyncio.Event()
+
+    def set_status(self, status: str):
+        self.status = status
+        self._changed.set()
+        self._changed = asyncio.Event()
+        if status in ("done", "failed"):
+            self.finished.set()
+
+    async def wait_change(self, timeout: float):
+        """等待状态变化，超时返回 False（用于 SSE 心跳）"""
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def to_dict(self) -> dict:
+        return {"id": self.id, "status": self.status, "result": self.result, "error": self.error}
+
+
+class SharedReportJob(ReportJob):
+    """
+    由其他 worker 进程处理的任务：状态从共享目录中的状态文件读取，wait_change 时轮询该文件。
+    状态文件超过 stale_after 秒未更新且任务未结束时（所在进程已退出），视为失败。
+    """
+
+    __slots__ = ("state_path", "updated_at", "stale_after")
+
+    POLL_INTERVAL = 0.5
+
+    def __init__(self, state_path: str, state: dict, stale_after: float):
+        super().__init__(state["id"], None, None)
+        self.state_path = state_path
+        self.stale_after = stale_after
+        self._apply(state)
+
+    def _apply(self, state: dict):
+        self.result = state.get("result")
+        self.error = state.get("error")
+        self.updated_at = state.get("updated_at", 0)
+        status = state.get("status", "failed")
+        if status not in ("done", "failed") and time.time() - self.updated_at > self.stale_after:
+            status, self.error = "failed", "处理该任务的进程已退出，请重新上传"
+        if status != self.status:
+            self.set_status(status)
+
+    async def wait_change(self, timeout: float):
+        deadline = time.monotonic() + timeout
+        status = self.status
+        while time.monotonic() < deadline:
+            await asyncio.sleep(min(self.POLL_INTERVAL, max(0.0, deadline - time.monotonic())))
+            state = _read_state(self.state_path)
+            if state is not None:
+                self._apply(state)
+            if self.status != status:
+                return True
+        return False
+
+
+def _read_state(path: str):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class ReportJobQueue:
+    """
+    报告图片分析队列。
+
+    上传的图片按块写入临时文件并同时计算 SHA-256，不会整个读入内存；
+    任务 ID 就是图片内容的哈希，相同图片再次上传直接返回已有任务（进行中或已完成），不会重复分析。
+    固定数量的后台 worker 从队列中取任务调用 analyze(path, content_type)，完成后删除临时文件。
+    已完成的任务保留最近 max_jobs 个，失败的任务在下次上传相同图片时重新分析。
+
+    配置了 state_dir 时，任务状态同时写入该目录（多个 worker 进程共用），
+    上传和查询落到其他进程时也能找到任务，不会重复分析。
+    """
+
+    def __init__(self, analyze, workers: int = 2, max_jobs: int = 500, max_bytes: int = 10 * 1024 * 1024,
+                 spool_dir: str = None, state_dir: str = None, stale_after: float = 600):
+        self.analyze = analyze
+        self.workers = workers
+        self.max_jobs = max_jobs
+        self.max_bytes = max_bytes
+        self.spool_dir = spool_dir
+        self.state_dir = state_dir
+        self.stale_after = stale_after
+        if state_dir:
+            os.makedirs(state_dir, exist_ok=True)
+        self._jobs = OrderedDict()
+        self._queue = None
+        self._tasks = []
+        self.submitted = 0
+        self.deduplicated = 0
+        self.completed = 0
+        self.failed = 0
+
+    async def submit(self, chunks, content_type: str, admit=None) -> ReportJob:
+        """
+        chunks 为字节块的异步迭代器（例如 request.stream()）；
+        需要新建任务时先调用 admit()，返回 False 则抛出 ReportRejected
+        """
+        digest = hashlib.sha256()
+        size = 0
+        fd, path = tempfile.mkstemp(prefix="report-", dir=self.spool_dir)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise ReportTooLarge(f"图片超过 {self.max_bytes // (1024 * 1024)}MB 上限")
+                    digest.update(chunk)
+                    f.write(chunk)
+        except BaseException:
+            os.unlink(path)
+            raise
+
+        job_id = digest.hexdigest()
+        job = self.get(job_id)
+        if job is not None and job.status != "failed":
+            os.unlink(path)
+            if job_id in self._jobs:
+                self._jobs.move_to_end(job_id)
+            self.deduplicated += 1
+            return job
+
+        if admit is not None and not admit():
+            os.unlink(path)
+            raise ReportRejected(job_id)
+
+        job = ReportJob(job_id, content_type, path)
+        self._jobs[job_id] = job
+        self._save_state(job)
+        self._evict()
+        self.submitted += 1
+        self._ensure_workers()
+        await self._queue.put(job)
+        return job
+
+    def get(self, job_id: str):
+        job = self._jobs.get(job_id)
+        if job is None and self.state_dir:
+            # 其他 worker 进程中的任务
+            path = self._state_path(job_id)
+            state = _read_state(path) if path else None
+            if state is not None:
+                job = SharedReportJob(path, state, self.stale_after)
+        return job
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        self._queue = None
+
+    def stats(self):
+        return {
+            "jobs": len(self._jobs),
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "workers": len(self._tasks),
+            "submitted": self.submitted,
+            "deduplicated": self.deduplicated,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+    def _ensure_workers(self):
+        # 在事件循环中首次提交时再创建队列和 worker
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def _evict(self):
+        # 只淘汰已结束的任务，排队和进行中的任务必须保留
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.max_jobs:
+                break
+            if self._jobs[job_id].finished.is_set():
+                del self._jobs[job_id]
+                if self.state_dir:
+                    try:
+                        os.unlink(self._state_path(job_id))
+                    except OSError:
+                        pass
+
+    def _state_path(self, job_id: str):
+        # 任务 ID 是 SHA-256 十六进制串，其他输入（来自 URL）不对应任何文件
+        if len(job_id) != 64 or not all(c in "0123456789abcdef" for c in job_id):
+            return None
+        return os.path.join(self.state_dir, f"report-{job_id}.json")
+
+    def _save_state(self, job: ReportJob):
+        if not self.state_dir:
+            return
+        path = self._state_path(job.id)
+        state = dict(job.to_dict(), updated_at=time.time())
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"报告任务状态保存失败: {e}")
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            job.set_status("processing")
+            self._save_state(job)
+            try:
+                job.result = await self.analyze(job.path, job.content_type)
+                self.completed += 1
+                job.set_status("done")
+            except Exception as e:
+                print(f"报告分析错误: {e}")
+                job.error = str(e)
+                self.failed += 1
+                job.set_status("failed")
+            finally:
+                self._save_state(job)
+                try:
+                    os.unlink(job.path)
+                except OSError:
+                    pass
+                self._queue.task_done()
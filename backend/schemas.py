@@ -0,0 +1,101 @@
+import datetime
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel, field_validator
+
+
+# 与前端 types.ts 中的接口保持一致
+class ActivityClassification(BaseModel):
+    name: str
+    level: Literal["green", "yellow", "red"]
+    reason: str
+    advice: str
+
+
+class DailyRecord(BaseModel):
+    date: str
+    weight: Optional[float] = None
+    systolic: Optional[float] = None
+    diastolic: Optional[float] = None
+    bpHand: Optional[Literal["left", "right"]] = None
+    edema: Optional[bool] = None
+    hematuria: Optional[bool] = None
+    foamyUrine: Optional[bool] = None
+    waterIntake: Optional[float] = None
+
+    @field_validator("date")
+    @classmethod
+    def _check_date(cls, value: str) -> str:
+        # 前 10 个字符必须是 ISO 日期（YYYY-MM-DD），之后可以带时间
+        try:
+            datetime.date.fromisoformat(value[:10])
+        except ValueError:
+            raise ValueError("date 必须是 YYYY-MM-DD 格式的日期")
+        return value
+
+
+class Recipe(BaseModel):
+    dishName: str
+    tags: List[str]
+    ingredients: List[str]
+    steps: List[str]
+    nutritionBenefit: str
+
+
+class ReportIndicators(BaseModel):
+    creatinine: str
+    egfr: str
+    uricAcid: str
+    proteinuria: str
+
+
+class ReportAnalysis(BaseModel):
+    date: str
+    indicators: ReportIndicators
+    status: Literal["stable", "warning", "critical"]
+    tailoredStrategy: str
+
+
+# Gemini JSON 输出模式使用的响应结构（OpenAPI 子集，不能包含 title 等字段，因此单独定义）
+CLASSIFICATION_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string"},
+        "level": {"type": "string", "format": "enum", "enum": ["green", "yellow", "red"]},
+        "reason": {"type": "string"},
+        "advice": {"type": "string"},
+    },
+    "required": ["name", "level", "reason", "advice"],
+}
+
+RECIPE_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "dishName": {"type": "string"},
+        "tags": {"type": "array", "items": {"type": "string"}},
+        "ingredients": {"type": "array", "items": {"type": "string"}},
+        "steps": {"type": "array", "items": {"type": "string"}},
+        "nutritionBenefit": {"type": "string"},
+    },
+    "required": ["dishName", "tags", "ingredients", "steps", "nutritionBenefit"],
+}
+
+REPORT_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "date": {"type": "string"},
+        "indicators": {
+            "type": "object",
+            "properties": {
+                "creatinine": {"type": "string"},
+                "egfr": {"type": "string"},
+                "uricAcid": {"type": "string"},
+                "proteinuria": {"type": "string"},
+            },
+            "required": ["creatinine", "egfr", "uricAcid", "proteinuria"],
+        },
+        "status": {"type": "string", "format": "enum", "enum": ["stable", "warning", "critical"]},
+        "tailoredStrategy": {"type": "string"},
+    },
+    "required": ["date", "indicators", "status", "tailoredStrategy"],
+}
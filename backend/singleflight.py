@@ -0,0 +1,34 @@
+import asyncio
+
+
+class SingleFlight:
+    """
+    合并相同键的并发调用：同一时刻每个键只执行一次，其余调用方等待并共享同一个结果。
+
+    调用在独立的 Task 中运行，因此发起者断开连接（被取消）不会影响其他等待者。
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key, func):
+        task = self._inflight.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def stats(self):
+        return {"inflight": len(self._inflight), "calls": self.calls, "shared": self.shared}
+
+    def _done(self, key, task):
+        self._inflight.pop(key, None)
+        # 所有等待者都已取消时，避免出现 "exception was never retrieved" 警告
+        if not task.cancelled():
+            task.exception()
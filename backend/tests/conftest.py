@@ -0,0 +1,150 @@
+"""
+测试不连接 Supabase 和 Gemini：导入应用前清空相关配置，数据库用内存中的 FakeSupabase 替换。
+
+运行（在 backend 目录下）：
+    python -m pytest -q
+"""
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import jwt
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+JWT_SECRET = "test-secret-test-secret-test-secret"
+
+os.environ["SUPABASE_URL"] = ""
+os.environ["SUPABASE_KEY"] = ""
+os.environ["GEMINI_API_KEY"] = ""
+os.environ["SUPABASE_JWT_SECRET"] = JWT_SECRET
+os.environ["CLASSIFY_CACHE_PATH"] = ""
+os.environ["CATALOG_REFRESH_INTERVAL"] = "0"
+os.environ["RATE_LIMIT_PER_IP"] = "0"
+os.environ["RATE_LIMIT_PER_USER"] = "0"
+
+
+def make_token(user_id: str) -> str:
+    now = int(time.time())
+    return jwt.encode(
+        {"sub": user_id, "aud": "authenticated", "role": "authenticated", "iat": now, "exp": now + 3600},
+        JWT_SECRET, algorithm="HS256"
+    )
+
+
+def auth_headers(user_id: str) -> dict:
+    return {"Authorization": f"Bearer {make_token(user_id)}"}
+
+
+class FakeQuery:
+    """记录 supabase-py 的链式调用，execute() 时交给 FakeSupabase 处理"""
+
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+        self.http_method = "GET"
+        self.path = f"/{table}"
+        self.ops = []
+
+    def _op(name):
+        def record(self, *args, **kwargs):
+            self.ops.append((name, args, kwargs))
+            if name in ("insert", "upsert"):
+                self.http_method = "POST"
+            return self
+        return record
+
+    select = _op("select")
+    insert = _op("insert")
+    upsert = _op("upsert")
+    eq = _op("eq")
+    in_ = _op("in_")
+    gt = _op("gt")
+    gte = _op("gte")
+    order = _op("order")
+    limit = _op("limit")
+    range = _op("range")
+    del _op
+
+    def execute(self):
+        return self.db.handle(self)
+
+
+class FakeSupabase:
+    """
+    内存中的 daily_records / food_classifications 等表，行为与 PostgREST 一致的部分：
+    - 批量 insert/upsert 的各行必须有相同的列（否则 PGRST102）
+    - 未指定 limit/range 的 select 最多返回 max_rows 行
+    """
+
+    def __init__(self, max_rows=1000):
+        self.tables = {}
+        self.max_rows = max_rows
+        self.queries = []
+        self.writes = []
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def handle(self, query):
+        self.queries.append(query)
+        rows = self.tables.setdefault(query.table, [])
+        for name, args, kwargs in query.ops:
+            if name in ("insert", "upsert"):
+                return self._write(rows, name, args[0], kwargs.get("on_conflict"))
+
+        result = list(rows)
+        limit = self.max_rows
+        start = 0
+        for name, args, kwargs in query.ops:
+            if name == "eq":
+                result = [r for r in result if str(r.get(args[0])) == str(args[1])]
+            elif name == "in_":
+                result = [r for r in result if r.get(args[0]) in args[1]]
+            elif name == "gt":
+                result = [r for r in result if r.get(args[0]) is not None and str(r[args[0]]) > str(args[1])]
+            elif name == "gte":
+                result = [r for r in result if r.get(args[0]) is not None and str(r[args[0]]) >= str(args[1])]
+            elif name == "order":
+                result.sort(key=lambda r: str(r.get(args[0]) or ""), reverse=kwargs.get("desc", False))
+            elif name == "limit":
+                limit = min(args[0], self.max_rows)
+            elif name == "range":
+                start, limit = args[0], min(args[1] - args[0] + 1, self.max_rows)
+        return SimpleNamespace(data=[dict(r) for r in result[start:start + limit]], count=len(result))
+
+    def _write(self, rows, op, data, on_conflict):
+        data = data if isinstance(data, list) else [data]
+        if len({frozenset(row) for row in data}) > 1:
+            raise Exception("PGRST102: All object keys must match")
+        self.writes.append((op, data))
+        keys = on_conflict.split(",") if on_conflict else None
+        for row in data:
+            existing = next((r for r in rows if keys and all(r.get(k) == row.get(k) for k in keys)), None)
+            if existing is not None:
+                existing.update(row)
+            else:
+                rows.append(dict(row))
+        return SimpleNamespace(data=[dict(row) for row in data])
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    import main
+
+    db = FakeSupabase()
+    monkeypatch.setattr(main, "supabase", db)
+    main.aggregate_store.drop()
+    return db
+
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+
+    import main
+
+    # 不进入 lifespan：测试不需要后台刷新目录、补充食谱池等启动任务
+    return TestClient(main.app)
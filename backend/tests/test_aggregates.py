@@ -0,0 +1,37 @@
+import datetime
+
+from conftest import auth_headers
+
+
+def test_backfill_reads_every_page(client, fake_db):
+    start = datetime.date(2020, 1, 1)
+    fake_db.tables["daily_records"] = [
+        {"user_id": "alice", "date": (start + datetime.timedelta(days=i)).isoformat(), "weight": 60.0}
+        for i in range(2500)
+    ]
+    response = client.get("/api/records/aggregates?period=day&limit=1", headers=auth_headers("alice"))
+    assert response.status_code == 200
+    last = (start + datetime.timedelta(days=2499)).isoformat()
+    assert response.json()["buckets"][0]["bucket"] == last
+
+
+def test_aggregates_require_token_of_same_user(client, fake_db):
+    assert client.get("/api/records/aggregates?user_id=victim").status_code == 401
+    assert client.get("/api/records/aggregates?user_id=victim", headers=auth_headers("alice")).status_code == 403
+    assert not fake_db.queries
+
+
+def test_aggregates_rebuilt_after_another_worker_writes(client, fake_db):
+    fake_db.tables["daily_records"] = [
+        {"user_id": "alice", "date": "2026-10-01", "weight": 60.0, "updated_at": "2026-10-01T08:00:00+00:00"}
+    ]
+    url = "/api/records/aggregates?period=day"
+    assert client.get(url, headers=auth_headers("alice")).json()["buckets"][0]["weight"]["mean"] == 60.0
+
+    # 另一个 worker 同步了新值：本进程的存储没有收到更新
+    fake_db.tables["daily_records"][0].update(weight=62.0, updated_at="2026-10-02T08:00:00+00:00")
+    assert client.get(url, headers=auth_headers("alice")).json()["buckets"][0]["weight"]["mean"] == 62.0
+
+    # 删除记录同样使版本变化
+    fake_db.tables["daily_records"].clear()
+    assert client.get(url, headers=auth_headers("alice")).json()["buckets"] == []
@@ -0,0 +1,28 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import app as spaces
+
+ORIGIN = "https://example.com"
+
+
+@pytest.fixture
+def outer():
+    # 不进入 lifespan，与 conftest 中的 client 一致
+    return TestClient(spaces.app)
+
+
+@pytest.mark.parametrize("path", ["/", "/health", "/api/health"])
+def test_routes_allow_cross_origin(outer, path):
+    response = outer.get(path, headers={"Origin": ORIGIN})
+    assert response.status_code == 200
+    # 挂载的主应用和外层应用都有 CORS 中间件，响应头不能重复
+    assert len(response.headers.get_list("access-control-allow-origin")) == 1
+    assert response.headers["access-control-allow-origin"] in ("*", ORIGIN)
+
+
+@pytest.mark.parametrize("path", ["/health", "/api/health"])
+def test_preflight_on_outer_and_mounted_routes(outer, path):
+    response = outer.options(path, headers={"Origin": ORIGIN, "Access-Control-Request-Method": "GET"})
+    assert response.status_code == 200
+    assert "access-control-allow-origin" in response.headers
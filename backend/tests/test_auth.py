@@ -0,0 +1,70 @@
+import asyncio
+import time
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import ec
+
+from auth import AuthError, TokenVerifier
+from conftest import JWT_SECRET
+
+
+def _claims(**extra):
+    now = int(time.time())
+    return {"sub": "alice", "aud": "authenticated", "iat": now, "exp": now + 3600, **extra}
+
+
+def _verify(verifier, token):
+    return asyncio.run(verifier.verify(token))
+
+
+def test_secret_token_is_decoded_once():
+    verifier = TokenVerifier(secret=JWT_SECRET)
+    token = jwt.encode(_claims(), JWT_SECRET, algorithm="HS256")
+    assert _verify(verifier, token)["sub"] == "alice"
+    assert _verify(verifier, token)["sub"] == "alice"
+    assert (verifier.misses, verifier.hits) == (1, 1)
+
+
+@pytest.mark.parametrize("token", [
+    jwt.encode(_claims(), "another-secret-another-secret-xx", algorithm="HS256"),
+    jwt.encode(_claims(exp=int(time.time()) - 60), JWT_SECRET, algorithm="HS256"),
+    jwt.encode(_claims(aud="anon"), JWT_SECRET, algorithm="HS256"),
+])
+def test_invalid_tokens_are_rejected_and_not_cached(token):
+    verifier = TokenVerifier(secret=JWT_SECRET)
+    for _ in range(2):
+        with pytest.raises(AuthError):
+            _verify(verifier, token)
+    assert verifier.failures == 2
+    assert verifier.stats()["cached"] == 0
+
+
+def test_cache_entry_does_not_outlive_token():
+    verifier = TokenVerifier(secret=JWT_SECRET, max_ttl=300, leeway=0)
+    token = jwt.encode(_claims(exp=int(time.time()) + 1), JWT_SECRET, algorithm="HS256")
+    _verify(verifier, token)
+    time.sleep(1.1)
+    with pytest.raises(AuthError):
+        _verify(verifier, token)
+
+
+def test_jwks_key_is_fetched_once_per_token(monkeypatch):
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    verifier = TokenVerifier(jwks_url="https://example.supabase.co/auth/v1/.well-known/jwks.json")
+    fetches = []
+
+    def get_signing_key_from_jwt(token):
+        fetches.append(token)
+        return jwt.PyJWK.from_dict({**jwt.algorithms.ECAlgorithm.to_jwk(private_key.public_key(), as_dict=True), "alg": "ES256"})
+
+    monkeypatch.setattr(verifier._jwks, "get_signing_key_from_jwt", get_signing_key_from_jwt)
+    token = jwt.encode(_claims(), private_key, algorithm="ES256")
+    assert verifier.stats()["mode"] == "jwks"
+    assert _verify(verifier, token)["sub"] == "alice"
+    assert _verify(verifier, token)["sub"] == "alice"
+    assert len(fetches) == 1
+
+    # JWKS 模式不接受用共享密钥签名的令牌
+    with pytest.raises(AuthError):
+        _verify(verifier, jwt.encode(_claims(), JWT_SECRET, algorithm="HS256"))
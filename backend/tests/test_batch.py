@@ -0,0 +1,44 @@
+import asyncio
+import json
+
+import main
+
+
+class Response:
+    def __init__(self, level):
+        self.text = json.dumps({"name": "", "level": level, "reason": "测试", "advice": "适量"})
+
+
+def _lines(response):
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+
+def test_results_stream_in_input_order_and_duplicates_call_gemini_once(client, fake_db, monkeypatch):
+    calls = []
+
+    async def generate(kind, contents, **kwargs):
+        calls.append(contents)
+        # 第一项最慢：结果仍按输入顺序返回
+        await asyncio.sleep(0.1 if "龘靐" in contents else 0.01)
+        return Response("red" if "龘靐" in contents else "green")
+
+    monkeypatch.setattr(main.llm, "api_key", "test")
+    monkeypatch.setattr(main.llm, "generate", generate)
+
+    queries = ["龘靐", "苹果", "齉爩", "龘靐"]
+    response = client.post("/api/classify/batch", json={"items": [{"query": q} for q in queries]})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    lines = _lines(response)
+    assert [line["index"] for line in lines] == [0, 1, 2, 3]
+    assert [line["query"] for line in lines] == queries
+    assert [line["result"]["level"] for line in lines] == ["red", "green", "green", "red"]
+    # 苹果由本地索引应答，重复的 "龘靐" 只调用一次 Gemini
+    assert len(calls) == 2
+
+
+def test_batch_rejects_empty_and_oversized_requests(client, fake_db):
+    assert client.post("/api/classify/batch", json={"items": []}).status_code == 422
+    items = [{"query": f"食物{i}"} for i in range(main.BATCH_MAX_ITEMS + 1)]
+    assert client.post("/api/classify/batch", json={"items": items}).status_code == 422
@@ -0,0 +1,37 @@
+import sqlite3
+
+from cache import TieredCache
+
+
+def _rows(path):
+    with sqlite3.connect(path) as db:
+        return db.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+
+def test_persistent_writes_are_batched(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = TieredCache(path=path, flush_size=3, flush_interval=3600)
+    cache.set("food:苹果", {"level": "green"})
+    cache.set("food:香蕉", {"level": "yellow"})
+    assert _rows(path) == 0
+    cache.set("food:杨桃", {"level": "red"})
+    assert _rows(path) == 3
+
+
+def test_pending_writes_are_readable_and_flushed(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = TieredCache(max_size=1, path=path, flush_interval=3600)
+    cache.set("food:苹果", {"level": "green"})
+    cache.set("food:香蕉", {"level": "yellow"})  # 挤出内存中的苹果
+    assert cache.get("food:苹果") == {"level": "green"}
+    cache.invalidate("food:香蕉")
+    cache.flush()
+    assert _rows(path) == 1
+    assert TieredCache(path=path).get("food:苹果") == {"level": "green"}
+
+
+def test_database_uses_wal(tmp_path):
+    path = str(tmp_path / "cache.db")
+    TieredCache(path=path)
+    with sqlite3.connect(path) as db:
+        assert db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
@@ -0,0 +1,56 @@
+import asyncio
+import json
+
+import httpx
+
+import main
+
+
+class Response:
+    text = json.dumps({"name": "", "level": "yellow", "reason": "测试", "advice": "适量"})
+
+
+def test_concurrent_identical_classify_calls_gemini_once(fake_db, monkeypatch):
+    calls = []
+
+    async def generate(kind, contents, **kwargs):
+        calls.append(contents)
+        await asyncio.sleep(0.05)
+        return Response()
+
+    monkeypatch.setattr(main.llm, "api_key", "test")
+    monkeypatch.setattr(main.llm, "generate", generate)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(
+                client.post("/api/classify", json={"query": "龘靐齉爩", "type": "food"}) for _ in range(20)
+            ))
+
+    responses = asyncio.run(scenario())
+    assert all(r.status_code == 200 and r.json()["level"] == "yellow" for r in responses)
+    assert len(calls) == 1
+    inserts = [rows for op, rows in fake_db.writes if op == "insert"]
+    assert len(inserts) == 1 and inserts[0][0]["food_name"] == "龘靐齉爩"
+
+
+def _fuzzy(monkeypatch, query):
+    from food_index import FoodIndex
+
+    index = FoodIndex()
+    for name, level in [("西兰花", "yellow"), ("西红柿炒鸡蛋", "green")]:
+        index.add(name, {"name": name, "level": level, "reason": "测试", "advice": "测试"})
+    monkeypatch.setattr(main, "food_index", index)
+    return main._classify_fuzzy(main.QueryItem(query=query))
+
+
+def test_fuzzy_classify_ignores_unfinished_prefix(monkeypatch):
+    assert _fuzzy(monkeypatch, "西兰") is None
+
+
+def test_fuzzy_classify_keeps_query_name(monkeypatch):
+    result = _fuzzy(monkeypatch, "西红柿炒鸡蛋儿")
+    assert result["level"] == "green"
+    assert result["name"] == "西红柿炒鸡蛋儿"
+    assert result["matched"]["name"] == "西红柿炒鸡蛋"
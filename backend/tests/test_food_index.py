@@ -0,0 +1,45 @@
+import pytest
+
+from food_index import FoodIndex, normalize_name
+
+
+@pytest.mark.parametrize("text, key", [
+    ("一个 苹果！", "苹果"),
+    ("2根香蕉", "香蕉"),
+    ("半碗米饭", "米饭"),
+    ("牛奶250ml", "牛奶"),
+    ("三杯鸡", "三杯鸡"),
+    ("三杯鸭", "三杯鸭"),
+    ("一品豆腐", "一品豆腐"),
+    ("八宝粥", "八宝粥"),
+    ("一杯", "一杯"),
+])
+def test_normalize_name(text, key):
+    assert normalize_name(text) == key
+
+
+def test_numeral_dish_is_not_looked_up_as_its_last_word():
+    index = FoodIndex()
+    index.add("鸡肉", {"name": "鸡肉", "level": "yellow"})
+    assert index.lookup("三杯鸡") is None
+    assert index.lookup("一个鸡") == {"name": "鸡肉", "level": "yellow"}
+
+
+def test_exact_name_with_quantity_prefix_wins():
+    index = FoodIndex()
+    index.add("块", {"name": "块", "level": "green"})
+    index.add("一块", {"name": "一块", "level": "red"})
+    assert index.lookup("一块")["name"] == "一块"
+
+
+@pytest.mark.parametrize("query", ["   ", "！？", "　"])
+def test_empty_query_is_rejected(client, query):
+    assert client.post("/api/classify", json={"query": query, "type": "food"}).status_code == 422
+
+
+def test_prefix_bonus_only_for_autocomplete():
+    index = FoodIndex()
+    index.add("西兰花", {"name": "西兰花", "level": "yellow"})
+    (ranked, _, _), = index.search("西兰")
+    (plain, _, _), = index.search("西兰", prefix_bonus=False)
+    assert plain < ranked
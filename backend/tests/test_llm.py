@@ -0,0 +1,120 @@
+import asyncio
+import time
+
+import pytest
+
+from llm import CircuitBreaker, LLMClient, LLMUnavailable
+
+
+class SlowModel:
+    async def generate_content_async(self, contents, stream=False, **kwargs):
+        await asyncio.sleep(10)
+
+
+class StreamModel:
+    async def generate_content_async(self, contents, stream=False, **kwargs):
+        async def chunks():
+            for text in ("a", "b", "c"):
+                yield type("Chunk", (), {"text": text})()
+        return chunks()
+
+
+def _half_open_client(model):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.failures, breaker.opened_at = 1, time.monotonic()
+    client = LLMClient(api_key="test", max_retries=0, breaker=breaker)
+    client._models["test"] = model
+    return client
+
+
+def test_cancelled_probe_releases_half_open_state():
+    async def scenario():
+        client = _half_open_client(SlowModel())
+        probe = asyncio.ensure_future(client.generate("test", "prompt"))
+        await asyncio.sleep(0.01)
+        # 探测进行中，其它请求被拒绝
+        with pytest.raises(LLMUnavailable):
+            await client.generate("test", "prompt")
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        assert client.breaker.allow()
+        assert client.inflight == 0
+
+    asyncio.run(scenario())
+
+
+def test_abandoned_stream_probe_releases_half_open_state():
+    async def scenario():
+        client = _half_open_client(StreamModel())
+        stream = client.stream("test", "prompt")
+        assert await stream.__anext__() == "a"
+        await stream.aclose()
+        assert client.breaker.allow()
+
+    asyncio.run(scenario())
+
+
+class UpstreamError(Exception):
+    def __init__(self, code):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+
+class FailingModel:
+    def __init__(self, *codes):
+        self.codes = list(codes)
+        self.calls = 0
+
+    async def generate_content_async(self, contents, stream=False, **kwargs):
+        self.calls += 1
+        if self.codes:
+            raise UpstreamError(self.codes.pop(0))
+        return "ok"
+
+
+def _client(model, **kwargs):
+    client = LLMClient(api_key="test", backoff=0, **kwargs)
+    client._models["test"] = model
+    return client
+
+
+@pytest.mark.parametrize("code", [429, 500, 503])
+def test_transient_errors_are_retried(code):
+    model = FailingModel(code, code)
+    client = _client(model, max_retries=2)
+    assert asyncio.run(client.generate("test", "prompt")) == "ok"
+    assert model.calls == 3
+
+
+@pytest.mark.parametrize("code", [400, 403, 404])
+def test_client_errors_fail_without_retry(code):
+    model = FailingModel(code, code, code)
+    client = _client(model, max_retries=2, breaker=CircuitBreaker(failure_threshold=1))
+    with pytest.raises(LLMUnavailable):
+        asyncio.run(client.generate("test", "prompt"))
+    assert model.calls == 1
+    assert client.breaker.state == "closed"
+
+
+class StallingStreamModel:
+    async def generate_content_async(self, contents, stream=False, **kwargs):
+        async def chunks():
+            yield type("Chunk", (), {"text": "a"})()
+            await asyncio.sleep(10)
+            yield type("Chunk", (), {"text": "b"})()
+        return chunks()
+
+
+def test_stream_times_out_between_chunks():
+    async def scenario():
+        client = _client(StallingStreamModel(), timeout=0.05)
+        received = []
+        with pytest.raises(LLMUnavailable):
+            async for text in client.stream("test", "prompt"):
+                received.append(text)
+        assert received == ["a"]
+        assert client.timeouts == 1
+        assert client.inflight == 0
+
+    asyncio.run(scenario())
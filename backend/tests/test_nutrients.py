@@ -0,0 +1,25 @@
+import pytest
+
+from nutrients import load_nutrient_table
+
+
+@pytest.fixture(scope="module")
+def table():
+    return load_nutrient_table()
+
+
+@pytest.mark.parametrize("query", ["牛奶糖", "牛肉干", "苹果醋", "西瓜霜", "紫菜汤", "火腿肠炒饭", "清炒菠菜"])
+def test_dishes_containing_a_known_food_are_not_matched(table, query):
+    assert table.find(query) is None
+    assert table.classify(query) is None
+
+
+@pytest.mark.parametrize("query, name", [("牛奶", "牛奶"), ("番茄", "西红柿"), ("一个苹果", "苹果"), ("地瓜", "红薯")])
+def test_exact_and_alias_matches(table, query, name):
+    row = table.find(query)
+    assert row is not None and name in table.names[row]
+
+
+def test_result_is_named_after_query(table):
+    assert table.classify("番茄")["name"] == "番茄"
+    assert table.classify("西红柿")["name"] == "西红柿"
@@ -0,0 +1,43 @@
+import pytest
+
+import main
+from payloads import PrebuiltPayload
+
+
+def _get(client, **headers):
+    return client.get("/api/food-whitelist", headers=headers)
+
+
+def test_identity_response_has_strong_etag(client):
+    response = _get(client, **{"Accept-Encoding": "identity"})
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+    assert response.headers["etag"] == main.whitelist_payload.etag
+    assert "max-age" in response.headers["cache-control"]
+    assert response.json()["whitelist"]
+
+
+def test_gzip_is_negotiated_with_its_own_etag(client):
+    identity = _get(client, **{"Accept-Encoding": "identity"})
+    response = _get(client, **{"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"].endswith('-gzip"')
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.json() == identity.json()
+
+
+@pytest.mark.parametrize("accept", ["identity", "gzip"])
+def test_matching_etag_returns_304(client, accept):
+    etag = _get(client, **{"Accept-Encoding": "gzip"}).headers["etag"]
+    # 客户端缓存的是任一编码的表示都可以复用
+    response = _get(client, **{"Accept-Encoding": accept, "If-None-Match": f'"stale", {etag}'})
+    assert response.status_code == 304
+    assert not response.content
+
+
+def test_changed_content_gets_new_etag(client, monkeypatch):
+    etag = _get(client, **{"Accept-Encoding": "identity"}).headers["etag"]
+    monkeypatch.setattr(main, "whitelist_payload", PrebuiltPayload({"whitelist": [{"name": "新增食物"}]}))
+    response = _get(client, **{"Accept-Encoding": "identity", "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
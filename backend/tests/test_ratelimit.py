@@ -0,0 +1,55 @@
+from types import SimpleNamespace
+
+import ratelimit
+from ratelimit import MemoryBucketStore, RateLimiter, SQLiteBucketStore, client_ip
+from recipe_pool import RecipePool
+
+
+def _request(forwarded=None, host="10.0.0.1"):
+    headers = {"x-forwarded-for": forwarded} if forwarded else {}
+    return SimpleNamespace(headers=headers, client=SimpleNamespace(host=host))
+
+
+def test_rejected_ip_does_not_charge_user_bucket(tmp_path):
+    for store in (MemoryBucketStore(), SQLiteBucketStore(str(tmp_path / "buckets.sqlite3"))):
+        limiter = RateLimiter(store, per_ip=(1, 0.0), per_user=(2, 0.0))
+        assert limiter.allow("classify", "1.1.1.1", "alice")
+        # IP 桶已空：被拒绝，用户桶不扣减
+        for _ in range(5):
+            assert not limiter.allow("classify", "1.1.1.1", "alice")
+        assert limiter.allow("classify", "2.2.2.2", "alice")
+        assert not limiter.allow("classify", "3.3.3.3", "alice")
+
+
+def test_client_ip_ignores_forwarded_header_by_default(monkeypatch):
+    monkeypatch.setattr(ratelimit, "TRUST_PROXY", False)
+    assert client_ip(_request("6.6.6.6")) == "10.0.0.1"
+
+
+def test_client_ip_takes_entry_appended_by_trusted_proxy(monkeypatch):
+    monkeypatch.setattr(ratelimit, "TRUST_PROXY", True)
+    monkeypatch.setattr(ratelimit, "PROXY_HOPS", 1)
+    assert client_ip(_request("6.6.6.6, 203.0.113.7")) == "203.0.113.7"
+    monkeypatch.setattr(ratelimit, "PROXY_HOPS", 2)
+    assert client_ip(_request("6.6.6.6, 203.0.113.7, 10.1.1.1")) == "203.0.113.7"
+    # 条目少于代理层数：请求没有经过预期的代理链，使用连接地址
+    assert client_ip(_request("203.0.113.7")) == "10.0.0.1"
+
+
+def test_recipe_pool_charges_only_fresh_recipes():
+    recipe = {"dishName": "冬瓜汤", "ingredients": ["冬瓜"], "steps": ["煮"], "nutritionBenefit": "低钾"}
+    pool = RecipePool()
+    pool.add_known([recipe])
+    calls = []
+
+    def admit():
+        calls.append(1)
+        return True
+
+    assert pool.take(admit=admit) == recipe
+    assert calls == []
+
+    pool._fresh.append(dict(recipe, dishName="清蒸鲈鱼"))
+    assert pool.take(admit=lambda: False)["dishName"] == "冬瓜汤"
+    assert pool.take(admit=admit)["dishName"] == "清蒸鲈鱼"
+    assert calls == [1]
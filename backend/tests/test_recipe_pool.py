@@ -0,0 +1,50 @@
+import asyncio
+
+from recipe_pool import RecipePool
+
+
+def _recipe(name):
+    return {"dishName": name, "ingredients": ["冬瓜"], "steps": ["煮"], "nutritionBenefit": "低钾"}
+
+
+def test_pool_created_outside_event_loop_starts_in_another_loop():
+    generated = []
+
+    async def generate():
+        generated.append(1)
+        return _recipe(f"食谱{len(generated)}")
+
+    # 与 gunicorn 预加载相同：在 master 中构造，在 worker 的事件循环中启动
+    pool = RecipePool(generate=generate, max_size=3, low_water=3)
+    pool.take()
+
+    async def scenario():
+        pool.start()
+        await asyncio.sleep(0.05)
+        assert pool.stats()["fresh"] == 3
+        pool.take()
+        await asyncio.sleep(0.05)
+        await pool.stop()
+
+    asyncio.run(scenario())
+    assert len(generated) == 4
+
+
+def test_stocked_pool_does_not_generate():
+    generated = []
+
+    async def generate():
+        generated.append(1)
+        return _recipe("新食谱")
+
+    pool = RecipePool(generate=generate, max_size=2)
+    pool.add_stock([_recipe("冬瓜汤"), _recipe("清蒸鲈鱼"), _recipe("白灼菜心")])
+    assert pool.stats()["fresh"] == 2
+
+    async def scenario():
+        pool.start()
+        await asyncio.sleep(0.05)
+        await pool.stop()
+
+    asyncio.run(scenario())
+    assert generated == []
@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+import main
+
+RECIPE_TEXT = "dishName: 清蒸鲈鱼\ntags: 低盐, 优质蛋白\ningredients:\n- 鲈鱼 1条\n- 姜丝\nsteps:\n1. 蒸8分钟\nnutritionBenefit: 优质蛋白，低磷"
+
+
+def _events(response):
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+@pytest.fixture
+def gemini(monkeypatch):
+    monkeypatch.setattr(main.llm, "api_key", "test")
+
+    def use(stream):
+        monkeypatch.setattr(main.llm, "stream", stream)
+    return use
+
+
+def test_fields_stream_before_done(client, fake_db, gemini):
+    async def stream(kind, contents, **kwargs):
+        for i in range(0, len(RECIPE_TEXT), 7):
+            yield RECIPE_TEXT[i:i + 7]
+
+    gemini(stream)
+    response = client.get("/api/recipe/stream")
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = _events(response)
+    assert [name for name, _ in events] == ["start"] + ["field"] * 5 + ["done"]
+    assert [data["field"] for name, data in events if name == "field"] == [
+        "dishName", "tags", "ingredients", "steps", "nutritionBenefit"
+    ]
+    assert events[-1][1]["dishName"] == "清蒸鲈鱼"
+    assert events[-1][1]["ingredients"] == ["鲈鱼 1条", "姜丝"]
+    assert any(op == "insert" and rows[0]["dish_name"] == "清蒸鲈鱼" for op, rows in fake_db.writes)
+
+
+def test_failure_sends_error_then_preset_recipe(client, fake_db, gemini):
+    async def stream(kind, contents, **kwargs):
+        yield "dishName: 清蒸鲈鱼\n"
+        raise main.LLMUnavailable("上游超时")
+
+    gemini(stream)
+    events = _events(client.get("/api/recipe/stream"))
+    assert [name for name, _ in events] == ["start", "error", "done"]
+    assert events[-1][1]["dishName"] in {recipe["dishName"] for recipe in main.RECIPES}
+
+
+def test_unavailable_ai_sends_done_only(client, fake_db, monkeypatch):
+    monkeypatch.setattr(main.llm, "api_key", "")
+    events = _events(client.get("/api/recipe/stream"))
+    assert [name for name, _ in events] == ["start", "done"]
+    assert events[-1][1]["dishName"]
@@ -0,0 +1,37 @@
+import pytest
+
+import main
+from similarity import SimilarityIndex
+
+
+@pytest.fixture
+def similar_index(monkeypatch):
+    index = SimilarityIndex()
+    for item in main.FOOD_ITEMS:
+        index.add(item["name"], item)
+    for name, level in [("西红柿炒鸡蛋盖浇饭", "green"), ("鸭蛋黄", "yellow"), ("红烧肉", "yellow"), ("清蒸鲈鱼", "green")]:
+        index.add(name, {"name": name, "level": level, "reason": "测试", "advice": "测试"})
+    monkeypatch.setattr(main, "_similar_index_instance", index)
+    return index
+
+
+def _similar(query):
+    return main._classify_similar(main.QueryItem(query=query))
+
+
+def test_close_variant_reuses_verdict(similar_index):
+    result = _similar("西红柿炒鸡蛋盖饭")
+    assert result["level"] == "green"
+    assert result["name"] == "西红柿炒鸡蛋盖饭"
+    assert result["matched"]["name"] == "西红柿炒鸡蛋盖浇饭"
+
+
+@pytest.mark.parametrize("query", ["咸鸭蛋黄", "红烧肉块", "蒸鲈鱼"])
+def test_below_threshold_is_not_reused(similar_index, query):
+    assert _similar(query) is None
+
+
+@pytest.mark.parametrize("query", ["炸西红柿炒鸡蛋盖浇饭", "卤鸭蛋黄", "酱红烧肉"])
+def test_added_preparation_is_not_reused(similar_index, query):
+    # 相似度可能超过阈值，但多了做法或调味
+    assert _similar(query) is None
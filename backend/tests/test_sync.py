@@ -0,0 +1,113 @@
+from conftest import auth_headers
+
+import main
+from aggregates import UserAggregates
+
+
+def _sync(client, token_user, records, **extra):
+    return client.post("/api/records/sync", json={"records": records, **extra}, headers=auth_headers(token_user))
+
+
+def test_sync_requires_token(client, fake_db):
+    response = client.post("/api/records/sync", json={"user_id": "victim", "records": []})
+    assert response.status_code == 401
+    assert not fake_db.queries
+
+
+def test_sync_ignores_body_user_id(client, fake_db):
+    fake_db.tables["daily_records"] = [{"user_id": "victim", "date": "2026-10-01", "weight": 70.0,
+                                        "updated_at": "2026-10-01T00:00:00+00:00"}]
+    response = _sync(client, "alice", [{"date": "2026-10-02", "weight": 60.0}], user_id="victim")
+    assert response.status_code == 200
+    assert response.json()["changes"] == []
+    assert {row["user_id"] for row in fake_db.tables["daily_records"]} == {"victim", "alice"}
+    victim = next(row for row in fake_db.tables["daily_records"] if row["user_id"] == "victim")
+    assert victim["weight"] == 70.0
+
+
+def test_sync_mixed_field_records(client, fake_db):
+    fake_db.tables["daily_records"] = [{"user_id": "alice", "date": "2026-10-01", "weight": 61.0,
+                                        "systolic": 130, "diastolic": 85, "updated_at": "2026-10-01T00:00:00+00:00"}]
+    main.aggregate_store.put("alice", UserAggregates.from_rows(fake_db.tables["daily_records"]))
+
+    response = _sync(client, "alice", [
+        {"date": "2026-10-01", "waterIntake": 1200},
+        {"date": "2026-10-02", "weight": 60.5, "edema": True},
+        {"date": "2026-10-03", "systolic": 120, "diastolic": 80, "bpHand": "left"},
+    ])
+    assert response.status_code == 200
+    assert response.json()["upserted"] == 3
+
+    # 一次批量 upsert，各行的列相同
+    (op, written), = fake_db.writes
+    assert len({frozenset(row) for row in written}) == 1
+
+    # 部分更新保留已存储的字段
+    stored = {row["date"]: row for row in fake_db.tables["daily_records"]}
+    assert stored["2026-10-01"]["weight"] == 61.0
+    assert stored["2026-10-01"]["systolic"] == 130
+    assert stored["2026-10-01"]["water_intake"] == 1200
+    assert stored["2026-10-02"]["systolic"] is None
+
+    # 聚合结果与存储的行一致
+    day = {entry["bucket"]: entry for entry in main.aggregate_store.get("alice").series("day")}
+    assert day["2026-10-01"]["weight"]["mean"] == 61.0
+    assert day["2026-10-01"]["water_intake"]["mean"] == 1200
+
+
+def test_sync_error_does_not_leak_details(client, fake_db, monkeypatch):
+    def fail(query):
+        raise Exception("connection to 10.0.0.5 refused")
+
+    monkeypatch.setattr(fake_db, "handle", fail)
+    response = _sync(client, "alice", [{"date": "2026-10-01", "weight": 60.0}])
+    assert response.status_code == 500
+    assert "10.0.0.5" not in response.text
+
+
+def test_sync_rejects_invalid_date(client, fake_db):
+    response = _sync(client, "alice", [{"date": "yesterday", "weight": 60.0}])
+    assert response.status_code == 422
+    assert not fake_db.writes
+
+
+def test_sync_rejects_invalid_gzip_body(client, fake_db):
+    response = client.post("/api/records/sync", content=b"notgzip", headers={
+        **auth_headers("alice"), "Content-Type": "application/json", "Content-Encoding": "gzip"
+    })
+    assert response.status_code == 400
+
+
+def test_sync_returns_rows_committed_late_with_older_stamp(client, fake_db):
+    watermark = "2026-10-17T08:00:10.5+00:00"
+    # 并发同步 A 在 08:00:05 开始事务，在客户端 B 拿到 08:00:10 的水位线之后才提交
+    fake_db.tables["daily_records"] = [
+        {"user_id": "alice", "date": "2026-10-16", "weight": 60.0, "updated_at": "2026-10-17T08:00:05+00:00"},
+        {"user_id": "alice", "date": "2026-10-10", "weight": 61.0, "updated_at": "2026-10-17T07:00:00+00:00"},
+    ]
+    response = _sync(client, "alice", [], since=watermark)
+    assert response.status_code == 200
+    body = response.json()
+    assert [change["date"] for change in body["changes"]] == ["2026-10-16"]
+    # 水位线不因重叠窗口后退
+    assert body["watermark"] == watermark
+
+
+def test_sync_rejects_invalid_watermark(client, fake_db):
+    assert _sync(client, "alice", [], since="yesterday").status_code == 422
+
+
+def test_sync_response_is_gzipped_when_accepted_and_large(client, fake_db):
+    fake_db.tables["daily_records"] = [
+        {"user_id": "alice", "date": f"2026-09-{day:02d}", "weight": 60.0, "updated_at": f"2026-10-01T00:00:{day:02d}+00:00"}
+        for day in range(1, 31)
+    ]
+    headers = {**auth_headers("alice"), "Accept-Encoding": "gzip"}
+    response = client.post("/api/records/sync", json={"records": []}, headers=headers)
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(response.json()["changes"]) == 30
+
+    # 响应体太小时不压缩
+    fake_db.tables["daily_records"] = fake_db.tables["daily_records"][:1]
+    response = client.post("/api/records/sync", json={"records": []}, headers=headers)
+    assert "content-encoding" not in response.headers
@@ -0,0 +1,46 @@
+from conftest import auth_headers
+
+
+def _seed(db, user_id, dates, weight=60.0):
+    db.tables.setdefault("daily_records", []).extend(
+        {"user_id": user_id, "date": date, "weight": weight} for date in dates
+    )
+
+
+def test_trends_without_token_ignore_user_id(client, fake_db):
+    _seed(fake_db, "victim", ["2026-10-01", "2026-10-02"])
+    response = client.post("/api/analysis/trends", json={"user_id": "victim", "records": []})
+    assert response.status_code == 200
+    # 未携带令牌时不读取服务端记录
+    assert not any(q.table == "daily_records" for q in fake_db.queries)
+
+
+def test_trends_read_records_of_token_user(client, fake_db):
+    _seed(fake_db, "alice", ["2026-10-01"])
+    response = client.post("/api/analysis/trends", json={"records": []}, headers=auth_headers("alice"))
+    assert response.status_code == 200
+    reads = [q for q in fake_db.queries if q.table == "daily_records"]
+    assert reads and ("eq", ("user_id", "alice"), {}) in reads[0].ops
+
+
+def test_trends_reject_other_user_id(client, fake_db):
+    response = client.post("/api/analysis/trends", json={"user_id": "victim"}, headers=auth_headers("alice"))
+    assert response.status_code == 403
+
+
+def test_trends_reject_invalid_date(client, fake_db):
+    response = client.post("/api/analysis/trends", json={"records": [{"date": "10/01/2026", "weight": 60}]})
+    assert response.status_code == 422
+
+
+def test_trends_read_most_recent_records(client, fake_db):
+    import datetime
+
+    today = datetime.date.today()
+    dates = [(today - datetime.timedelta(days=i)).isoformat() for i in range(1500)]
+    _seed(fake_db, "alice", dates)
+    response = client.post("/api/analysis/trends", json={"days": 1200}, headers=auth_headers("alice"))
+    assert response.status_code == 200
+    read, = [q for q in fake_db.queries if q.table == "daily_records"]
+    assert ("order", ("date",), {"desc": True}) in read.ops
+    assert ("limit", (1200,), {}) in read.ops
@@ -0,0 +1,35 @@
+import main
+from cache import ITEM_TYPES, classification_key
+
+
+def test_classification_change_invalidates_every_item_type(client, monkeypatch):
+    monkeypatch.setenv("CACHE_WEBHOOK_SECRET", "hook")
+    result = {"name": "测试腌菜", "level": "red", "reason": "旧", "advice": "旧"}
+    for item_type in ITEM_TYPES:
+        main.classification_cache.set(classification_key("测试腌菜", item_type), result)
+
+    response = client.post("/api/cache/invalidate", headers={"X-Webhook-Secret": "hook"}, json={
+        "type": "UPDATE",
+        "table": "food_classifications",
+        "record": {"food_name": "测试腌菜", "level": "yellow", "reason": "新", "advice": "新"},
+    })
+    assert response.status_code == 200
+    for item_type in ITEM_TYPES:
+        assert main.classification_cache.get(classification_key("测试腌菜", item_type)) is None
+
+
+def test_background_task_failure_is_logged_and_released(capsys):
+    import asyncio
+
+    async def failing_refresh():
+        raise RuntimeError("数据库不可用")
+
+    async def scenario():
+        task = main.run_in_background(failing_refresh(), "refresh_catalog")
+        assert task in main._background_tasks
+        await asyncio.gather(task, return_exceptions=True)
+        await asyncio.sleep(0)  # 让完成回调执行
+
+    asyncio.run(scenario())
+    assert not main._background_tasks
+    assert "refresh_catalog" in capsys.readouterr().out
@@ -0,0 +1,219 @@
+import numpy as np
+
+# 数值指标（数据库列名）和症状指标（布尔值）
+METRICS = ("weight", "systolic", "diastolic", "water_intake")
+SYMPTOMS = ("edema", "hematuria", "foamy_urine")
+
+# 前端 DailyRecord 使用驼峰命名，数据库使用下划线命名
+_CAMEL_COLUMNS = {"water_intake": "waterIntake", "foamy_urine": "foamyUrine", "bp_hand": "bpHand"}
+
+# 阈值：血压与前端仪表盘的红线一致，体重在 WEIGHT_GAIN_DAYS 天内增加超过 WEIGHT_GAIN_KG 视为异常
+BP_RED = (140, 90)
+BP_YELLOW = (130, 80)
+WEIGHT_GAIN_KG = 2.0
+WEIGHT_GAIN_DAYS = 7
+WATER_LOW_ML = 1000
+_FLAGS = ("bp_red", "weight_gain", "water_low", "symptom")
+
+
+def _column(row: dict, name: str):
+    value = row.get(name)
+    if value is None:
+        value = row.get(_CAMEL_COLUMNS.get(name, name))
+    return value
+
+
+def merge_records(*sources) -> list:
+    """按日期合并多组记录（数据库行或前端 DailyRecord），同一天后出现的覆盖先出现的"""
+    by_date = {}
+    for rows in sources:
+        for row in rows or ():
+            if row.get("date"):
+                by_date[str(row["date"])[:10]] = row
+    return [by_date[date] for date in sorted(by_date)]
+
+
+def records_to_arrays(rows: list):
+    """记录 -> (天数数组, 数值矩阵 (n, 4), 症状矩阵 (n, 3))，缺失值为 NaN；rows 需按日期升序"""
+    dates = np.array([str(row["date"])[:10] for row in rows], dtype="datetime64[D]")
+    days = (dates - dates[0]).astype(np.int64) if len(dates) else np.zeros(0, dtype=np.int64)
+    values = np.array(
+        [[_column(row, m) for m in METRICS] for row in rows], dtype=np.float64
+    ).reshape(-1, len(METRICS))
+    symptoms = np.array(
+        [[_column(row, s) for s in SYMPTOMS] for row in rows], dtype=np.float64
+    ).reshape(-1, len(SYMPTOMS))
+    return days, values, symptoms
+
+
+def window_start(days: np.ndarray, window: int) -> np.ndarray:
+    """每条记录所在的 window 天窗口中第一条记录的下标（按日历天而不是记录条数）"""
+    return np.searchsorted(days, days - window + 1, side="left")
+
+
+def rolling_mean(days: np.ndarray, values: np.ndarray, window: int) -> np.ndarray:
+    """按日历天的滚动平均，忽略 NaN；通过累加和一次算出所有窗口"""
+    present = ~np.isnan(values)
+    sums = np.vstack([np.zeros((1, values.shape[1])), np.cumsum(np.where(present, values, 0), axis=0)])
+    counts = np.vstack([np.zeros((1, values.shape[1])), np.cumsum(present, axis=0)])
+    lo = window_start(days, window)
+    hi = np.arange(1, len(days) + 1)
+    n = counts[hi] - counts[lo]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(n > 0, (sums[hi] - sums[lo]) / n, np.nan)
+
+
+def slopes(days: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """每列对天数做最小二乘线性回归的斜率（每天的变化量），忽略 NaN"""
+    present = ~np.isnan(values)
+    x = np.where(present, days[:, None].astype(np.float64), 0)
+    y = np.where(present, values, 0)
+    n = present.sum(axis=0)
+    sx, sy = x.sum(axis=0), y.sum(axis=0)
+    denominator = n * (x * x).sum(axis=0) - sx * sx
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where((n >= 2) & (denominator > 0), (n * (x * y).sum(axis=0) - sx * sy) / denominator, np.nan)
+
+
+def _nanmean(values, axis=0):
+    present = ~np.isnan(values)
+    n = present.sum(axis=axis)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(n > 0, np.where(present, values, 0).sum(axis=axis) / n, np.nan)
+
+
+def _nanstd(values, axis=0):
+    mean = _nanmean(values, axis)
+    return np.sqrt(_nanmean((values - mean) ** 2, axis))
+
+
+def _round(value, digits=1):
+    value = float(value)
+    return None if np.isnan(value) else round(value, digits)
+
+
+def compute_metrics(rows: list, window: int = 7) -> dict:
+    """对整段记录做向量化统计：均值、标准差、斜率、滚动平均、近期与之前的对比及越线次数"""
+    days, values, symptoms = records_to_arrays(rows)
+    n = len(days)
+    systolic, diastolic, weight, water = values[:, 1], values[:, 2], values[:, 0], values[:, 3]
+
+    # 越线：比较结果为布尔数组，NaN 比较为 False
+    bp_red = (systolic >= BP_RED[0]) | (diastolic >= BP_RED[1])
+    bp_yellow = ((systolic >= BP_YELLOW[0]) | (diastolic >= BP_YELLOW[1])) & ~bp_red
+    # 体重缺失的天沿用上一次的体重，与 WEIGHT_GAIN_DAYS 天窗口内最早的体重比较
+    filled = weight[np.maximum.accumulate(np.where(np.isnan(weight), 0, np.arange(n)))] if n else weight
+    weight_jump = filled - filled[window_start(days, WEIGHT_GAIN_DAYS)] >= WEIGHT_GAIN_KG
+    water_low = water < WATER_LOW_ML
+    any_symptom = np.nan_to_num(symptoms).max(axis=1) > 0 if n else np.zeros(0, dtype=bool)
+
+    # 近期：最后 window 天；之前：其余全部记录
+    recent = days > days[-1] - window if n else np.zeros(0, dtype=bool)
+    flags = np.column_stack([bp_red, weight_jump, water_low, any_symptom]).astype(np.float64)
+
+    rolling = rolling_mean(days, values, window) if n else values
+    metric_slopes = slopes(days, values) if n else np.full(len(METRICS), np.nan)
+    means, stds = _nanmean(values), _nanstd(values)
+    recent_means, previous_means = _nanmean(values[recent]), _nanmean(values[~recent])
+
+    return {
+        "records": n,
+        "span_days": int(days[-1]) + 1 if n else 0,
+        "window_days": window,
+        "metrics": {
+            m: {
+                "mean": _round(means[i]),
+                "std": _round(stds[i]),
+                "latest": _round(values[-1, i]) if n else None,
+                "rolling_mean": _round(rolling[-1, i]) if n else None,
+                "slope_per_week": _round(metric_slopes[i] * 7, 2),
+                "recent_mean": _round(recent_means[i]),
+                "previous_mean": _round(previous_means[i]),
+            }
+            for i, m in enumerate(METRICS)
+        },
+        "symptom_rates": {
+            s: {"recent": _round(_nanmean(symptoms[recent, i]), 2), "previous": _round(_nanmean(symptoms[~recent, i]), 2)}
+            for i, s in enumerate(SYMPTOMS)
+        },
+        "breaches": {
+            "bp_red": int(bp_red.sum()),
+            "bp_yellow": int(bp_yellow.sum()),
+            "bp_red_recent": int(bp_red[recent].sum()),
+            "weight_gain": int(weight_jump.sum()),
+            "weight_gain_recent": int(weight_jump[recent].sum()),
+            "water_low_recent": int(water_low[recent].sum()),
+        },
+        "recent_rates": dict(zip(_FLAGS, (_round(v, 2) for v in _nanmean(flags[recent])))),
+        "previous_rates": dict(zip(_FLAGS, (_round(v, 2) for v in _nanmean(flags[~recent])))),
+    }
+
+
+def assess_trend(metrics: dict) -> str:
+    """近期与之前相比：血压、越线比例、症状比例的变化综合打分，无对比数据时用收缩压斜率判断"""
+    systolic = metrics["metrics"]["systolic"]
+    recent, previous = metrics["recent_rates"], metrics["previous_rates"]
+    score = 0
+    if systolic["previous_mean"] is not None and systolic["recent_mean"] is not None:
+        change = systolic["recent_mean"] - systolic["previous_mean"]
+        score += 1 if change <= -5 else -1 if change >= 5 else 0
+        for key in ("bp_red", "symptom"):
+            if recent[key] is not None and previous[key] is not None:
+                diff = recent[key] - previous[key]
+                score += 1 if diff <= -0.2 else -1 if diff >= 0.2 else 0
+    elif systolic["slope_per_week"] is not None:
+        score += 1 if systolic["slope_per_week"] <= -3 else -1 if systolic["slope_per_week"] >= 3 else 0
+    if metrics["breaches"]["weight_gain_recent"]:
+        score -= 1
+    return "improving" if score > 0 else "declining" if score < 0 else "stable"
+
+
+def build_advice(metrics: dict) -> list:
+    breaches, rates = metrics["breaches"], metrics["symptom_rates"]
+    advice = []
+    if breaches["bp_red_recent"]:
+        advice.append(f"近{metrics['window_days']}天有 {breaches['bp_red_recent']} 次血压达到 {BP_RED[0]}/{BP_RED[1]} mmHg 以上，请按时服药并联系医生评估降压方案")
+    elif breaches["bp_yellow"]:
+        advice.append(f"血压偶有超过 {BP_YELLOW[0]}/{BP_YELLOW[1]} mmHg，注意低盐饮食并坚持每日测量")
+    if breaches["weight_gain_recent"]:
+        advice.append(f"体重在 {WEIGHT_GAIN_DAYS} 天内增加超过 {WEIGHT_GAIN_KG:g} 公斤，注意水肿，严格限盐限水并告知医生")
+    if (rates["hematuria"]["recent"] or 0) > 0:
+        advice.append("近期出现血尿，请尽快复查尿常规")
+    if (rates["foamy_urine"]["recent"] or 0) >= 0.3:
+        advice.append("泡沫尿出现较频繁，建议复查尿蛋白定量")
+    if (rates["edema"]["recent"] or 0) >= 0.3:
+        advice.append("水肿较频繁，减少钠盐摄入，休息时抬高下肢")
+    if breaches["water_low_recent"]:
+        advice.append(f"有 {breaches['water_low_recent']} 天饮水少于 {WATER_LOW_ML} 毫升，在医生允许的范围内均匀饮水")
+    if not advice:
+        advice = ["各项指标平稳，保持当前的饮食和作息", "坚持每天记录血压、体重和饮水量"]
+    return advice
+
+
+def build_summary(metrics: dict, trend: str) -> str:
+    if not metrics["records"]:
+        return "暂无健康记录，坚持每日记录后即可查看趋势分析。"
+    m = metrics["metrics"]
+    parts = [f"近{metrics['span_days']}天共 {metrics['records']} 条记录"]
+    if m["systolic"]["mean"] is not None and m["diastolic"]["mean"] is not None:
+        parts.append(f"平均血压 {m['systolic']['mean']:.0f}/{m['diastolic']['mean']:.0f} mmHg")
+    if m["weight"]["latest"] is not None:
+        slope = m["weight"]["slope_per_week"]
+        change = f"，每周变化 {slope:+.1f} 公斤" if slope is not None else ""
+        parts.append(f"最新体重 {m['weight']['latest']:.1f} 公斤{change}")
+    if m["water_intake"]["recent_mean"] is not None:
+        parts.append(f"近期日均饮水 {m['water_intake']['recent_mean']:.0f} 毫升")
+    label = {"improving": "整体呈好转趋势", "declining": "近期指标有所波动，需要关注", "stable": "整体保持平稳"}[trend]
+    return "，".join(parts) + f"。{label}。"
+
+
+def analyze_trends(rows: list, window: int = 7) -> dict:
+    """返回与前端 HealthAnalysis 一致的结构，并附带计算出的统计指标"""
+    metrics = compute_metrics(rows, window)
+    trend = assess_trend(metrics) if metrics["records"] else "stable"
+    return {
+        "summary": build_summary(metrics, trend),
+        "trend": trend,
+        "actionableAdvice": build_advice(metrics) if metrics["records"] else ["坚持每天记录血压、体重和饮水量"],
+        "metrics": metrics,
+    }
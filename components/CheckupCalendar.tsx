@@ -29,19 +29,14 @@ const CheckupCalendar: React.FC = () => {
     if (!file) return;
 
     setIsAnalyzing(true);
-    const reader = new FileReader();
-    reader.onloadend = async () => {
-      const base64String = (reader.result as string).split(',')[1];
-      try {
-        const result = await analyzeMedicalReport(base64String);
-        setReport(result);
-      } catch (e) {
-        console.error("Analysis failed", e);
-      } finally {
-        setIsAnalyzing(false);
-      }
-    };
-    reader.readAsDataURL(file);
+    try {
+      const result = await analyzeMedicalReport(file);
+      setReport(result);
+    } catch (e) {
+      console.error("Analysis failed", e);
+    } finally {
+      setIsAnalyzing(false);
+    }
   };
 
   const triggerUpload = () => {
@@ -1,7 +1,7 @@
 
 import React, { useState, useRef, useEffect } from 'react';
 import { Utensils, GlassWater, Search, Loader2, Info, Skull, ChefHat, RefreshCw, Leaf, ShieldCheck, AlertTriangle, BookOpen, CheckCircle, XCircle } from 'lucide-react';
-import { classifyItem, getKidneyFriendlyRecipe } from '../services/geminiService';
+import { classifyItems, streamKidneyFriendlyRecipe } from '../services/geminiService';
 import { DailyRecord, ActivityClassification, Recipe } from '../types';
 
 interface DietWaterManagerProps {
@@ -12,7 +12,8 @@ interface DietWaterManagerProps {
 const DietWaterManager: React.FC<DietWaterManagerProps> = ({ record, setRecord }) => {
   const [foodQuery, setFoodQuery] = useState('');
   const [isLoading, setIsLoading] = useState(false);
-  const [foodResult, setFoodResult] = useState<ActivityClassification | null>(null);
+  // 每个查询一项，null 表示仍在等待批量分类的结果
+  const [foodResults, setFoodResults] = useState<(ActivityClassification | null)[]>([]);
   
   // Recipe State
   const [recipe, setRecipe] = useState<Recipe | null>(null);
@@ -101,13 +102,10 @@ const DietWaterManager: React.FC<DietWaterManagerProps> = ({ record, setRecord }
 
   const barWidthPercent = Math.min((record.waterIntake / maxBarValue) * 100, 100);
 
-  const handleFoodSearch = async (e: React.FormEvent) => {
-    e.preventDefault();
-    if (!foodQuery.trim()) return;
-    
-    // 首先在本地黑白名单中搜索
-    const query = foodQuery.toLowerCase().trim();
-    
+  // 在本地黑白名单中查找，未找到时返回 null
+  const lookupLocal = (name: string): ActivityClassification | null => {
+    const query = name.toLowerCase();
+
     // 搜索白名单
     const whitelistMatch = whitelist.find(item => 
       item.name.toLowerCase().includes(query) || 
@@ -115,13 +113,12 @@ const DietWaterManager: React.FC<DietWaterManagerProps> = ({ record, setRecord }
     );
     
     if (whitelistMatch) {
-      setFoodResult({
+      return {
         name: whitelistMatch.name,
         level: 'green',
         reason: `该食物在护肾白名单中，属于${whitelistMatch.category}`,
         advice: whitelistMatch.note
-      });
-      return;
+      };
     }
     
     // 搜索黑名单
@@ -130,25 +127,50 @@ const DietWaterManager: React.FC<DietWaterManagerProps> = ({ record, setRecord }
     );
     
     if (blacklistMatch) {
-      setFoodResult({
+      return {
         name: blacklistMatch.name,
         level: blacklistMatch.level,
         reason: blacklistMatch.reason,
         advice: blacklistMatch.level === 'red' ? '建议避免食用' : '建议限量食用'
-      });
-      return;
+      };
     }
+    return null;
+  };
+
+  const handleFoodSearch = async (e: React.FormEvent) => {
+    e.preventDefault();
+    // 一次可以查询多种食物，用逗号或顿号分隔，例如一餐的全部食材
+    const queries = foodQuery.split(/[,，、;；]+/).map(q => q.trim()).filter(Boolean);
+    if (queries.length === 0) return;
     
-    // 如果黑白名单中没有匹配项，则调用 Gemini API
+    // 首先在本地黑白名单中搜索
+    const results = queries.map(lookupLocal);
+    setFoodResults(results);
+
+    // 黑白名单中没有匹配的项一次批量请求分类，结果逐条到达时更新
+    const pending = queries.map((_, i) => i).filter(i => results[i] === null);
+    if (pending.length === 0) return;
+
     setIsLoading(true);
-    const res = await classifyItem(foodQuery, 'food');
-    setFoodResult(res);
+    const classified = await classifyItems(pending.map(i => queries[i]), 'food', (index, result) => {
+      setFoodResults(current => current.map((item, i) => (i === pending[index] ? result : item)));
+    });
+    // 请求失败时没有逐条回调，用返回的默认结果补齐
+    setFoodResults(current => current.map((item, i) => item ?? classified[pending.indexOf(i)]));
     setIsLoading(false);
   };
 
   const generateRecipe = async () => {
     setIsRecipeLoading(true);
-    const newRecipe = await getKidneyFriendlyRecipe();
+    setRecipe(null);
+    // 第一个字段到达就显示食谱卡片，其余字段逐个补上
+    const newRecipe = await streamKidneyFriendlyRecipe((field, value) => {
+      setIsRecipeLoading(false);
+      setRecipe(current => ({
+        ...(current ?? { dishName: '', tags: [], ingredients: [], steps: [], nutritionBenefit: '' }),
+        [field]: value
+      }));
+    });
     setRecipe(newRecipe);
     setIsRecipeLoading(false);
   };
@@ -465,7 +487,7 @@ const DietWaterManager: React.FC<DietWaterManagerProps> = ({ record, setRecord }
         <form onSubmit={handleFoodSearch} className="relative">
           <input 
             type="text" 
-            placeholder="搜“火锅”、“豆腐”、“布洛芬”..."
+            placeholder="搜“火锅”、“豆腐”、“布洛芬”...，多个用逗号分隔"
             className="w-full p-4 pl-4 pr-12 bg-white border border-slate-200 rounded-2xl shadow-sm focus:ring-2 focus:ring-blue-500 outline-none transition-all"
             value={foodQuery}
             onChange={(e) => setFoodQuery(e.target.value)}
@@ -483,8 +505,8 @@ const DietWaterManager: React.FC<DietWaterManagerProps> = ({ record, setRecord }
           </button>
         </form>
 
-        {foodResult && (
-          <div className={`p-5 rounded-3xl border animate-in fade-in slide-in-from-top-4 ${
+        {foodResults.map((foodResult, index) => foodResult ? (
+          <div key={index} className={`p-5 rounded-3xl border animate-in fade-in slide-in-from-top-4 ${
             foodResult.level === 'red' ? 'bg-red-50 border-red-200' : 
             foodResult.level === 'yellow' ? 'bg-amber-50 border-amber-200' : 'bg-teal-50 border-teal-200'
           }`}>
@@ -497,7 +519,11 @@ const DietWaterManager: React.FC<DietWaterManagerProps> = ({ record, setRecord }
               建议：{foodResult.advice}
             </p>
           </div>
-        )}
+        ) : (
+          <div key={index} className="p-5 rounded-3xl border bg-slate-50 border-slate-200 flex justify-center">
+            <Loader2 className="w-5 h-5 animate-spin text-blue-500" />
+          </div>
+        ))}
       </section>
     </div>
   );
@@ -3,11 +3,20 @@ import { ActivityClassification, DailyRecord, HealthAnalysis, Recipe, ReportAnal
 
 const API_BASE_URL = "https://fishbubble1234-kidney-compass-backend.hf.space";
 
+// 每次打开页面生成一个会话 ID，后端据此避免在同一会话中重复推荐食谱
+const SESSION_ID = Math.random().toString(36).slice(2) + Date.now().toString(36);
+
+// 登录后携带访问令牌，后端据此确定用户，不再信任请求中的 user_id
+const authHeaders = (): Record<string, string> => {
+  const token = localStorage.getItem('access_token');
+  return token ? { Authorization: `Bearer ${token}` } : {};
+};
+
 export const classifyItem = async (query: string, type: 'activity' | 'food' | 'medicine'): Promise<ActivityClassification> => {
   try {
     const response = await fetch(`${API_BASE_URL}/api/classify`, {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
+      headers: { 'Content-Type': 'application/json', ...authHeaders() },
       body: JSON.stringify({ query, type })
     });
 
@@ -22,23 +31,107 @@ export const classifyItem = async (query: string, type: 'activity' | 'food' | 'm
   }
 };
 
+// 批量分类：结果按输入顺序以 NDJSON 逐行返回，每到一条就回调 onResult
+export const classifyItems = async (
+  queries: string[],
+  type: 'activity' | 'food' | 'medicine' = 'food',
+  onResult?: (index: number, result: ActivityClassification) => void
+): Promise<ActivityClassification[]> => {
+  const results: ActivityClassification[] = queries.map(query => (
+    { name: query, level: 'yellow', reason: "连接服务器失败，请稍后重试", advice: "咨询医生" }
+  ));
+
+  try {
+    const response = await fetch(`${API_BASE_URL}/api/classify/batch`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json', ...authHeaders() },
+      body: JSON.stringify({ items: queries.map(query => ({ query, type })) })
+    });
+
+    if (!response.ok || !response.body) {
+      throw new Error(`API Error: ${response.statusText}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      const lines = buffer.split('\n');
+      buffer = lines.pop() || '';
+      for (const line of lines) {
+        if (!line.trim()) continue;
+        const { index, result } = JSON.parse(line);
+        results[index] = result;
+        onResult?.(index, result);
+      }
+    }
+  } catch (error) {
+    console.error("Batch Classify Error:", error);
+  }
+  return results;
+};
+
+// 趋势分析：后端合并数据库中的历史记录和本地记录后做统计，登录用户附带 user_id
 export const analyzeHealthTrends = async (history: DailyRecord[]): Promise<HealthAnalysis> => {
-  // Placeholder: If/When backend supports this, switch to fetch
-  // Currently returning static/fallback data to prevent crash if backend endpoint doesn't exist yet
-  // or if we want to migrate this later.
-  console.warn("analyzeHealthTrends is currently disabled/mocked until backend endpoint is ready.");
-  return {
-    summary: "AI 分析服务升级中...",
-    trend: "stable",
-    actionableAdvice: ["保持健康饮食", "注意休息"]
-  };
+  try {
+    const userInfo = JSON.parse(localStorage.getItem('user_info') || 'null');
+    const response = await fetch(`${API_BASE_URL}/api/analysis/trends`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json', ...authHeaders() },
+      body: JSON.stringify({ user_id: userInfo?.id, records: history })
+    });
+
+    if (!response.ok) {
+      throw new Error(`API Error: ${response.statusText}`);
+    }
+
+    const { summary, trend, actionableAdvice } = await response.json();
+    return { summary, trend, actionableAdvice };
+  } catch (error) {
+    console.error("Trend Analysis Error:", error);
+    return {
+      summary: "连接服务器失败，暂时无法分析趋势。",
+      trend: "stable",
+      actionableAdvice: ["保持健康饮食", "注意休息"]
+    };
+  }
+};
+
+// 同步本地记录：一次上传上次同步以来的记录，返回服务端的变化和新的水位线；浏览器支持时 gzip 压缩请求体
+export const syncRecords = async (
+  userId: string,
+  records: DailyRecord[],
+  since: string | null
+): Promise<{ watermark: string; changes: DailyRecord[] } | null> => {
+  try {
+    const json = JSON.stringify({ user_id: userId, since, records });
+    const headers: Record<string, string> = { 'Content-Type': 'application/json', ...authHeaders() };
+    let body: BodyInit = json;
+    if (typeof CompressionStream !== 'undefined') {
+      body = await new Response(new Blob([json]).stream().pipeThrough(new CompressionStream('gzip'))).blob();
+      headers['Content-Encoding'] = 'gzip';
+    }
+
+    const response = await fetch(`${API_BASE_URL}/api/records/sync`, { method: 'POST', headers, body });
+    if (!response.ok) {
+      throw new Error(`API Error: ${response.statusText}`);
+    }
+
+    return await response.json();
+  } catch (error) {
+    console.error("Sync Error:", error);
+    return null;
+  }
 };
 
 export const getKidneyFriendlyRecipe = async (): Promise<Recipe> => {
   try {
     const response = await fetch(`${API_BASE_URL}/api/recipe`, {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' }
+      headers: { 'Content-Type': 'application/json', 'X-Session-Id': SESSION_ID }
     });
 
     if (!response.ok) {
@@ -58,13 +151,71 @@ export const getKidneyFriendlyRecipe = async (): Promise<Recipe> => {
   }
 };
 
-export const analyzeMedicalReport = async (imageBase64: string): Promise<ReportAnalysis> => {
-  // Placeholder
-  console.warn("analyzeMedicalReport is currently disabled/mocked.");
-  return {
+// 流式获取食谱：每解析出一个字段就回调 onField，结束时返回完整食谱；失败时回退到普通接口
+export const streamKidneyFriendlyRecipe = (
+  onField: (field: keyof Recipe, value: Recipe[keyof Recipe]) => void
+): Promise<Recipe> => {
+  return new Promise((resolve) => {
+    const source = new EventSource(`${API_BASE_URL}/api/recipe/stream`);
+    let finished = false;
+
+    source.addEventListener('field', (event) => {
+      const { field, value } = JSON.parse((event as MessageEvent).data);
+      onField(field, value);
+    });
+    source.addEventListener('done', (event) => {
+      finished = true;
+      source.close();
+      resolve(JSON.parse((event as MessageEvent).data));
+    });
+    source.onerror = () => {
+      source.close();
+      if (!finished) {
+        finished = true;
+        getKidneyFriendlyRecipe().then(resolve);
+      }
+    };
+  });
+};
+
+// 报告分析：直接上传图片原始字节，拿到任务 ID 后通过 SSE 等待结果；相同图片重复上传不会重复分析
+export const analyzeMedicalReport = async (image: Blob): Promise<ReportAnalysis> => {
+  const fallback: ReportAnalysis = {
     date: new Date().toISOString(),
     indicators: { creatinine: "?", egfr: "?", uricAcid: "?", proteinuria: "?" },
     status: 'warning',
-    tailoredStrategy: "图片分析服务升级中..."
+    tailoredStrategy: "报告分析失败，请稍后重试或咨询医生。"
   };
+
+  try {
+    const response = await fetch(`${API_BASE_URL}/api/reports`, {
+      method: 'POST',
+      headers: { 'Content-Type': image.type || 'image/jpeg' },
+      body: image
+    });
+
+    if (!response.ok) {
+      throw new Error(`API Error: ${response.statusText}`);
+    }
+
+    const job = await response.json();
+    if (job.status === 'done') {
+      return job.result;
+    }
+
+    return await new Promise((resolve) => {
+      const source = new EventSource(`${API_BASE_URL}/api/reports/${job.id}`);
+      source.addEventListener('done', (event) => {
+        source.close();
+        resolve(JSON.parse((event as MessageEvent).data).result);
+      });
+      source.addEventListener('error', () => {
+        source.close();
+        resolve(fallback);
+      });
+    });
+  } catch (error) {
+    console.error("Report Analysis Error:", error);
+    return fallback;
+  }
 };